@@ -1,96 +1,542 @@
+import numpy as np
+import pandas as pd
 import vaex
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from correlation import correlation_matrix
+from dataset_backend import ArrowDataset
+from sketches import KLLSketch, k_for_error
+
 def validate_data(df):
     """
     Validates the DataFrame for null values.
 
     Args:
-        df (vaex.DataFrame): The DataFrame to be validated.
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame to be validated.
+
+    Returns:
+        pd.DataFrame or vaex.DataFrame: The DataFrame, with an ``ArrowDataset`` opened through vaex.
 
     Raises:
         ValueError: If null values are found in the DataFrame.
     """
-    if df.isnull().sum().sum() > 0:
+    df = _frame(df)
+    if isinstance(df, (pd.DataFrame, pd.Series)):
+        missing = df.isnull().sum().sum() > 0
+    else:
+        counts = [df.count(col, delay=True) for col in df.column_names]
+        df.execute()
+        missing = any(count.get() < len(df) for count in counts)
+    if missing:
         raise ValueError("Data contains null values. Please clean the data before analysis.")
     return df
 
-def describe_data(df):
+def to_vaex(df):
+    """
+    Gives a vaex view of a DataFrame without copying its data where possible.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The data. A dataset is opened from its memory-mapped
+            file; numpy-backed pandas columns are shared with vaex instead of copied.
+
+    Returns:
+        vaex.DataFrame: The data.
+    """
+    if isinstance(df, ArrowDataset):
+        return df.as_vaex()
+    if isinstance(df, pd.DataFrame):
+        return vaex.from_pandas(df, copy_index=False)
+    return df
+
+def _frame(df):
+    # Datasets are analysed through vaex, which evaluates them out of core over the memory map.
+    return df.as_vaex() if isinstance(df, ArrowDataset) else df
+
+def describe_data(df, approximate=False, error=0.01):
     """
     Describes the DataFrame by calculating statistical metrics for each column.
 
+    The statistics depend on the column type:
+
+    - numeric: mean, median, min, max, std, q1, q3 and mode;
+    - boolean: count, mean (share of True) and mode;
+    - datetime: count, min, max, median and mode;
+    - text and categorical: count, unique, mode and freq (occurrences of the mode).
+
+    All columns of a type are aggregated together: one DataFrame reduction per statistic for pandas input,
+    or a single chunked pass over all columns for vaex input.
+
     Args:
-        df (vaex.DataFrame): The DataFrame to be described.
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame to be described.
+        approximate (bool, optional): Estimate medians and quartiles of numeric columns from quantile sketches
+            instead of exact order statistics. Defaults to False.
+        error (float, optional): Tolerated rank error of the approximate quantiles. Defaults to 0.01.
 
     Returns:
         dict: A dictionary containing statistical metrics for each column.
     """
-    validate_data(df)
-    stats = {}
+    df = validate_data(df)
+    if isinstance(df, pd.DataFrame):
+        return _describe_pandas(df, approximate, error)
+    return _describe_vaex(df, approximate, error)
+
+
+def _column_kind(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'text'
+
+
+def _mode(counts):
+    """
+    Picks the most frequent value from value counts; ties go to the smallest value, as in ``pd.Series.mode``.
+
+    Args:
+        counts (pd.Series): Occurrences of every value, most frequent first.
+
+    Returns:
+        tuple: The mode and its number of occurrences.
+    """
+    if counts.empty:
+        return None, 0
+    top = counts.max()
+    candidates = counts.index[counts.to_numpy() == top]
+    try:
+        return candidates.min(), int(top)
+    except TypeError:
+        return candidates[0], int(top)
+
+
+def _sorted_modes(data, batch=16):
+    """
+    Finds the modes of numeric columns of one dtype by sorting them together, a batch of columns at a time.
+
+    Args:
+        data (pd.DataFrame): Numeric columns sharing a numpy dtype.
+        batch (int, optional): Number of columns sorted at once, bounding the size of the sorted copy.
+            Defaults to 16.
+
+    Returns:
+        dict: The mode of every column; ties go to the smallest value, as in ``pd.Series.mode``.
+    """
+    if not isinstance(data.dtypes.iloc[0], np.dtype):
+        return {col: _mode(data[col].value_counts())[0] for col in data.columns}
+    modes = {}
+    for start in range(0, data.shape[1], batch):
+        cols = data.columns[start:start + batch]
+        ordered = np.sort(data[cols].to_numpy(), axis=0)
+        for j, col in enumerate(cols):
+            values = ordered[:, j]
+            if values.dtype.kind == 'f':
+                values = values[~np.isnan(values)]
+            if not len(values):
+                modes[col] = None
+                continue
+            starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+            runs = np.diff(np.r_[starts, len(values)])
+            modes[col] = values[starts[np.argmax(runs)]]
+    return modes
+
+
+def _approximate_quartiles(values, error):
+    """
+    Estimates the quartiles of a numeric array with a KLL sketch, fed in chunks.
+    """
+    sketch = KLLSketch(k_for_error(error))
+    for start in range(0, len(values), 1_000_000):
+        sketch.update(values[start:start + 1_000_000])
+    q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+    return {'q1': q1, 'median': median, 'q3': q3}
+
+
+def _describe_pandas(df, approximate, error):
+    """
+    Describes a pandas DataFrame with one reduction per statistic over all columns of a type.
+    """
+    kinds = {col: _column_kind(df[col].dtype) for col in df.columns}
+    stats = {col: {} for col in df.columns}
+
+    numeric = [col for col in df.columns if kinds[col] == 'numeric']
+    if numeric:
+        data = df[numeric]
+        # Reduce per dtype, so the statistics keep the column type instead of a common upcast one.
+        groups = {}
+        for col in numeric:
+            groups.setdefault(data[col].dtype, []).append(col)
+        means, stds, medians, mins, maxs, modes = {}, {}, {}, {}, {}, {}
+        for cols in groups.values():
+            group = data[cols]
+            means.update(zip(cols, group.mean().to_numpy()))
+            stds.update(zip(cols, group.std().to_numpy()))
+            mins.update(zip(cols, group.min().to_numpy()))
+            maxs.update(zip(cols, group.max().to_numpy()))
+            if not approximate:
+                medians.update(zip(cols, group.median().to_numpy()))
+            modes.update(_sorted_modes(group))
+        if approximate:
+            quartiles = {col: _approximate_quartiles(data[col].to_numpy(dtype=float, na_value=np.nan), error)
+                         for col in numeric}
+        else:
+            quantiles = data.quantile([0.25, 0.75])
+            quartiles = {col: {'q1': quantiles.at[0.25, col], 'median': medians[col], 'q3': quantiles.at[0.75, col]}
+                         for col in numeric}
+        for col in numeric:
+            stats[col] = {
+                'mean': means[col],
+                'median': quartiles[col]['median'],
+                'min': mins[col],
+                'max': maxs[col],
+                'std': stds[col],
+                'q1': quartiles[col]['q1'],
+                'q3': quartiles[col]['q3'],
+                'mode': modes[col],
+            }
+
+    booleans = [col for col in df.columns if kinds[col] == 'boolean']
+    if booleans:
+        data = df[booleans]
+        counts, means = data.count(), data.mean()
+        for col in booleans:
+            stats[col] = {'count': int(counts[col]), 'mean': means[col], 'mode': _mode(data[col].value_counts())[0]}
+
+    dates = [col for col in df.columns if kinds[col] == 'datetime']
+    if dates:
+        data = df[dates]
+        counts, mins, maxs, medians = data.count(), data.min(), data.max(), data.median()
+        for col in dates:
+            stats[col] = {'count': int(counts[col]), 'min': mins[col], 'max': maxs[col], 'median': medians[col],
+                          'mode': _mode(data[col].value_counts())[0]}
+
+    texts = [col for col in df.columns if kinds[col] == 'text']
+    if texts:
+        data = df[texts]
+        counts, uniques = data.count(), data.nunique()
+        for col in texts:
+            mode, freq = _mode(data[col].value_counts())
+            stats[col] = {'count': int(counts[col]), 'unique': int(uniques[col]), 'mode': mode, 'freq': freq}
+    return stats
+
+
+def _quantiles_from_counts(values, counts, quantiles):
+    """
+    Computes exact quantiles from the distinct values of a column and their counts.
+
+    Args:
+        values (np.ndarray): The distinct values, sorted.
+        counts (np.ndarray): The occurrences of every value.
+        quantiles (list): Quantiles between 0 and 1.
+
+    Returns:
+        np.ndarray: The quantiles, interpolated linearly as ``np.quantile`` does on the full column.
+    """
+    cumulative = np.cumsum(counts)
+    positions = np.asarray(quantiles, dtype=float) * (cumulative[-1] - 1)
+    lower = np.floor(positions)
+    # The value at rank r is the first one whose cumulative count exceeds r.
+    below = values[np.searchsorted(cumulative, lower, side='right')]
+    above = values[np.searchsorted(cumulative, np.minimum(lower + 1, cumulative[-1] - 1), side='right')]
+    return below + (above - below) * (positions - lower)
+
+
+def _describe_vaex(df, approximate, error, chunksize=1_000_000):
+    """
+    Describes a vaex DataFrame in a single pass over the data.
+
+    The columns are read together, chunk by chunk, and every chunk is folded into per-column value counts.
+    The modes, distinct counts, extremes, means, standard deviations and exact quartiles all follow from those
+    counts, which hold one entry per distinct value. With ``approximate``, numeric quartiles come from KLL
+    sketches fed in the same pass instead.
+    """
+    kinds = {}
     for col in df.column_names:
-        stats[col] = {
-            'mean': df[col].mean(),
-            'median': df[col].median(),
-            'min': df[col].min(),
-            'max': df[col].max(),
-            'std': df[col].std(),
-            'q1': df[col].quantile(0.25),
-            'q3': df[col].quantile(0.75),
-            'mode': df[col].mode()[0]
-        }
+        dtype = df[col].dtype
+        kinds[col] = 'boolean' if dtype.kind == 'b' else 'numeric' if dtype.is_numeric else \
+            'datetime' if dtype.is_datetime else 'text'
+    counts = {col: pd.Series(dtype=np.int64) for col in kinds}
+    sketches = {col: KLLSketch(k_for_error(error)) for col, kind in kinds.items() if approximate and kind == 'numeric'}
+    for _, _, chunk in df.to_pandas_df(list(kinds), chunk_size=chunksize):
+        for col in kinds:
+            values = chunk[col].dropna()
+            if col in sketches:
+                sketches[col].update(values.to_numpy(dtype=float))
+            chunk_counts = values.value_counts(sort=False)
+            counts[col] = chunk_counts if counts[col].empty else counts[col].add(chunk_counts, fill_value=0)
+
+    stats = {}
+    for col, kind in kinds.items():
+        column_counts = counts[col].astype(np.int64)
+        count = int(column_counts.sum())
+        if kind in ('numeric', 'datetime'):
+            column_counts = column_counts.sort_index()
+        if kind == 'numeric':
+            values, weights = column_counts.index.to_numpy(dtype=float), column_counts.to_numpy(dtype=float)
+            if col in sketches:
+                q1, median, q3 = sketches[col].quantile([0.25, 0.5, 0.75])
+            elif count:
+                q1, median, q3 = _quantiles_from_counts(values, weights, [0.25, 0.5, 0.75])
+            else:
+                q1 = median = q3 = np.nan
+            mean = (values * weights).sum() / count if count else np.nan
+            std = np.sqrt(((values - mean) ** 2 * weights).sum() / (count - 1)) if count > 1 else np.nan
+            stats[col] = {'mean': mean, 'median': median,
+                          'min': column_counts.index[0] if count else np.nan,
+                          'max': column_counts.index[-1] if count else np.nan,
+                          'std': std, 'q1': q1, 'q3': q3, 'mode': _mode(column_counts)[0]}
+        elif kind == 'boolean':
+            stats[col] = {'count': count, 'mean': column_counts.get(True, 0) / count if count else np.nan,
+                          'mode': _mode(column_counts)[0]}
+        elif kind == 'datetime':
+            ticks = column_counts.index.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            median = pd.Timestamp(int(_quantiles_from_counts(ticks, column_counts.to_numpy(), [0.5])[0])) \
+                if count else pd.NaT
+            stats[col] = {'count': count, 'min': column_counts.index[0] if count else pd.NaT,
+                          'max': column_counts.index[-1] if count else pd.NaT, 'median': median,
+                          'mode': _mode(column_counts)[0]}
+        else:
+            mode, freq = _mode(column_counts)
+            stats[col] = {'count': count, 'unique': len(column_counts), 'mode': mode, 'freq': freq}
     return stats
 
+def binned_counts(df, x_column, y_column, bins=256):
+    """
+    Counts the rows of a DataFrame on a 2D grid over two numeric columns.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        x_column (str): The column binned along the first axis.
+        y_column (str): The column binned along the second axis.
+        bins (int, optional): Number of bins per axis. Defaults to 256.
+
+    Returns:
+        tuple: The counts, an array of shape ``(bins, bins)`` indexed by x bin then y bin, and the x and y bin
+            limits as ``(low, high)`` pairs.
+    """
+    df = _frame(df)
+    if isinstance(df, pd.DataFrame):
+        x = df[x_column].to_numpy(dtype=float)
+        y = df[y_column].to_numpy(dtype=float)
+        limits = [(np.nanmin(x), np.nanmax(x)), (np.nanmin(y), np.nanmax(y))]
+        counts, _, _ = np.histogram2d(x, y, bins=bins, range=_widen(limits))
+        return counts, limits[0], limits[1]
+    limits = [tuple(pair) for pair in df.minmax([x_column, y_column])]
+    counts = df.count(binby=[x_column, y_column], limits=_widen(limits), shape=bins)
+    return counts, limits[0], limits[1]
+
+
+def _widen(limits):
+    # A column holding a single value still needs a bin of non-zero width.
+    return [(low, high) if high > low else (low - 0.5, high + 0.5) for low, high in limits]
+
+
+def box_summary(df, column, whis=1.5):
+    """
+    Computes the statistics drawn by a box plot without collecting the values.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        column (str): The numeric column.
+        whis (float, optional): Whisker reach in interquartile ranges beyond the quartiles. Defaults to 1.5.
+
+    Returns:
+        dict: ``med``, ``q1``, ``q3``, ``whislo``, ``whishi``, ``mean`` and ``fliers`` (the number of values
+            beyond the whiskers), in the layout ``matplotlib.axes.Axes.bxp`` expects. Quartiles are approximate
+            for vaex DataFrames.
+    """
+    df = _frame(df)
+    if isinstance(df, pd.DataFrame):
+        values = df[column].dropna()
+        q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+        low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+        inside = values[values.between(low, high)]
+        return {'med': median, 'q1': q1, 'q3': q3, 'whislo': inside.min(), 'whishi': inside.max(),
+                'mean': values.mean(), 'fliers': int(len(values) - len(inside))}
+
+    q1, median, q3 = df.percentile_approx(column, [25, 50, 75])
+    low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+    inside = (df[column] >= low) & (df[column] <= high)
+    tasks = [df.min(column, selection=inside, delay=True), df.max(column, selection=inside, delay=True),
+             df.mean(column, delay=True), df.count(column, delay=True), df.count(column, selection=inside, delay=True)]
+    df.execute()
+    whislo, whishi, mean, total, kept = [task.get() for task in tasks]
+    return {'med': median, 'q1': q1, 'q3': q3, 'whislo': whislo, 'whishi': whishi, 'mean': mean,
+            'fliers': int(total - kept)}
+
+
+def top_k_counts(df, column, k=10, other_label='Other'):
+    """
+    Counts the most frequent values of a column and folds the remaining ones into one bucket.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        column (str): The column to count.
+        k (int, optional): Number of values kept. Defaults to 10.
+        other_label (str, optional): Label of the bucket holding all other values. Defaults to 'Other'.
+
+    Returns:
+        pd.Series: Occurrences of the ``k`` most frequent values, most frequent first, followed by the bucket
+            when there are more than ``k`` distinct values.
+    """
+    df = _frame(df)
+    counts = df[column].value_counts()
+    top = counts.iloc[:k]
+    if len(counts) > k:
+        top = pd.concat([top, pd.Series([counts.iloc[k:].sum()], index=[other_label])])
+    return top
+
+
+def stratified_sample(df, columns, n=5000, by=None, seed=0):
+    """
+    Draws a sample of rows, allocating it across the values of a stratum column in proportion to their size.
+
+    Every stratum keeps at least one row, so rare groups still show up in the sample.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        columns (list): The columns to return.
+        n (int, optional): Approximate sample size. Defaults to 5000.
+        by (str, optional): The stratum column, also returned. Defaults to None (uniform sample).
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The sampled rows, in their original order.
+    """
+    df = _frame(df)
+    columns = list(columns) + ([by] if by is not None and by not in columns else [])
+    total = len(df)
+    rng = np.random.default_rng(seed)
+    if total <= n:
+        positions = np.arange(total)
+    elif by is None:
+        positions = np.sort(rng.choice(total, size=n, replace=False))
+    else:
+        labels = df[by].to_numpy()
+        codes, _ = pd.factorize(labels, use_na_sentinel=False)
+        sizes = np.bincount(codes)
+        quotas = np.minimum(sizes, np.maximum(1, np.round(sizes * n / total).astype(np.int64)))
+        # Shuffle, group the shuffled rows by stratum, and keep the first rows of every group.
+        order = rng.permutation(total)
+        order = order[np.argsort(codes[order], kind='stable')]
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        grouped = codes[order]
+        positions = np.sort(order[np.arange(total) - starts[grouped] < quotas[grouped]])
+
+    if isinstance(df, pd.DataFrame):
+        return df[columns].iloc[positions]
+    return df[columns].take(positions).to_pandas_df()
+
+
 def plot_distribution(df, column_name):
     """
     Plots the distribution of a specified column in the DataFrame.
 
     Args:
-        df (vaex.DataFrame): The DataFrame containing the data.
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
         column_name (str): The name of the column to plot.
     """
-    validate_data(df)
-    df.viz.histogram(column_name, show=True, figsize=(10, 5))
+    df = validate_data(df)
+    to_vaex(df).viz.histogram(column_name, show=True, figsize=(10, 5))
 
-def plot_boxplot(df, column_name):
+def plot_boxplot(df, column_name, whis=1.5):
     """
     Plots a boxplot for a specified column in the DataFrame.
 
+    Only the five-number summary is computed from the data, see ``box_summary``; outliers are reported as a
+    count in the title instead of being drawn one by one.
+
     Args:
-        df (vaex.DataFrame): The DataFrame containing the data.
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
         column_name (str): The name of the column to plot.
+        whis (float, optional): Whisker reach in interquartile ranges. Defaults to 1.5.
     """
-    validate_data(df)
-    sns.boxplot(x=df[column_name].values)  # Convert vaex series to numpy for visualization
-    plt.title(f'Box plot for {column_name}')
+    df = validate_data(df)
+    stats = box_summary(df, column_name, whis)
+    fliers = stats.pop('fliers')
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bxp([dict(stats, label=column_name)], vert=False, showfliers=False, showmeans=True)
+    ax.set_title(f'Box plot for {column_name} ({fliers} outliers)')
     plt.show()
 
-def plot_scatter(df, x_column, y_column):
-    validate_data(df)
-    df.plot(x_column, y_column, kind='scatter', figsize=(10, 5))
+def plot_scatter(df, x_column, y_column, bins=256):
+    """
+    Plots the density of two numeric columns against each other.
+
+    The rows are counted on a ``bins`` x ``bins`` grid (see ``binned_counts``) and the grid is drawn on a
+    logarithmic color scale, so the plot costs the same for any number of rows.
 
-def plot_pie_chart(df, column_name):
-    validate_data(df)
-    counts = df[column_name].value_counts().tolist()
-    labels = df[column_name].unique().tolist()
-    plt.pie(counts, labels=labels, autopct='%1.1f%%')
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        x_column (str): The column on the horizontal axis.
+        y_column (str): The column on the vertical axis.
+        bins (int, optional): Number of bins per axis. Defaults to 256.
+    """
+    df = validate_data(df)
+    counts, x_limits, y_limits = binned_counts(df, x_column, y_column, bins)
+    fig, ax = plt.subplots(figsize=(10, 5))
+    image = ax.imshow(np.log1p(counts.T), origin='lower', aspect='auto', cmap='viridis',
+                      extent=(*x_limits, *y_limits))
+    fig.colorbar(image, ax=ax, label='log(1 + rows)')
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+    plt.show()
+
+def plot_pie_chart(df, column_name, k=10):
+    """
+    Plots the shares of the most frequent values of a column, with all other values in one slice.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        column_name (str): The name of the column to plot.
+        k (int, optional): Number of values with their own slice. Defaults to 10.
+    """
+    df = validate_data(df)
+    counts = top_k_counts(df, column_name, k)
+    plt.pie(counts.to_numpy(), labels=[str(label) for label in counts.index], autopct='%1.1f%%')
     plt.title(f'Pie chart for {column_name}')
     plt.show()
 
 def plot_column_trends(df, column, time_column):
-    validate_data(df)
+    if isinstance(df, pd.Series):
+        # A trend from column_trends_over_time: one value per time bucket.
+        df = df.rename(column).rename_axis(time_column).reset_index()
+    df = validate_data(df)
     df.plot(time_column, column, figsize=(10, 5))
 
-def plot_heatmap(df):
-    validate_data(df)
-    correlation_matrix = df.corr()
+def plot_heatmap(df, method='pearson', matrix=None, workers=None):
+    """
+    Plots the correlation matrix of the numeric columns of the DataFrame, see ``correlation.correlation_matrix``.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        method (str, optional): Either 'pearson' or 'spearman'. Defaults to 'pearson'.
+        matrix (pd.DataFrame, optional): A correlation matrix computed before, e.g. cached per data version.
+            Defaults to None (computed here).
+        workers (int, optional): Number of worker processes for the correlation. Defaults to None.
+    """
+    if matrix is None:
+        df = validate_data(df)
+        matrix = correlation_matrix(df, method=method, workers=workers)
     plt.figure(figsize=(12, 9))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
+    # Cell labels are unreadable and slow to draw on wide tables.
+    sns.heatmap(matrix, annot=len(matrix) <= 20, cmap='coolwarm', vmin=-1, vmax=1)
     plt.title('Correlation Heatmap')
     plt.show()
 
-def plot_pairplots(df, columns):
-    validate_data(df)
-    df_pandas = df[columns].to_pandas_df()  # Convert selected columns to pandas DataFrame
-    sns.pairplot(df_pandas)
+def plot_pairplots(df, columns, n=5000, by=None):
+    """
+    Plots pairwise relationships of columns on a stratified sample of the rows, see ``stratified_sample``.
+
+    Args:
+        df (pd.DataFrame, vaex.DataFrame or ArrowDataset): The DataFrame containing the data.
+        columns (list): The columns to plot.
+        n (int, optional): Approximate number of sampled rows. Defaults to 5000.
+        by (str, optional): Column to stratify the sample on, also used to color the points. Defaults to None.
+    """
+    df = validate_data(df)
+    sample = stratified_sample(df, columns, n=n, by=by)
+    sns.pairplot(sample, vars=list(columns), hue=by)
     plt.show()
@@ -0,0 +1,181 @@
+import atexit
+import os
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+LOG_COLUMNS = ["timestamp", "action", "user", "details"]
+
+# File-backed logs still open. The set holds them weakly, so registering a log does not keep it alive.
+_open_logs = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_logs():
+    for log in list(_open_logs):
+        log.flush()
+
+
+def _matching(log, user=None, action=None, since=None, until=None):
+    """
+    Filters logged actions.
+
+    Args:
+        log (pd.DataFrame): Actions in ``LOG_COLUMNS`` layout.
+        user (str, optional): Only keep actions of this user. Defaults to None.
+        action (str, optional): Only keep actions of this kind. Defaults to None.
+        since (str or pd.Timestamp, optional): Only keep actions at or after this time. Defaults to None.
+        until (str or pd.Timestamp, optional): Only keep actions at or before this time. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The matching actions.
+    """
+    mask = np.ones(len(log), dtype=bool)
+    if user is not None:
+        mask &= (log["user"] == user).to_numpy()
+    if action is not None:
+        mask &= (log["action"] == action).to_numpy()
+    if since is not None:
+        mask &= (log["timestamp"] >= pd.Timestamp(since)).to_numpy()
+    if until is not None:
+        mask &= (log["timestamp"] <= pd.Timestamp(until)).to_numpy()
+    return log if mask.all() else log[mask].reset_index(drop=True)
+
+
+class AuditLog:
+    """
+    An append-only log of user actions.
+
+    Actions are written into preallocated columnar buffers. A full buffer is flushed as one batch, either to an
+    append-only JSON Lines file or, without a file, to a list of in-memory batches. A DataFrame is only built
+    when the log is read. A file-backed log also flushes on ``close``, when it is garbage collected and when the
+    interpreter exits, so no buffered action is lost.
+    """
+
+    def __init__(self, path=None, batch_size=10_000, max_entries=None):
+        """
+        Initializes the log.
+
+        Args:
+            path (str, optional): JSON Lines file the batches are appended to. Defaults to None (kept in memory).
+            batch_size (int, optional): Number of actions buffered before a flush. Defaults to 10000.
+            max_entries (int, optional): For an in-memory log, the number of most recent actions to keep, older
+                batches are dropped. Defaults to None (keep everything).
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.batches = []
+        self._size = 0
+        # time.time_ns() is much cheaper than pd.Timestamp.now(); the offset turns it into local wall time.
+        self._clock_offset = pd.Timestamp.now().value - time.time_ns()
+        self._allocate()
+        if path is not None:
+            _open_logs.add(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Flushes the buffered actions and stops flushing at interpreter exit. The log can still be appended to.
+        """
+        self.flush()
+        _open_logs.discard(self)
+
+    def __del__(self):
+        if self.path is not None:
+            self.flush()
+
+    def _allocate(self):
+        self._timestamps = np.empty(self.batch_size, dtype='int64')
+        self._actions = np.empty(self.batch_size, dtype=object)
+        self._users = np.empty(self.batch_size, dtype=object)
+        self._details = np.empty(self.batch_size, dtype=object)
+        self._position = 0
+
+    def append(self, action, user, details):
+        """
+        Records an action.
+
+        Args:
+            action (str): The action performed.
+            user (str): The user who performed the action.
+            details (str): Additional details about the action.
+        """
+        position = self._position
+        self._timestamps[position] = time.time_ns() + self._clock_offset
+        self._actions[position] = action
+        self._users[position] = user
+        self._details[position] = details
+        self._position = position + 1
+        if self._position == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered actions out as one batch.
+        """
+        if not self._position:
+            return
+        batch = self._buffered()
+        if self.path is not None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as handle:
+                # Nanoseconds since the epoch, as ``to_frame`` reads them back.
+                batch = batch.assign(timestamp=batch['timestamp'].astype('int64'))
+                handle.write(batch.to_json(orient='records', lines=True, default_handler=str))
+                handle.write('\n')
+        else:
+            self.batches.append(batch)
+            self._size += len(batch)
+            while self.max_entries is not None and self._size - len(self.batches[0]) >= self.max_entries:
+                self._size -= len(self.batches.pop(0))
+        self._allocate()
+
+    def _buffered(self):
+        size = self._position
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(self._timestamps[:size], unit='ns'),
+            "action": self._actions[:size],
+            "user": self._users[:size],
+            "details": self._details[:size],
+        }, columns=LOG_COLUMNS)
+
+    def to_frame(self, user=None, action=None, since=None, until=None):
+        """
+        Builds a DataFrame of the logged actions, optionally filtered.
+
+        Args:
+            user (str, optional): Only return actions of this user. Defaults to None.
+            action (str, optional): Only return actions of this kind. Defaults to None.
+            since (str or pd.Timestamp, optional): Only return actions at or after this time. Defaults to None.
+            until (str or pd.Timestamp, optional): Only return actions at or before this time. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The matching actions in logging order.
+        """
+        if self.path is None:
+            log = pd.concat(self.batches + [self._buffered()], ignore_index=True) if self.batches else \
+                self._buffered()
+            if self.max_entries is not None:
+                log = log.iloc[-self.max_entries:].reset_index(drop=True)
+            return _matching(log, user, action, since, until)
+
+        frames = []
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            # The file is read a batch at a time, and only the matching actions of each batch are kept.
+            with pd.read_json(self.path, lines=True, convert_dates=False, dtype=False,
+                              chunksize=self.batch_size) as reader:
+                for stored in reader:
+                    stored["timestamp"] = pd.to_datetime(stored["timestamp"], unit='ns')
+                    frames.append(_matching(stored[LOG_COLUMNS], user, action, since, until))
+        frames.append(_matching(self._buffered(), user, action, since, until))
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+
+from data_model import read_file_chunks
+from parallel_backend import map_shards, resolve_workers
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+
+
+class CorrelationAccumulator:
+    """
+    Streams chunks of numeric columns into the sums a Pearson correlation matrix is built from.
+
+    For every pair of columns it keeps the number of rows where both are present, their sums, sums of squares
+    and cross-product over those rows, so missing values are excluded pairwise, as in ``pd.DataFrame.corr``.
+    Values are shifted by the column means of the first chunk before summing, which keeps the sums small and
+    avoids the cancellation the textbook one-pass formula suffers from when the mean is large compared to the
+    spread.
+    """
+
+    def __init__(self, columns):
+        """
+        Initializes empty sums.
+
+        Args:
+            columns (list): The column names, in the order of the chunk columns.
+        """
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.shift = None
+        self.count = np.zeros((size, size))
+        self.sums = np.zeros((size, size))
+        self.squares = np.zeros((size, size))
+        self.products = np.zeros((size, size))
+
+    def update(self, chunk):
+        """
+        Adds a chunk of rows.
+
+        Args:
+            chunk (pd.DataFrame or np.ndarray): Rows of the columns, in order.
+
+        Returns:
+            CorrelationAccumulator: The accumulator itself.
+        """
+        values = chunk.to_numpy(dtype=float, na_value=np.nan) if isinstance(chunk, pd.DataFrame) else \
+            np.asarray(chunk, dtype=float)
+        if not len(values):
+            return self
+        present = ~np.isnan(values)
+        if self.shift is None:
+            counts = present.sum(axis=0)
+            self.shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+        values = values - self.shift
+
+        if present.all():
+            # Without missing values every pair covers every row, and the pair sums are plain column sums.
+            self.count += len(values)
+            self.sums += values.sum(axis=0)[:, None]
+            self.squares += (values ** 2).sum(axis=0)[:, None]
+            self.products += values.T @ values
+            return self
+        weights = present.astype(float)
+        values = np.where(present, values, 0.0)
+        self.count += weights.T @ weights
+        # Entry (i, j) sums column i over the rows where column j is present.
+        self.sums += values.T @ weights
+        self.squares += (values ** 2).T @ weights
+        self.products += values.T @ values
+        return self
+
+    def correlation(self, min_periods=1):
+        """
+        Computes the Pearson correlation matrix of the rows seen.
+
+        Args:
+            min_periods (int, optional): Minimum number of rows with both values for a pair to get a
+                coefficient. Defaults to 1.
+
+        Returns:
+            pd.DataFrame: The correlation matrix, NaN for pairs with too few rows or a constant column.
+        """
+        count = self.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = self.products - self.sums * self.sums.T / count
+            variance = self.squares - self.sums ** 2 / count
+            matrix = covariance / np.sqrt(variance * variance.T)
+        matrix = np.clip(matrix, -1, 1)
+        matrix[(count < max(min_periods, 1)) | ~(variance > 0) | ~(variance.T > 0)] = np.nan
+        diagonal = np.diag_indices_from(matrix)
+        matrix[diagonal] = np.where(np.isnan(matrix[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+
+def numeric_columns(df):
+    """
+    Lists the numeric (including boolean) columns of a pandas or vaex DataFrame.
+
+    Args:
+        df (pd.DataFrame or vaex.DataFrame): The DataFrame.
+
+    Returns:
+        list: The column names, in order.
+    """
+    if isinstance(df, pd.DataFrame):
+        return [column for column in df.columns if pd.api.types.is_numeric_dtype(df[column].dtype)]
+    return [column for column in df.column_names if df[column].dtype.is_numeric or df[column].dtype.kind == 'b']
+
+
+def correlation_matrix(df, method='pearson', columns=None, chunksize=100_000, workers=None, min_periods=1):
+    """
+    Computes the correlation matrix of the numeric columns of a DataFrame.
+
+    The rows are streamed through a ``CorrelationAccumulator`` chunk by chunk, so only one chunk of the columns
+    is converted to floats at a time. Missing values are excluded pairwise. With several workers the columns
+    are split into blocks and every pair of blocks is computed in its own process.
+
+    ``spearman`` correlates the ranks of the values (ties get their average rank). Each column is ranked over
+    all its present values, so with missing values the coefficients can differ slightly from pandas, which
+    re-ranks every pair over the rows where both are present.
+
+    Args:
+        df (pd.DataFrame or vaex.DataFrame): The DataFrame.
+        method (str, optional): Either 'pearson' or 'spearman'. Defaults to 'pearson'.
+        columns (list, optional): The columns to correlate. Defaults to None (all numeric columns).
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        workers (int, optional): Number of worker processes, -1 for one per CPU core. Defaults to None (run in
+            this process).
+        min_periods (int, optional): Minimum number of rows with both values for a pair to get a coefficient.
+            Defaults to 1.
+
+    Returns:
+        pd.DataFrame: The correlation matrix.
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method: {method}")
+    columns = numeric_columns(df) if columns is None else list(columns)
+    if method == 'spearman':
+        df = _ranks(df, columns)
+    elif not isinstance(df, pd.DataFrame):
+        return _correlate_chunks((chunk for _, _, chunk in df.to_pandas_df(columns, chunk_size=chunksize)),
+                                 columns, min_periods)
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(columns) < 2:
+        return _correlate(df[columns], chunksize, min_periods)
+
+    blocks = [list(block) for block in np.array_split(np.array(columns, dtype=object), min(workers, len(columns)))]
+    pairs = [(first, second) for first in range(len(blocks)) for second in range(first, len(blocks))]
+    shards = [(blocks[first] + (blocks[second] if second != first else []), (chunksize, min_periods))
+              for first, second in pairs]
+    matrix = pd.DataFrame(np.nan, index=columns, columns=columns)
+    for (first, second), part in zip(pairs, map_shards(df, _correlate, shards, workers)):
+        matrix.loc[blocks[first], blocks[second]] = part.loc[blocks[first], blocks[second]]
+        matrix.loc[blocks[second], blocks[first]] = part.loc[blocks[second], blocks[first]]
+    return matrix
+
+
+def correlation_from_file(path, columns, chunksize=100_000, min_periods=1, file_format=None, **read_kwargs):
+    """
+    Computes the Pearson correlation matrix of columns of a file too large to load, in one streaming pass.
+
+    Args:
+        path (str): Path to a CSV or Parquet file.
+        columns (list): The numeric columns.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        min_periods (int, optional): Minimum number of rows with both values for a pair to get a coefficient.
+            Defaults to 1.
+        file_format (str, optional): Either ``'csv'`` or ``'parquet'``. Defaults to None (guessed from the suffix).
+        **read_kwargs: Extra arguments passed to ``pd.read_csv``.
+
+    Returns:
+        pd.DataFrame: The correlation matrix.
+    """
+    columns = list(columns)
+    chunks = read_file_chunks(path, chunksize, columns=columns, file_format=file_format, **read_kwargs)
+    return _correlate_chunks((chunk[columns].apply(pd.to_numeric, errors='coerce') for chunk in chunks), columns,
+                             min_periods)
+
+
+def _correlate(df, chunksize, min_periods):
+    return _correlate_chunks((df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize)),
+                             list(df.columns), min_periods)
+
+
+def _correlate_chunks(chunks, columns, min_periods):
+    accumulator = CorrelationAccumulator(columns)
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.correlation(min_periods)
+
+
+def _ranks(df, columns):
+    """
+    Ranks every column over its present values, one column at a time.
+
+    Args:
+        df (pd.DataFrame or vaex.DataFrame): The DataFrame.
+        columns (list): The columns to rank.
+
+    Returns:
+        pd.DataFrame: The average ranks, missing where the value is missing.
+    """
+    if isinstance(df, pd.DataFrame):
+        return pd.DataFrame({column: df[column].rank() for column in columns}, index=df.index)
+    return pd.DataFrame({column: pd.Series(df[column].to_numpy()).rank() for column in columns})
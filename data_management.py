@@ -1,60 +1,370 @@
-import hashlib
 import logging
 import pandas as pd
-from tqdm import tqdm
+
+from audit_log import AuditLog
+from data_model import HISTORY_COLUMNS, filter_history
+from memory_optimizer import optimize_dtypes
+from normalization import DEFAULT_NORMALIZERS, normalize_column
+from result_cache import ResultCache
+from survivorship import build_golden_records
+from version_store import VersionStore
 
 logger = logging.getLogger(__name__)
 
+
+def _key_list(key):
+    return [key] if isinstance(key, str) else list(key)
+
+
+def _build_key_index(df, key):
+    """
+    Build a hashed index over the key columns of a dataframe.
+
+    Args:
+        df (pd.DataFrame): The dataframe to index.
+        key (list): The key columns.
+
+    Returns:
+        pd.Index: The key values, one entry per row. Its hash table is built on first lookup and reused after.
+    """
+    return pd.Index(df[key[0]]) if len(key) == 1 else pd.MultiIndex.from_frame(df[key])
+
+
+def _can_merge_indexed(left, left_index, right, right_index, key):
+    """
+    Tell whether two dataframes can be joined through their key indexes.
+
+    ``pd.merge`` coerces key columns of different dtypes to a common one (or refuses to join them), and the
+    result's key dtype depends on the join type. Only keys that are unique and of the same dtypes on both sides
+    take the indexed path, so its result is the one ``pd.merge`` would give.
+
+    Args:
+        left (pd.DataFrame): The left dataframe.
+        left_index (pd.Index): Key index of ``left``.
+        right (pd.DataFrame): The right dataframe.
+        right_index (pd.Index): Key index of ``right``.
+        key (list): The key columns.
+
+    Returns:
+        bool: True if ``_merge_indexed`` gives the result of ``pd.merge``.
+    """
+    return left_index.is_unique and right_index.is_unique and left[key].dtypes.equals(right[key].dtypes)
+
+
+def _merge_indexed(left, left_index, right, right_index, key, how, suffixes=('_x', '_y')):
+    """
+    Join two dataframes whose keys are unique through their prebuilt key indexes.
+
+    The result matches ``pd.merge(left, right, on=key, how=how)`` when the key columns have the same dtypes on
+    both sides, see ``_can_merge_indexed``.
+
+    Args:
+        left (pd.DataFrame): The left dataframe.
+        left_index (pd.Index): Unique key index of ``left``.
+        right (pd.DataFrame): The right dataframe.
+        right_index (pd.Index): Unique key index of ``right``.
+        key (list): The key columns.
+        how (str): One of 'outer', 'inner', 'left' or 'right'.
+        suffixes (tuple, optional): Suffixes for overlapping non-key columns.
+
+    Returns:
+        tuple: The merged dataframe and its key index.
+    """
+    if how == 'outer':
+        # Like pd.merge, an outer join sorts the keys; union skips the sort when both indexes are equal.
+        target = left_index.union(right_index)
+        try:
+            target = target.sort_values(na_position='last')
+        except TypeError:
+            pass
+    elif how == 'inner':
+        target = left_index.intersection(right_index, sort=False)
+    elif how == 'left':
+        target = left_index
+    elif how == 'right':
+        target = right_index
+    else:
+        raise ValueError(f"Unknown join type: {how}")
+
+    left_values = left.drop(columns=key).set_axis(left_index).reindex(target)
+    right_values = right.drop(columns=key).set_axis(right_index).reindex(target)
+    overlap = left_values.columns.intersection(right_values.columns)
+    if len(overlap):
+        left_values = left_values.rename(columns={col: f"{col}{suffixes[0]}" for col in overlap})
+        right_values = right_values.rename(columns={col: f"{col}{suffixes[1]}" for col in overlap})
+
+    key_values = target.to_frame(index=False, name=key) if isinstance(target, pd.MultiIndex) else \
+        pd.DataFrame({key[0]: target})
+    key_values.index = target
+    left_names = [col if col in key else (f"{col}{suffixes[0]}" if col in overlap else col) for col in left.columns]
+    merged = pd.concat([key_values, left_values, right_values], axis=1)[left_names + list(right_values.columns)]
+    return merged.reset_index(drop=True), target.rename(None) if not isinstance(target, pd.MultiIndex) else target
+
+
 class UnifiedDataManager:
-    def __init__(self):
+    def __init__(self, history_path=None, version_memory_budget=None, version_spill_dir=None, log_path=None,
+                 cache_size=128):
+        """
+        Initializes the manager.
+
+        Args:
+            history_path (str, optional): Directory of a ``HistoryStore`` that receives the change history instead
+                of ``history_data``. Defaults to None (history is kept in memory).
+            version_memory_budget (int, optional): Bytes of saved versions kept in memory; older blocks spill to
+                disk. Defaults to None (unbounded).
+            version_spill_dir (str, optional): Directory for spilled version blocks. Defaults to a temporary
+                directory.
+            log_path (str, optional): JSON Lines file the action log is flushed to. Defaults to None (kept in
+                memory).
+            cache_size (int, optional): Number of results kept by ``cached``. Defaults to 128.
+        """
         self.tables = {}
-        self.log = pd.DataFrame(columns=["timestamp", "action", "user", "details"])
+        self.key_indexes = {}
+        self.last_merge_plan = []
+        self.normalization_report = {}
+        self.memory_reports = {}
+        self.lineage = {}
+        self.table_versions = {}
+        self.results = ResultCache(maxsize=cache_size)
+        self.log = AuditLog(path=log_path)
         self.versions = []
+        self.version_store = VersionStore(memory_budget=version_memory_budget, spill_dir=version_spill_dir)
         self.main_data = pd.DataFrame()
-        self.history_data = pd.DataFrame(columns=['column_name', 'old_value', 'new_value', 'timestamp'])
+        self.history_data = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self.history_store = None
+        if history_path is not None:
+            from history_store import HistoryStore
+
+            self.history_store = HistoryStore(history_path)
 
-    def load_table(self, table_name, df):
+    def load_table(self, table_name, df, keys=None, optimize=False):
         """
         Load a table into the manager.
 
+        Replacing a table drops the key indexes and cached results computed from its previous contents.
+
         Args:
             table_name (str): The name of the table to load.
             df (pd.DataFrame): The dataframe containing the table's data.
+            keys (list, optional): Keys (column names or lists of column names) to index right away. Other keys
+                are indexed on first use.
+            optimize (bool, optional): Store the table with compact dtypes, see ``memory_optimizer``. The
+                per-column memory report is kept in ``memory_reports[table_name]``. Defaults to False.
+        """
+        if optimize:
+            self.tables[table_name], self.memory_reports[table_name] = optimize_dtypes(df)
+        else:
+            self.tables[table_name] = df.copy()
+        for cached in [cached for cached in self.key_indexes if cached[0] == table_name]:
+            del self.key_indexes[cached]
+        self.table_versions[table_name] = self.table_versions.get(table_name, 0) + 1
+        self.results.invalidate(table_name)
+        for key in keys or []:
+            self.get_key_index(table_name, key)
+
+    def get_key_index(self, table_name, key):
+        """
+        Get the cached key index of a table, building it on first use.
+
+        Args:
+            table_name (str): The name of the table.
+            key (str or list): The key column(s).
+
+        Returns:
+            pd.Index: The key values of the table, one entry per row.
         """
-        self.tables[table_name] = df.copy()
+        key = _key_list(key)
+        cache_key = (table_name, tuple(key))
+        if cache_key not in self.key_indexes:
+            self.key_indexes[cache_key] = _build_key_index(self.tables[table_name], key)
+        return self.key_indexes[cache_key]
 
-    def merge_tables_on_key(self, table1_name, table2_name, key):
+    def cached(self, table_name, func, *args, **kwargs):
+        """
+        Call ``func(table, *args, **kwargs)`` on a table, reusing the result of an identical earlier call as long
+        as the table was not reloaded since.
+
+        Results are keyed on the table name, its version in ``table_versions`` and the call parameters, and kept
+        in a bounded LRU cache. They are shared between callers, so they must not be modified.
+
+        Args:
+            table_name (str): The name of the table.
+            func (callable): An analytics, validation or profiling function taking the data first.
+            *args: Further positional arguments of ``func``.
+            **kwargs: Keyword arguments of ``func``.
+
+        Returns:
+            The result of ``func``.
+        """
+        return self.results.get_or_compute(table_name, self.table_versions[table_name], func,
+                                           self.tables[table_name], *args, **kwargs)
+
+    def merge_tables_on_key(self, table1_name, table2_name, key, how='outer'):
         """
         Merge two tables on a common key.
 
+        When the key is unique in both tables and has the same dtypes in both, the join runs on their cached
+        key indexes; otherwise it falls back to ``pd.merge``. Either way the result is the one of ``pd.merge``.
+
         Args:
             table1_name (str): The name of the first table.
             table2_name (str): The name of the second table.
-            key (str): The key to merge on.
+            key (str or list): The key to merge on.
+            how (str, optional): Type of join. Defaults to 'outer'.
 
         Returns:
             pd.DataFrame: The merged dataframe, or None if either table name is not found.
         """
         if table1_name in self.tables and table2_name in self.tables:
-            return pd.merge(self.tables[table1_name], self.tables[table2_name], on=key, how='outer')
+            left_index = self.get_key_index(table1_name, key)
+            right_index = self.get_key_index(table2_name, key)
+            if _can_merge_indexed(self.tables[table1_name], left_index, self.tables[table2_name], right_index,
+                                  _key_list(key)):
+                return _merge_indexed(self.tables[table1_name], left_index, self.tables[table2_name], right_index,
+                                      _key_list(key), how)[0]
+            return pd.merge(self.tables[table1_name], self.tables[table2_name], on=key, how=how)
         else:
             return None
 
-    def clean_strings(self, df, columns):
+    def merge_tables(self, table_names, key, how='outer'):
+        """
+        Merge several tables on a common key.
+
+        The joins are planned greedily: the two smallest inputs are joined first and the intermediate result goes
+        back into the pool, so large intermediate results are produced as late as possible. Non-key columns that
+        occur in more than one table are suffixed with ``_<table name>``.
+
+        Args:
+            table_names (list): The names of the tables to merge.
+            key (str or list): The key to merge on.
+            how (str, optional): Either 'outer' or 'inner'; the plan may reorder the joins, so only these
+                order-independent join types are accepted. Defaults to 'outer'.
+
+        Returns:
+            pd.DataFrame: The merged dataframe, or None if a table name is not found. The executed plan is kept
+                in ``last_merge_plan``.
+
+        Raises:
+            ValueError: If ``how`` is not 'outer' or 'inner'.
+        """
+        if how not in ('outer', 'inner'):
+            raise ValueError("merge_tables only plans 'outer' and 'inner' joins.")
+        if any(name not in self.tables for name in table_names):
+            return None
+        key = _key_list(key)
+
+        column_counts = pd.Series([col for name in table_names for col in self.tables[name].columns
+                                   if col not in key]).value_counts()
+        shared = set(column_counts[column_counts > 1].index)
+        pool = []
+        for name in table_names:
+            frame = self.tables[name]
+            if shared.intersection(frame.columns):
+                frame = frame.rename(columns={col: f"{col}_{name}" for col in shared.intersection(frame.columns)})
+            pool.append({'name': name, 'frame': frame, 'index': self.get_key_index(name, key)})
+
+        def estimate(left, right):
+            if how == 'inner':
+                return min(len(left['index']), len(right['index']))
+            return len(left['index']) + len(right['index'])
+
+        self.last_merge_plan = []
+        while len(pool) > 1:
+            pool.sort(key=lambda item: len(item['index']))
+            left, right = pool.pop(0), pool.pop(0)
+            if _can_merge_indexed(left['frame'], left['index'], right['frame'], right['index'], key):
+                frame, index = _merge_indexed(left['frame'], left['index'], right['frame'], right['index'], key, how)
+            else:
+                frame = pd.merge(left['frame'], right['frame'], on=key, how=how)
+                index = _build_key_index(frame, key)
+            self.last_merge_plan.append({'left': left['name'], 'right': right['name'],
+                                         'estimated_rows': estimate(left, right), 'rows': len(frame)})
+            pool.append({'name': f"({left['name']} + {right['name']})", 'frame': frame, 'index': index})
+
+        merged = pool[0]['frame']
+        ordered = list(key)
+        for name in table_names:
+            ordered += [f"{col}_{name}" if col in shared else col for col in self.tables[name].columns
+                        if col not in key]
+        return merged[ordered]
+
+    def clean_strings(self, df, columns, normalizers=DEFAULT_NORMALIZERS, as_category=False):
         """
         Clean and standardize string columns in a dataframe.
 
+        Only the distinct values of each column are normalized, see ``normalization.normalize_column``. The
+        per-column reports (distinct values before and after, and how many collapsed) are kept in
+        ``normalization_report``.
+
         Args:
             df (pd.DataFrame): The dataframe to clean.
             columns (list): The list of columns to standardize.
+            normalizers (tuple, optional): The normalizer chain. Defaults to stripping and lower-casing.
+            as_category (bool, optional): Store the cleaned columns as categoricals. Defaults to False.
 
         Returns:
             pd.DataFrame: The dataframe with cleaned and standardized string columns.
         """
+        self.normalization_report = {}
         for col in columns:
-            df[col] = df[col].str.strip().str.lower()
+            df[col], self.normalization_report[col] = normalize_column(df[col], normalizers, as_category)
         return df
 
+    def build_golden_records(self, table_name, clusters, rules=None, golden_table=None, **rule_options):
+        """
+        Consolidate clusters of duplicate rows of a table into golden records.
+
+        See ``survivorship.build_golden_records`` for the rules.
+
+        Args:
+            table_name (str): The name of the table.
+            clusters (str or pd.Series): The column of the table holding the cluster of every row, or a Series
+                aligned with the table's index, such as the clusters returned by ``RecordMatcher.match``.
+            rules (dict, optional): Survivorship rule per column. Defaults to None.
+            golden_table (str, optional): Also load the golden records as a table under this name and keep their
+                lineage in ``lineage[golden_table]``. Defaults to None.
+            **rule_options: ``default_rule``, ``timestamp_column``, ``source_column`` and ``source_priority``.
+
+        Returns:
+            tuple: The golden records indexed by cluster and their lineage (the source row of every field).
+        """
+        golden, lineage = build_golden_records(self.tables[table_name], clusters, rules, **rule_options)
+        if golden_table is not None:
+            self.load_table(golden_table, golden)
+            self.lineage[golden_table] = lineage
+        return golden, lineage
+
+    def append_history(self, changes):
+        """
+        Append change records to the history.
+
+        Args:
+            changes (pd.DataFrame): Change records in ``HISTORY_COLUMNS`` layout.
+        """
+        if self.history_store is not None:
+            self.history_store.append(changes)
+        elif self.history_data.empty:
+            self.history_data = changes.reset_index(drop=True)
+        else:
+            self.history_data = pd.concat([self.history_data, changes], ignore_index=True)
+
+    def get_history(self, column=None, since=None, until=None, change_type=None):
+        """
+        Get the change history, optionally narrowed down to one column, a time window or a change type.
+
+        Args:
+            column (str, optional): Only return changes of this column.
+            since (str or pd.Timestamp, optional): Only return changes at or after this time.
+            until (str or pd.Timestamp, optional): Only return changes at or before this time.
+            change_type (str, optional): Only return records of this change type.
+
+        Returns:
+            pd.DataFrame: The change records.
+        """
+        if self.history_store is not None:
+            return self.history_store.read(column=column, since=since, until=until, change_type=change_type)
+        return filter_history(self.history_data, column=column, since=since, until=until, change_type=change_type)
+
     def log_action(self, action, user, details):
         """
         Log an action performed by a user.
@@ -64,31 +374,54 @@ class UnifiedDataManager:
             user (str): The user who performed the action.
             details (str): Additional details about the action.
         """
-        self.log = self.log.append({
-            "timestamp": pd.Timestamp.now(),
-            "action": action,
-            "user": user,
-            "details": details
-        }, ignore_index=True)
+        self.log.append(action, user, details)
 
-    def get_log(self):
+    def flush_log(self):
         """
-        Get a copy of the action log.
+        Write the buffered actions of the action log out, e.g. to its JSON Lines file.
+        """
+        self.log.flush()
+
+    def close(self):
+        """
+        Flush the action log. A file-backed log is also flushed when the interpreter exits.
+        """
+        self.log.close()
+
+    def get_log(self, user=None, action=None, since=None, until=None):
+        """
+        Get the action log, optionally filtered by user, action and time.
+
+        Args:
+            user (str, optional): Only return actions of this user.
+            action (str, optional): Only return actions of this kind.
+            since (str or pd.Timestamp, optional): Only return actions at or after this time.
+            until (str or pd.Timestamp, optional): Only return actions at or before this time.
 
         Returns:
-            pd.DataFrame: A copy of the log dataframe.
+            pd.DataFrame: The logged actions.
         """
-        return self.log.copy()
+        return self.log.to_frame(user=user, action=action, since=since, until=until)
 
-    def save_version(self, df):
+    def save_version(self, df, parent=None):
         """
         Save a version of the dataframe.
 
+        The version is stored as content-addressed blocks, so only the blocks that differ from the ones already
+        stored take up memory.
+
         Args:
             df (pd.DataFrame): The dataframe to save.
+            parent (str, optional): Hash of the version this one derives from. Defaults to the last saved version.
+
+        Returns:
+            str: The hash of the saved version.
         """
-        version_hash = hashlib.md5(df.to_string().encode()).hexdigest()
-        self.versions.append({"data": df.copy(), "hash": version_hash, "timestamp": pd.Timestamp.now()})
+        if parent is None and self.versions:
+            parent = self.versions[-1]["hash"]
+        version_hash = self.version_store.save(df, parent=parent)
+        self.versions.append({"hash": version_hash, "parent": parent, "timestamp": pd.Timestamp.now()})
+        return version_hash
 
     def restore_version(self, version_hash):
         """
@@ -100,7 +433,4 @@ class UnifiedDataManager:
         Returns:
             pd.DataFrame: The restored dataframe, or None if not found.
         """
-        for version in self.versions:
-            if version["hash"] == version_hash:
-                return version["data"].copy()
-        return None
+        return self.version_store.restore(version_hash)
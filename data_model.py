@@ -1,32 +1,613 @@
+import bisect
+import logging
+import time
+
+import numpy as np
 import pandas as pd
-from tqdm import tqdm
+
+from memory_optimizer import optimize_dtypes
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['column_name', 'old_value', 'new_value', 'timestamp', 'change_type', 'row_key']
+
+
+def _changed_cells(old, new):
+    """
+    Compares two equally long columns cell by cell, ignoring cells that are missing on either side.
+
+    Args:
+        old (pd.Series): The stored values.
+        new (pd.Series): The incoming values, aligned by position with ``old``.
+
+    Returns:
+        np.ndarray: Boolean mask of the positions whose value changed.
+    """
+    valid = old.notna().to_numpy() & new.notna().to_numpy()
+    old_values, new_values = old.to_numpy(), new.to_numpy()
+    if old_values.dtype != new_values.dtype:
+        old_values, new_values = old.to_numpy(dtype=object), new.to_numpy(dtype=object)
+    changed = np.zeros(len(old), dtype=bool)
+    changed[valid] = old_values[valid] != new_values[valid]
+    return changed
+
+
+def hash_rows(data):
+    """
+    Hashes every row of a DataFrame, or every value of a Series, into a 64-bit fingerprint.
+
+    ``pd.util.hash_pandas_object`` hashes object values through their string form, so ``1`` and ``'1'`` get the
+    same hash. Object columns holding anything but strings are therefore hashed together with the type of every
+    value.
+
+    Args:
+        data (pd.DataFrame or pd.Series): The data to hash.
+
+    Returns:
+        np.ndarray: One uint64 fingerprint per row.
+    """
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    columns = [frame.iloc[:, j] for j in range(frame.shape[1])]
+    typed = [column.dtype == object and pd.api.types.infer_dtype(column, skipna=True) not in ('string', 'empty')
+             for column in columns]
+    if any(typed):
+        types = [column.map(type) for column, mixed in zip(columns, typed) if mixed]
+        frame = pd.concat(columns + types, axis=1, ignore_index=True)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def read_file_chunks(path, chunksize=100_000, columns=None, file_format=None, **read_kwargs):
+    """
+    Reads a CSV or Parquet file as a sequence of DataFrame chunks.
+
+    Args:
+        path (str): Path to the file.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        columns (list, optional): Columns to read. Defaults to all columns.
+        file_format (str, optional): Either ``'csv'`` or ``'parquet'``. Defaults to None (guessed from the suffix).
+        **read_kwargs: Extra arguments passed to ``pd.read_csv``.
+
+    Yields:
+        pd.DataFrame: The next chunk of at most ``chunksize`` rows.
+    """
+    if file_format is None:
+        file_format = 'parquet' if str(path).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif file_format == 'csv':
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns, **read_kwargs)
+    else:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+
+def filter_history(history, column=None, since=None, until=None, change_type=None):
+    """
+    Filters in-memory change records the same way ``HistoryStore.read`` filters stored ones.
+
+    Args:
+        history (pd.DataFrame): Change records in ``HISTORY_COLUMNS`` layout.
+        column (str, optional): Only keep changes of this column. Defaults to None.
+        since (str or pd.Timestamp, optional): Only keep changes at or after this time. Defaults to None.
+        until (str or pd.Timestamp, optional): Only keep changes at or before this time. Defaults to None.
+        change_type (str, optional): Only keep records of this change type. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The matching change records.
+    """
+    mask = pd.Series(True, index=history.index)
+    if column is not None:
+        mask &= history['column_name'] == column
+    if since is not None:
+        mask &= history['timestamp'] >= pd.Timestamp(since)
+    if until is not None:
+        mask &= history['timestamp'] <= pd.Timestamp(until)
+    if change_type is not None:
+        mask &= history['change_type'] == change_type
+    return history if mask.all() else history[mask]
+
+
+def _change_records(names, old_values, new_values, row_keys, change_type, timestamp):
+    # Explicit object Series, so that values made of strings and None are not inferred as a string column.
+    return pd.DataFrame({
+        'column_name': names,
+        'old_value': pd.Series(old_values, dtype=object),
+        'new_value': pd.Series(new_values, dtype=object),
+        'timestamp': pd.DatetimeIndex([timestamp] * len(names)),
+        'change_type': change_type,
+        'row_key': row_keys,
+    }, columns=HISTORY_COLUMNS)
+
+
 class DataModelV5:
     """
     A class representing the data model, including data loading and schema change handling.
     """
-    def __init__(self):
+    def __init__(self, progress_callback=None, history_path=None, max_replay_deltas=100_000, cache_size=128,
+                 max_rollups=8):
         """
         Initializes the DataModel with empty main and history dataframes.
+
+        Args:
+            progress_callback (callable, optional): Called as ``progress_callback(stage, metrics)`` while a load
+                is processed, where ``metrics`` is a dict with the counters gathered so far. Defaults to None.
+            history_path (str, optional): Directory of a ``HistoryStore`` that receives the change history instead
+                of ``history_data``. Defaults to None (history is kept in memory).
+            max_replay_deltas (int, optional): Upper bound on the number of history records ``as_of`` replays on
+                top of a snapshot checkpoint. Defaults to 100000.
+            cache_size (int, optional): Number of results kept by ``cached``. Defaults to 128.
+            max_rollups (int, optional): Number of time rollups kept up to date; registering more drops the least
+                recently used one. Defaults to 8.
         """
         self.main_data = pd.DataFrame()
-        self.history_data = pd.DataFrame(columns=['column_name', 'old_value', 'new_value', 'timestamp'])
+        self.history_data = pd.DataFrame(columns=HISTORY_COLUMNS)
+        self.history_store = None
+        if history_path is not None:
+            from history_store import HistoryStore
+
+            self.history_store = HistoryStore(history_path)
         self.previous_schema = None
+        self.progress_callback = progress_callback
+        self.last_load_metrics = {}
+        self.row_fingerprints = pd.Series(dtype='uint64', name='fingerprint')
+        self._fingerprint_columns = None
+        self.memory_report = None
+        self.last_change_set = None
+        self.max_replay_deltas = max_replay_deltas
+        self.checkpoints = []
+        self.loads = []
+        self._deltas_since_checkpoint = 0
+        self.data_version = 0
+        self.results = ResultCache(maxsize=cache_size)
+        self.rollups = []
+        self.max_rollups = max_rollups
 
-    def load_data(self, df):
+    def load_data(self, df, key=None, optimize=False):
         """
         Loads data into the model, handling schema changes and data differences.
 
+        Without a key, rows are compared by position and both frames must carry the same index. With a key,
+        rows are matched on the business key instead, so reordered, inserted and deleted rows are detected and
+        recorded as ``insert`` and ``delete`` changes next to the cell-level ``update`` changes. Cells that turn
+        missing or stop being missing are recorded as ``missing`` changes.
+
+        Every load hashes the incoming rows into 64-bit fingerprints kept in ``row_fingerprints``; only rows
+        whose fingerprint differs from the stored one are compared cell by cell.
+
         Args:
             df (pd.DataFrame): The DataFrame to load.
+            key (str or list, optional): Column(s) identifying a row. Defaults to None (positional comparison).
+            optimize (bool, optional): Store the data with compact dtypes, see ``memory_optimizer``. The dtypes
+                of the stored data are kept and only widened when the new values need it. The per-column memory
+                report is kept in ``memory_report``. Defaults to False.
+
+        Raises:
+            ValueError: If the frames cannot be compared positionally, or if the key is missing or not unique.
         """
+        if optimize:
+            # Keep the dtypes of the stored data, so the history and as_of see the same types across loads.
+            previous = self.main_data.dtypes.to_dict() if df.columns.equals(self.main_data.columns) else None
+            df, self.memory_report = optimize_dtypes(df, previous=previous)
+
         if self.main_data.empty or not df.columns.equals(self.main_data.columns):
-            self.main_data = df.copy()
+            self._reset(df.copy(), key)
             return
 
+        started = time.perf_counter()
+        metrics = {'rows_compared': len(df), 'columns_compared': len(df.columns)}
 
+        if key is None:
+            if not df.index.equals(self.main_data.index):
+                raise ValueError("Can only compare identically-labeled DataFrames; pass a key to match rows.")
+            row_keys = df.index
+            old_pos = new_pos = np.arange(len(df))
+            inserted = deleted = np.empty(0, dtype=np.intp)
+            compare_columns = np.arange(len(df.columns))
+        else:
+            key = [key] if isinstance(key, str) else list(key)
+            old_keys = self._key_index(self.main_data, key)
+            row_keys = self._key_index(df, key)
+            # Hash join: position of every incoming key in the stored frame, -1 for new keys.
+            positions = old_keys.get_indexer(row_keys)
+            matched = positions >= 0
+            new_pos = np.flatnonzero(matched)
+            old_pos = positions[matched]
+            inserted = np.flatnonzero(~matched)
+            kept = np.zeros(len(self.main_data), dtype=bool)
+            kept[old_pos] = True
+            deleted = np.flatnonzero(~kept)
+            compare_columns = np.flatnonzero(~df.columns.isin(key))
 
-        differences = (self.main_data != df) & ~df.isna() & ~self.main_data.isna()
         current_schema = df.dtypes.to_dict()
+        self._check_schema(current_schema)
+
+        old_fingerprints = self._stored_fingerprints(compare_columns)
+        new_fingerprints = self._row_fingerprints(df, compare_columns)
+        differs = old_fingerprints[old_pos] != new_fingerprints[new_pos]
+        matched_old, matched_new = old_pos, new_pos
+        old_pos, new_pos = old_pos[differs], new_pos[differs]
+        metrics['rows_changed'] = len(new_pos)
+        metrics['rows_skipped'] = len(differs) - len(new_pos)
+        self._report_progress('diff', metrics)
+
+        timestamp = pd.Timestamp.now()
+        updates, missing, changed_columns = self._capture_changes(old_pos, new_pos, compare_columns, df, row_keys,
+                                                                  timestamp)
+        changes = [updates, missing]
+        if len(inserted):
+            changes.append(self._capture_rows(df, inserted, compare_columns, row_keys, 'insert', timestamp))
+        if len(deleted):
+            changes.append(self._capture_rows(self.main_data, deleted, compare_columns, old_keys, 'delete',
+                                              timestamp))
+        changes = pd.concat([part for part in changes if not part.empty] or [updates], ignore_index=True)
+        metrics['updated_cells'] = len(updates)
+        metrics['missing_cells'] = len(missing)
+        metrics['inserted_rows'] = len(inserted)
+        metrics['deleted_rows'] = len(deleted)
+        metrics['total_changes'] = len(changes)
+        metrics['columns_changed'] = changes['column_name'].nunique()
+        self._report_progress('capture', metrics)
+
+        self._append_history(changes)
+        self.main_data = df.copy()
+        self.previous_schema = current_schema
+        self._store_fingerprints(df, row_keys, compare_columns, new_fingerprints)
+        order = None
+        if key is not None:
+            # Replaying the load keeps the stored rows in their old order and appends the inserted ones.
+            replayed = np.concatenate([matched_new[np.argsort(matched_old)], inserted])
+            if not np.array_equal(replayed, np.arange(len(df))):
+                order = np.argsort(replayed)
+        self._record_load(timestamp, key, len(changes), order=order)
+        self.last_change_set = self._change_set(matched_old, matched_new, old_pos, new_pos, inserted, deleted,
+                                                changed_columns)
+        self._update_rollups()
+
+        metrics['elapsed'] = time.perf_counter() - started
+        self.last_load_metrics = metrics
+        self._report_progress('done', metrics)
+
+    def load_file(self, path, key, chunksize=100_000, file_format=None, **read_kwargs):
+        """
+        Loads a CSV or Parquet extract chunk by chunk, diffing every chunk against the stored data.
+
+        Each chunk is matched on the key, compared through the fingerprint index and applied to a working copy
+        of ``main_data``; only its inserted rows are kept, as they become part of the stored data. Stored rows
+        whose key does not appear in the file are recorded as deleted once the file is exhausted. The working
+        copy replaces ``main_data`` and the history is committed only after the whole file has been read, so a
+        failing chunk leaves the model untouched. With a ``HistoryStore`` the changes of every chunk are staged
+        on disk; without one they are held in memory until the commit, where they end up in ``history_data``.
+
+        Memory use is therefore bounded by the stored data, not by the extract: a copy of ``main_data``, the
+        inserted rows and one chunk. The first load of an empty model keeps the chunks until they are
+        concatenated into ``main_data``.
+
+        Args:
+            path (str): Path to the file.
+            key (str or list): Column(s) identifying a row.
+            chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+            file_format (str, optional): Either ``'csv'`` or ``'parquet'``. Defaults to None (guessed from the suffix).
+            **read_kwargs: Extra arguments passed to ``pd.read_csv``.
+
+        Raises:
+            ValueError: If the file columns differ from the stored ones, or if the key is missing or not unique.
+        """
+        key = [key] if isinstance(key, str) else list(key)
+        if file_format != 'parquet' and 'parse_dates' not in read_kwargs and not self.main_data.empty:
+            date_columns = self.main_data.select_dtypes(include='datetime').columns.tolist()
+            if date_columns:
+                read_kwargs['parse_dates'] = date_columns
+        chunks = read_file_chunks(path, chunksize=chunksize, file_format=file_format, **read_kwargs)
+
+        if self.main_data.empty:
+            self._reset(pd.concat(chunks, ignore_index=True), key)
+            return
+
+        started = time.perf_counter()
+        metrics = {'chunks': 0, 'rows_compared': 0, 'rows_changed': 0, 'rows_skipped': 0, 'updated_cells': 0,
+                   'missing_cells': 0, 'inserted_rows': 0, 'deleted_rows': 0, 'total_changes': 0}
+        old_keys = self._key_index(self.main_data, key)
+        compare_columns = np.flatnonzero(~self.main_data.columns.isin(key))
+        fingerprints = self._stored_fingerprints(compare_columns).copy()
+        seen = np.zeros(len(self.main_data), dtype=bool)
+        inserted_rows, inserted_fingerprints = [], []
+        updated_rows, changed_columns = [], set()
+        history = []
+        timestamp = pd.Timestamp.now()
+        # Updates are applied to a working copy; self.main_data keeps the old values for the change records.
+        data = self.main_data.copy()
+
+        try:
+            for chunk in chunks:
+                if not chunk.columns.equals(self.main_data.columns):
+                    raise ValueError("File columns do not match the stored data.")
+                if not metrics['chunks']:
+                    self._check_schema(chunk.dtypes.to_dict())
+                chunk_keys = self._key_index(chunk, key)
+                positions = old_keys.get_indexer(chunk_keys)
+                matched = positions >= 0
+                new_pos = np.flatnonzero(matched)
+                old_pos = positions[matched]
+                if seen[old_pos].any():
+                    raise ValueError(f"Key {key} is not unique.")
+                seen[old_pos] = True
+
+                chunk_fingerprints = self._row_fingerprints(chunk, compare_columns)
+                differs = fingerprints[old_pos] != chunk_fingerprints[new_pos]
+                old_pos, new_pos = old_pos[differs], new_pos[differs]
+                updates, missing, chunk_columns = self._capture_changes(old_pos, new_pos, compare_columns, chunk,
+                                                                        chunk_keys, timestamp)
+                if len(old_pos):
+                    for j in compare_columns:
+                        data.iloc[old_pos, j] = chunk.iloc[new_pos, j].to_numpy()
+                updated_rows.append(old_pos)
+                changed_columns.update(chunk_columns)
+                fingerprints[old_pos] = chunk_fingerprints[new_pos]
+
+                inserted = np.flatnonzero(~matched)
+                changes = [updates, missing]
+                if len(inserted):
+                    changes.append(self._capture_rows(chunk, inserted, compare_columns, chunk_keys, 'insert',
+                                                      timestamp))
+                    inserted_rows.append(chunk.iloc[inserted])
+                    inserted_fingerprints.append(chunk_fingerprints[inserted])
+                changes = pd.concat([part for part in changes if not part.empty] or [updates], ignore_index=True)
+                self._stage_history(history, changes)
+
+                metrics['chunks'] += 1
+                metrics['rows_compared'] += len(chunk)
+                metrics['rows_changed'] += len(new_pos)
+                metrics['rows_skipped'] += len(differs) - len(new_pos)
+                metrics['updated_cells'] += len(updates)
+                metrics['missing_cells'] += len(missing)
+                metrics['inserted_rows'] += len(inserted)
+                metrics['total_changes'] += len(changes)
+                self._report_progress('chunk', metrics)
+
+            deleted = np.flatnonzero(~seen)
+            if len(deleted):
+                self._stage_history(history, self._capture_rows(self.main_data, deleted, compare_columns, old_keys,
+                                                                'delete', timestamp))
+                metrics['deleted_rows'] = len(deleted)
+                metrics['total_changes'] += len(deleted) * len(compare_columns)
+        except Exception:
+            if self.history_store is not None:
+                self.history_store.discard_staged()
+            raise
+
+        # Kept rows stay in their order in front of the inserted ones.
+        new_positions = np.cumsum(seen) - 1
+        if len(deleted) or inserted_rows:
+            data = pd.concat([data.iloc[seen]] + inserted_rows, ignore_index=True)
+        if self.history_store is not None:
+            self.history_store.commit_staged()
+        elif history:
+            self._append_history(pd.concat(history, ignore_index=True))
+        self.main_data = data
+        self.previous_schema = self.main_data.dtypes.to_dict()
+        self._store_fingerprints(self.main_data, self._key_index(self.main_data, key), compare_columns,
+                                 np.concatenate([fingerprints[seen]] + inserted_fingerprints))
+        self._record_load(timestamp, key, metrics['total_changes'])
+        matched_old = np.flatnonzero(seen)
+        updated = np.sort(np.concatenate(updated_rows)) if updated_rows else np.empty(0, dtype=np.intp)
+        self.last_change_set = self._change_set(
+            matched_old, np.arange(len(matched_old)), updated, new_positions[updated],
+            np.arange(len(matched_old), len(self.main_data)), deleted,
+            [column for column in self.main_data.columns if column in changed_columns])
+        self._update_rollups()
+
+        metrics['elapsed'] = time.perf_counter() - started
+        self.last_load_metrics = metrics
+        self._report_progress('done', metrics)
+
+    def _reset(self, df, key):
+        """
+        Replaces the stored data without comparing it, for the first load or a change of columns.
+
+        Args:
+            df (pd.DataFrame): The new data, owned by the model from now on.
+            key (str or list): Column(s) identifying a row, or None.
+        """
+        self.main_data = df
+        if key is None:
+            self._store_fingerprints(df, df.index, np.arange(len(df.columns)))
+        else:
+            key = [key] if isinstance(key, str) else list(key)
+            self._store_fingerprints(df, self._key_index(df, key), np.flatnonzero(~df.columns.isin(key)))
+        self._record_load(pd.Timestamp.now(), key, 0, replayable=False)
+        self.last_change_set = self._change_set(reset=True)
+        self._update_rollups()
+
+    def add_rollup(self, time_column, measures, granularity='day'):
+        """
+        Registers a time rollup of measure columns, kept up to date by every later load.
+
+        See ``time_rollup.TimeRollup``. The rollup is built from the current data right away, if there is any.
+        Every rollup is updated by every load, so at most ``max_rollups`` are kept: beyond that the least recently
+        used one is cleared and dropped.
+
+        Args:
+            time_column (str): The column holding the timestamps.
+            measures (list): The numeric columns to aggregate.
+            granularity (str, optional): The bucket size of the rollup. Defaults to 'day'.
+
+        Returns:
+            TimeRollup: The rollup, to query with ``trend``.
+        """
+        from time_rollup import TimeRollup
+
+        rollup = TimeRollup(time_column, measures, granularity)
+        if not self.main_data.empty:
+            rollup.build(self.main_data)
+        self.rollups.append(rollup)
+        while len(self.rollups) > self.max_rollups:
+            self.rollups.pop(0).clear()
+        return rollup
+
+    def get_rollup(self, time_column, measures, granularity='day'):
+        """
+        Returns a registered rollup covering the measures at the granularity or finer, registering one if needed.
+
+        A rollup of the same time column, at the granularity or a finer one, that lacks some of the measures gets
+        them added, so asking for one measure at a time does not register a rollup per measure. The rollups are kept in the
+        order they were last used in, which ``add_rollup`` evicts by.
+
+        Args:
+            time_column (str): The column holding the timestamps.
+            measures (list): The numeric columns needed.
+            granularity (str, optional): The bucket size the trend is wanted at. Defaults to 'day'.
+
+        Returns:
+            TimeRollup: The rollup.
+        """
+        found = next((rollup for rollup in self.rollups if rollup.answers(time_column, measures, granularity)), None)
+        if found is None:
+            found = next((rollup for rollup in self.rollups if rollup.answers(time_column, [], granularity)), None)
+            if found is None:
+                return self.add_rollup(time_column, measures, granularity)
+            found.add_measures(measures)
+        self.rollups.remove(found)
+        self.rollups.append(found)
+        if found.cube is None and not self.main_data.empty:
+            found.build(self.main_data)
+        return found
+
+    def _update_rollups(self):
+        """
+        Applies the last load to the rollups. The load is already stored, so a rollup that fails to update is
+        cleared instead of failing the load; ``get_rollup`` builds it again on its next use.
+        """
+        for rollup in self.rollups:
+            if not all(column in self.main_data for column in [rollup.time_column] + rollup.measures):
+                rollup.clear()
+                continue
+            try:
+                rollup.update(self.main_data, self.last_change_set)
+            except Exception:
+                logger.exception("Could not update the rollup of %s over '%s'; it will be rebuilt on its next use.",
+                                 rollup.measures, rollup.time_column)
+                rollup.clear()
+
+    @staticmethod
+    def _change_set(matched_old=None, matched_new=None, changed_old=None, changed_new=None, inserted=None,
+                    deleted=None, columns=None, reset=False):
+        """
+        Describes what a load changed in ``main_data``, by row position.
+
+        Args:
+            matched_old (np.ndarray): Positions in the previous data of the rows that are still present.
+            matched_new (np.ndarray): Their positions in the new data, aligned with ``matched_old``.
+            changed_old (np.ndarray): Positions in the previous data of the rows whose values changed.
+            changed_new (np.ndarray): Their positions in the new data, aligned with ``changed_old``.
+            inserted (np.ndarray): Positions in the new data of the inserted rows.
+            deleted (np.ndarray): Positions in the previous data of the deleted rows.
+            columns (list): Names of the columns with at least one changed cell.
+            reset (bool): The data was replaced as a whole, so nothing carries over.
+
+        Returns:
+            dict: The change set, kept in ``last_change_set``.
+        """
+        empty = np.empty(0, dtype=np.intp)
+        return {
+            'reset': reset,
+            'matched_old': empty if matched_old is None else matched_old,
+            'matched_new': empty if matched_new is None else matched_new,
+            'changed_old': empty if changed_old is None else changed_old,
+            'changed_new': empty if changed_new is None else changed_new,
+            'inserted': empty if inserted is None else inserted,
+            'deleted': empty if deleted is None else deleted,
+            'columns': [] if columns is None else list(columns),
+        }
+
+    @staticmethod
+    def _key_index(df, key):
+        """
+        Builds a hashable index over the key columns of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to index.
+            key (list): The key columns.
+
+        Returns:
+            pd.Index: The key values, one entry per row.
+
+        Raises:
+            ValueError: If a key column is missing or the key is not unique.
+        """
+        missing = [col for col in key if col not in df.columns]
+        if missing:
+            raise ValueError(f"Key columns not found in dataframe: {missing}")
+        index = pd.Index(df[key[0]]) if len(key) == 1 else pd.MultiIndex.from_frame(df[key])
+        if not index.is_unique:
+            raise ValueError(f"Key {key} is not unique.")
+        return index
+
+    @staticmethod
+    def _row_fingerprints(df, columns):
+        """
+        Hashes every row of a DataFrame over the given columns.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to hash.
+            columns (np.ndarray): Positions of the columns that take part in the hash.
+
+        Returns:
+            np.ndarray: One uint64 fingerprint per row.
+        """
+        if not len(columns):
+            return np.zeros(len(df), dtype='uint64')
+        return hash_rows(df.iloc[:, columns])
+
+    def _store_fingerprints(self, df, row_keys, columns, fingerprints=None):
+        """
+        Replaces the fingerprint index with the fingerprints of the frame that was just loaded.
+
+        Args:
+            df (pd.DataFrame): The loaded DataFrame.
+            row_keys (pd.Index): Row identities of ``df``.
+            columns (np.ndarray): Positions of the hashed columns.
+            fingerprints (np.ndarray, optional): Precomputed fingerprints. Defaults to None (computed here).
+        """
+        if fingerprints is None:
+            fingerprints = self._row_fingerprints(df, columns)
+        self.row_fingerprints = pd.Series(fingerprints, index=row_keys, name='fingerprint')
+        self._fingerprint_columns = tuple(df.columns[columns])
+
+    def _stored_fingerprints(self, columns):
+        """
+        Returns the fingerprints of the stored rows, rehashing them if they were built over other columns.
+
+        Args:
+            columns (np.ndarray): Positions of the columns the current load compares.
+
+        Returns:
+            np.ndarray: One uint64 fingerprint per row of ``main_data``.
+        """
+        if self._fingerprint_columns != tuple(self.main_data.columns[columns]) or \
+                len(self.row_fingerprints) != len(self.main_data):
+            return self._row_fingerprints(self.main_data, columns)
+        return self.row_fingerprints.to_numpy()
+
+    def get_fingerprints(self):
+        """
+        Returns the per-row fingerprint index kept between loads.
+
+        Returns:
+            pd.Series: uint64 fingerprints indexed by row identity (key values or index labels).
+        """
+        return self.row_fingerprints.copy()
+
+    def _check_schema(self, current_schema):
+        """
+        Compares the incoming schema with the one seen on the previous load and reports any differences.
+
+        Args:
+            current_schema (dict): Mapping of column names to dtypes of the incoming DataFrame.
+        """
         if self.previous_schema and self.previous_schema != current_schema:
             print("Warning: Data schema has changed!")
             for col, dtype in current_schema.items():
@@ -40,27 +621,272 @@ class DataModelV5:
         else:
             print("Data schema check passed successfully!")
 
-        total_changes = differences.sum().sum()
-        progress_bar = tqdm(total=total_changes, desc="Processing changes")
-
-        for column in df.columns:
-            column_changes = df[differences[column]].index.tolist()
-            for index in column_changes:
-                new_row = {
-                    'column_name': column,
-                    'old_value': self.main_data.at[index, column],
-                    'new_value': df.at[index, column],
-                    'timestamp': pd.Timestamp.now()
-                }
-                self.history_data = pd.concat([self.history_data, pd.DataFrame([new_row])], ignore_index=True)
-                progress_bar.update(1)  
-
-        progress_bar.close()
-        self.main_data = df.copy()
-        self.previous_schema = current_schema
+    def _capture_changes(self, old_pos, new_pos, columns, df, row_keys, timestamp):
+        """
+        Builds the ``update`` and ``missing`` records for every changed cell of the matched rows in one vectorized
+        pass.
+
+        Args:
+            old_pos (np.ndarray): Row positions in the stored frame.
+            new_pos (np.ndarray): Row positions in the incoming frame, aligned with ``old_pos``.
+            columns (np.ndarray): Positions of the columns to compare.
+            df (pd.DataFrame): The incoming DataFrame.
+            row_keys (pd.Index): Row identities of the incoming frame.
+            timestamp (pd.Timestamp): The load timestamp stamped on every record.
+
+        Returns:
+            tuple: The ``update`` records of the cells whose value changed and the ``missing`` records of the
+                cells that turned missing or stopped being missing, both in ``HISTORY_COLUMNS`` layout and ordered
+                by column and then by row, and the names of the columns with at least one changed cell.
+        """
+        cells = {'update': ([], [], [], []), 'missing': ([], [], [], [])}
+        changed_columns = []
+        for j in columns:
+            old_col = self.main_data.iloc[old_pos, j]
+            new_col = df.iloc[new_pos, j]
+            found = {'update': np.flatnonzero(_changed_cells(old_col, new_col)),
+                     'missing': np.flatnonzero(old_col.isna().to_numpy() != new_col.isna().to_numpy())}
+            if len(found['update']) or len(found['missing']):
+                changed_columns.append(df.columns[j])
+            for change_type, changed in found.items():
+                if not len(changed):
+                    continue
+                names, old_values, new_values, rows = cells[change_type]
+                names.append(np.full(len(changed), df.columns[j], dtype=object))
+                old_values.append(old_col.iloc[changed].to_numpy(dtype=object))
+                new_values.append(new_col.iloc[changed].to_numpy(dtype=object))
+                rows.append(new_pos[changed])
+
+        records = []
+        for change_type, (names, old_values, new_values, rows) in cells.items():
+            if not rows:
+                records.append(_change_records([], [], [], [], change_type, timestamp))
+                continue
+            rows = np.concatenate(rows)
+            records.append(_change_records(np.concatenate(names), np.concatenate(old_values),
+                                           np.concatenate(new_values), row_keys[rows].to_numpy(dtype=object),
+                                           change_type, timestamp))
+        return records[0], records[1], changed_columns
+
+    @staticmethod
+    def _capture_rows(df, rows, columns, row_keys, change_type, timestamp):
+        """
+        Builds cell records for whole rows that were inserted into or deleted from the model.
+
+        Args:
+            df (pd.DataFrame): The frame holding the rows (incoming for inserts, stored for deletes).
+            rows (np.ndarray): Positions of the rows in ``df``.
+            columns (np.ndarray): Positions of the columns to record.
+            row_keys (pd.Index): Row identities of ``df``.
+            change_type (str): Either ``'insert'`` or ``'delete'``.
+            timestamp (pd.Timestamp): The load timestamp stamped on every record.
+
+        Returns:
+            pd.DataFrame: The change records in ``HISTORY_COLUMNS`` layout.
+        """
+        if not len(columns):
+            return _change_records([], [], [], [], change_type, timestamp)
+        values = np.concatenate([df.iloc[rows, j].to_numpy(dtype=object) for j in columns])
+        empty = np.full(len(values), None, dtype=object)
+        names = np.repeat(df.columns.to_numpy(dtype=object)[columns], len(rows))
+        keys = np.tile(row_keys[rows].to_numpy(dtype=object), len(columns))
+        if change_type == 'insert':
+            return _change_records(names, empty, values, keys, change_type, timestamp)
+        return _change_records(names, values, empty, keys, change_type, timestamp)
+
+    def _append_history(self, changes):
+        """
+        Appends a batch of change records to the history.
+
+        Args:
+            changes (pd.DataFrame): The change records to append.
+        """
+        if changes.empty:
+            return
+        if self.history_store is not None:
+            self.history_store.append(changes)
+        elif self.history_data.empty:
+            self.history_data = changes.reset_index(drop=True)
+        else:
+            self.history_data = pd.concat([self.history_data, changes], ignore_index=True)
+
+    def _stage_history(self, staged, changes):
+        """
+        Stages a batch of change records until ``load_file`` commits them.
+
+        Args:
+            staged (list): In-memory batches, used when there is no history store.
+            changes (pd.DataFrame): The change records to stage.
+        """
+        if changes.empty:
+            return
+        if self.history_store is not None:
+            self.history_store.stage(changes)
+        else:
+            staged.append(changes)
+
+    def _record_load(self, timestamp, key, deltas, replayable=True, order=None):
+        """
+        Registers a finished load and takes a snapshot checkpoint when replaying it later would be too long or
+        impossible.
+
+        A checkpoint is taken after the first load, after loads whose changes cannot be replayed from the history
+        (schema resets), after loads that changed a column's dtype, and when the history written since the last
+        checkpoint grows past ``max_replay_deltas``. Replaying therefore never crosses a dtype change, and the
+        values of every replayed load are cast to the dtypes of the checkpoint it starts from. Every load also
+        bumps ``data_version`` and clears the cached results.
+
+        Args:
+            timestamp (pd.Timestamp): The load timestamp stamped on its change records.
+            key (list): The key the load matched rows on, or None for a positional load.
+            deltas (int): Number of change records the load wrote.
+            replayable (bool, optional): Whether the change records fully describe the load. Defaults to True.
+            order (np.ndarray, optional): For a keyed load whose row order differs from the one its replay
+                produces, the positions of the loaded rows in the replayed frame. Defaults to None.
+        """
+        dtypes = self.main_data.dtypes
+        retyped = bool(self.loads) and not self.loads[-1]['dtypes'].equals(dtypes)
+        self.loads.append({'timestamp': timestamp, 'key': key, 'deltas': deltas, 'order': order, 'dtypes': dtypes})
+        self.data_version += 1
+        self.results.invalidate()
+        if not replayable or retyped or not self.checkpoints or \
+                self._deltas_since_checkpoint + deltas > self.max_replay_deltas:
+            self.checkpoints.append({'timestamp': timestamp, 'data': self.main_data.copy()})
+            self._deltas_since_checkpoint = 0
+        else:
+            self._deltas_since_checkpoint += deltas
+
+    def as_of(self, timestamp):
+        """
+        Reconstructs the master data as it was at a point in time.
+
+        The latest snapshot checkpoint taken at or before ``timestamp`` is copied and the change history recorded
+        after it is replayed load by load, which touches at most ``max_replay_deltas`` records. Rows come back in
+        the order they were loaded in; after a keyed load the index is reset.
+
+        Args:
+            timestamp (str or pd.Timestamp): The point in time to reconstruct.
+
+        Returns:
+            pd.DataFrame: The master data as of ``timestamp``, or an empty DataFrame if nothing was loaded yet.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        position = bisect.bisect_right([checkpoint['timestamp'] for checkpoint in self.checkpoints], timestamp)
+        if not position:
+            return pd.DataFrame()
+        checkpoint = self.checkpoints[position - 1]
+        data = checkpoint['data'].copy()
+        if timestamp == checkpoint['timestamp']:
+            return data
+
+        history = self.get_history(since=checkpoint['timestamp'], until=timestamp)
+        history = history[history['timestamp'] > checkpoint['timestamp']]
+        loads = {load['timestamp']: load for load in self.loads}
+        for load_timestamp, changes in history.groupby('timestamp', sort=True):
+            load = loads.get(load_timestamp, {})
+            data = self._replay(data, changes, load.get('key'))
+            if load.get('order') is not None:
+                data = data.iloc[load['order']].reset_index(drop=True)
+        return data
+
+    @staticmethod
+    def _replay(data, changes, key):
+        """
+        Applies the change records of one load to a reconstructed frame.
+
+        Args:
+            data (pd.DataFrame): The frame as it was before the load.
+            changes (pd.DataFrame): The change records the load wrote.
+            key (list): The key the load matched rows on, or None for a positional load.
+
+        Returns:
+            pd.DataFrame: The frame as it was after the load.
+        """
+        row_index = data.index if key is None else DataModelV5._key_index(data, key)
+        updates = changes[changes['change_type'].isin(['update', 'missing'])]
+        for column, column_updates in updates.groupby('column_name', sort=False):
+            rows = row_index.get_indexer(pd.Index(column_updates['row_key'].tolist(), tupleize_cols=False))
+            values = column_updates['new_value'].to_numpy()
+            if data[column].dtype != object:
+                try:
+                    values = pd.array(values).astype(data[column].dtype)
+                except (TypeError, ValueError):
+                    pass
+            data.iloc[rows, data.columns.get_loc(column)] = values
+
+        deletes = changes.loc[changes['change_type'] == 'delete', 'row_key'].unique().tolist()
+        if deletes:
+            data = data.iloc[~np.isin(np.arange(len(data)), row_index.get_indexer(
+                pd.Index(deletes, tupleize_cols=False)))]
+
+        inserts = changes[changes['change_type'] == 'insert']
+        if not inserts.empty:
+            rows = inserts.pivot(index='row_key', columns='column_name', values='new_value')
+            order = pd.unique(inserts['row_key'].to_numpy())
+            rows = rows.reindex(pd.Index(order, tupleize_cols=False))
+            key_values = pd.DataFrame(list(rows.index) if len(key) > 1 else {key[0]: rows.index}, columns=key)
+            rows = pd.concat([key_values, rows.reset_index(drop=True)], axis=1)[data.columns]
+            data = pd.concat([data, rows.astype(data.dtypes.to_dict(), errors='ignore')], ignore_index=True)
+        return data
+
+    def _report_progress(self, stage, metrics):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, dict(metrics))
 
     def get_data(self):
         return self.main_data
 
-    def get_history(self):
-        return self.history_data
+    def save_dataset(self, path):
+        """
+        Writes the current data to a memory-mapped Arrow dataset file, see ``dataset_backend.ArrowDataset``.
+
+        The dataset can be analysed with pandas or vaex without loading it into memory again.
+
+        Args:
+            path (str): Path of the file to write.
+
+        Returns:
+            ArrowDataset: The written dataset.
+        """
+        from dataset_backend import ArrowDataset
+
+        return ArrowDataset.write(self.main_data, path)
+
+    def cached(self, func, *args, **kwargs):
+        """
+        Calls ``func(main_data, *args, **kwargs)``, reusing the result of an identical earlier call as long as no
+        data was loaded since.
+
+        Results are keyed on ``data_version`` and the call parameters, and kept in a bounded LRU cache that
+        every load clears. They are shared between callers, so they must not be modified.
+
+        Args:
+            func (callable): An analytics, validation or profiling function taking the data first, e.g.
+                ``describe_data`` or ``check_missing_values``.
+            *args: Further positional arguments of ``func``.
+            **kwargs: Keyword arguments of ``func``.
+
+        Returns:
+            The result of ``func``.
+        """
+        return self.results.get_or_compute('main_data', self.data_version, func, self.main_data, *args, **kwargs)
+
+    def get_history(self, column=None, since=None, until=None, change_type=None):
+        """
+        Returns the change history, optionally narrowed down to one column, a time window or a change type.
+
+        With a history store the filters are pushed down to the stored files, so only the requested slice is read.
+
+        Args:
+            column (str, optional): Only return changes of this column. Defaults to None.
+            since (str or pd.Timestamp, optional): Only return changes at or after this time. Defaults to None.
+            until (str or pd.Timestamp, optional): Only return changes at or before this time. Defaults to None.
+            change_type (str, optional): Only return ``'update'``, ``'missing'``, ``'insert'`` or ``'delete'``
+                records. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The change records.
+        """
+        if self.history_store is not None:
+            return self.history_store.read(column=column, since=since, until=until, change_type=change_type)
+        return filter_history(self.history_data, column=column, since=since, until=until, change_type=change_type)
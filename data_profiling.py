@@ -1,43 +1,93 @@
+from functools import partial
+
+import pandas as pd
+
+from parallel_backend import map_shards, resolve_workers, shard_columns
+
 
 class DataProfiler:
     """
     A class for profiling data, providing functionalities like missing data analysis, unique value counts, and general data description.
     """
     @staticmethod
-    def find_missing_data(df):
+    def find_missing_data(df, workers=None):
         """
         Finds missing data in the DataFrame.
 
         Args:
             df (pd.DataFrame): The DataFrame to analyze.
+            workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+                CPU core. Defaults to None (run in this process).
 
         Returns:
             pd.Series: A series containing counts of missing values per column.
         """
-        return df.isnull().sum()
+        return _columnwise(df, _missing_counts, workers, pd.concat)
 
     @staticmethod
-    def count_unique_values(df):
+    def count_unique_values(df, workers=None):
         """
         Counts unique values in each column of the DataFrame.
 
         Args:
             df (pd.DataFrame): The DataFrame to analyze.
+            workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+                CPU core. Defaults to None (run in this process).
 
         Returns:
             pd.Series: A series containing counts of unique values per column.
         """
-        return df.nunique()
+        return _columnwise(df, _unique_counts, workers, pd.concat)
 
     @staticmethod
-    def profile_data(df):
+    def profile_data(df, workers=None):
         """
         Provides a general profile of the DataFrame.
 
         Args:
             df (pd.DataFrame): The DataFrame to profile.
+            workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+                CPU core. Defaults to None (run in this process).
 
         Returns:
             pd.DataFrame: A DataFrame containing the general description of the input DataFrame.
         """
-        return df.describe(include='all')
+        return _columnwise(df, _describe, workers, partial(_merge_descriptions, df=df))
+
+
+def _columnwise(df, func, workers, merge):
+    """
+    Runs a column-wise function serially, or on column shards in worker processes.
+
+    Args:
+        df (pd.DataFrame): The DataFrame.
+        func (callable): A module-level function computing per-column results for a frame.
+        workers (int): Number of worker processes, None for serial execution.
+        merge (callable): Combines the per-shard results, given in column order.
+
+    Returns:
+        The result of ``func`` for the whole frame.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1 or df.shape[1] < 2:
+        return func(df)
+    shards = [(columns, ()) for columns in shard_columns(df.columns, workers)]
+    return merge(map_shards(df, func, shards, workers))
+
+
+def _missing_counts(df):
+    return df.isnull().sum()
+
+
+def _unique_counts(df):
+    return df.nunique()
+
+
+def _describe(df):
+    return df.describe(include='all')
+
+
+def _merge_descriptions(descriptions, df):
+    # The statistics describe() returns depend on the dtypes only, so describing no rows gives their serial order.
+    names = _describe(df.iloc[:0]).index
+    return pd.concat([description.reindex(names) for description in descriptions], axis=1)
@@ -1,20 +1,37 @@
 import pandas as pd
 
+from data_model import read_file_chunks
+from normalization import DEFAULT_NORMALIZERS, normalize_column
+from parallel_backend import map_shards, resolve_workers, shard_columns
+from sketches import KLLSketch, k_for_error
+from validation_engine import ValidationPlan, regex_violations
 
-def check_missing_values(df):
+
+def check_missing_values(df, workers=None):
     """
     Checks for missing values in the DataFrame and returns columns with missing values and their count.
 
     Args:
         df (pd.DataFrame): The DataFrame to check.
+        workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+            CPU core. Defaults to None (run in this process).
 
     Returns:
         pd.Series: A series with the count of missing values per column.
     """
-    missing = df.isnull().sum()
+    workers = resolve_workers(workers)
+    if workers == 1 or df.shape[1] < 2:
+        missing = _missing_counts(df)
+    else:
+        shards = [(columns, ()) for columns in shard_columns(df.columns, workers)]
+        missing = pd.concat(map_shards(df, _missing_counts, shards, workers))
     return missing[missing > 0]
 
 
+def _missing_counts(df):
+    return df.isnull().sum()
+
+
 def check_duplicates(df):
     """
     Checks for duplicate rows in the DataFrame.
@@ -28,70 +45,105 @@ def check_duplicates(df):
     return df[df.duplicated()]
 
 
-import numpy as np
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
 
 
-def check_anomalies(df, columns=None, method="iqr", date_range=None, rare_threshold=0.01, regex_patterns=None):
+def _is_text(series):
     """
-    Checks for anomalies in specified columns using different methods.
+    Tells whether a column holds text, stored as object, string or categorical dtype.
 
     Args:
-        df (pd.DataFrame): The DataFrame to check.
+        series (pd.Series): The column to inspect.
+
+    Returns:
+        bool: True for text columns.
+    """
+    dtype = series.dtype
+    return dtype == 'object' or isinstance(dtype, (pd.StringDtype, pd.CategoricalDtype)) or \
+        pd.api.types.is_string_dtype(dtype)
+
+
+def compile_anomaly_plan(df, columns=None, method="iqr", date_range=None, rare_threshold=0.01,
+                         regex_patterns=None):
+    """
+    Compiles the checks of ``check_anomalies`` into a validation plan.
+
+    Numeric columns get an IQR rule, datetime columns a date range rule (when ``date_range`` is given) and
+    text columns a rare value rule plus a regex rule when a pattern is given for them.
+
+    Args:
+        df (pd.DataFrame): The DataFrame whose column types decide the rules.
         columns (list, optional): List of columns to check. Defaults to all columns.
         method (str, optional): The method to use for anomaly detection. Defaults to "iqr" (interquartile range).
         date_range (tuple, optional): The date range for anomaly detection. Defaults to None.
         rare_threshold (float, optional): Threshold for rare value detection. Defaults to 0.01.
-        regex_patterns (dict, optional): Regex patterns for anomaly detection. Defaults to None.
+        regex_patterns (dict, optional): Regex pattern, or list of patterns that must all match, per column.
+            Defaults to None.
 
     Returns:
-        pd.DataFrame: A DataFrame with detected anomalies.
+        ValidationPlan: The compiled plan.
+
+    Raises:
+        ValueError: If ``method`` is unknown and a numeric column is checked.
     """
     if columns is None:
         columns = df.columns
 
-    anomalies = pd.DataFrame()
+    plan = ValidationPlan()
     regex_patterns = regex_patterns or {}
 
     for column in columns:
-        if df[column].dtype in ['int64', 'float64']:
-            if method == "iqr":
-                Q1 = df[column].quantile(0.25)
-                Q3 = df[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                column_anomalies = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
-            else:
+        if _is_numeric(df[column]):
+            if method != "iqr":
                 raise ValueError("Unknown method for anomaly detection.")
+            plan.add_iqr(column)
 
-        elif np.issubdtype(df[column].dtype, np.datetime64):
+        elif pd.api.types.is_datetime64_any_dtype(df[column].dtype):
             if date_range:
-                column_anomalies = df[(df[column] < date_range[0]) | (df[column] > date_range[1])]
-            else:
-                continue
-
-        elif df[column].dtype == 'object':
-            value_counts = df[column].value_counts(normalize=True)
-            rare_categories = value_counts[value_counts < rare_threshold].index
-            column_anomalies = df[df[column].isin(rare_categories)]
+                plan.add_date_range(column, date_range[0], date_range[1])
 
+        elif _is_text(df[column]):
+            plan.add_rare(column, rare_threshold)
             if column in regex_patterns:
-                pattern = regex_patterns[column]
-                column_anomalies = pd.concat([column_anomalies, df[~df[column].str.match(pattern)]])
+                plan.add_regex(column, regex_patterns[column])
 
-        else:
-            continue
+    return plan
 
-        anomalies = pd.concat([anomalies, column_anomalies])
 
-    return anomalies.drop_duplicates()
+def check_anomalies(df, columns=None, method="iqr", date_range=None, rare_threshold=0.01, regex_patterns=None,
+                    return_result=False, workers=None):
+    """
+    Checks for anomalies in specified columns using different methods.
+
+    All checks are compiled into one ``ValidationPlan`` and evaluated in a single pass per column.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to check.
+        columns (list, optional): List of columns to check. Defaults to all columns.
+        method (str, optional): The method to use for anomaly detection. Defaults to "iqr" (interquartile range).
+        date_range (tuple, optional): The date range for anomaly detection. Defaults to None.
+        rare_threshold (float, optional): Threshold for rare value detection. Defaults to 0.01.
+        regex_patterns (dict, optional): Regex pattern, or list of patterns that must all match, per column.
+            Defaults to None.
+        return_result (bool, optional): Return the ``ValidationResult`` with per-rule bitmaps and timings instead
+            of the rows. Defaults to False.
+        workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+            CPU core. Defaults to None (run in this process).
+
+    Returns:
+        pd.DataFrame: The rows with at least one anomaly, in their original order, or the ``ValidationResult``
+            when ``return_result`` is set.
+    """
+    result = compile_anomaly_plan(df, columns, method, date_range, rare_threshold, regex_patterns).run(df, workers)
+    return result if return_result else result.rows()
 
 
 def detect_outliers_iqr(df, column):
     if column not in df:
         raise ValueError(f"Column '{column}' not found in dataframe.")
 
-    if df[column].dtype not in ["float64", "int64"]:
+    if not _is_numeric(df[column]):
         raise ValueError(f"Column '{column}' is not numeric.")
 
     Q1 = df[column].quantile(0.25)
@@ -102,6 +154,72 @@ def detect_outliers_iqr(df, column):
     return df[(df[column] < lower_bound) | (df[column] > upper_bound)]
 
 
+def iqr_bounds_from_file(path, columns, chunksize=100_000, error=0.01, factor=1.5, file_format=None,
+                         **read_kwargs):
+    """
+    Derives IQR outlier bounds for columns of a file too large to load, in one streaming pass.
+
+    Every chunk is summarized by one ``KLLSketch`` per column, and the chunk sketches are merged, so the
+    quartiles come from a sketch of the whole column.
+
+    Args:
+        path (str): Path to a CSV or Parquet file.
+        columns (list): The numeric columns.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        error (float, optional): Tolerated normalized rank error of the quartiles. Defaults to 0.01.
+        factor (float, optional): The IQR multiplier. Defaults to 1.5.
+        file_format (str, optional): Either ``'csv'`` or ``'parquet'``. Defaults to None (guessed from the suffix).
+        **read_kwargs: Extra arguments passed to ``pd.read_csv``.
+
+    Returns:
+        dict: The ``(lower_bound, upper_bound)`` tuple of every column.
+    """
+    k = k_for_error(error)
+    sketches = {column: KLLSketch(k) for column in columns}
+    for chunk in read_file_chunks(path, chunksize, columns=list(columns), file_format=file_format, **read_kwargs):
+        for column in columns:
+            sketches[column].merge(KLLSketch(k).update(pd.to_numeric(chunk[column], errors='coerce')))
+
+    bounds = {}
+    for column, sketch in sketches.items():
+        q1, q3 = sketch.quantile([0.25, 0.75])
+        iqr = q3 - q1
+        bounds[column] = (q1 - factor * iqr, q3 + factor * iqr)
+    return bounds
+
+
+def detect_outliers_iqr_file(path, column, chunksize=100_000, error=0.01, factor=1.5, file_format=None,
+                             **read_kwargs):
+    """
+    Streaming version of ``detect_outliers_iqr`` for files too large to load.
+
+    The first pass derives the bounds with ``iqr_bounds_from_file``. The second pass reads the file again and
+    keeps only the rows outside the bounds.
+
+    Args:
+        path (str): Path to a CSV or Parquet file.
+        column (str): The numeric column.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        error (float, optional): Tolerated normalized rank error of the quartiles. Defaults to 0.01.
+        factor (float, optional): The IQR multiplier. Defaults to 1.5.
+        file_format (str, optional): Either ``'csv'`` or ``'parquet'``. Defaults to None (guessed from the suffix).
+        **read_kwargs: Extra arguments passed to ``pd.read_csv``.
+
+    Returns:
+        pd.DataFrame: The outlier rows, indexed by their row position in the file.
+    """
+    lower_bound, upper_bound = iqr_bounds_from_file(path, [column], chunksize, error, factor, file_format,
+                                                    **read_kwargs)[column]
+    outliers = []
+    offset = 0
+    for chunk in read_file_chunks(path, chunksize, file_format=file_format, **read_kwargs):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        values = pd.to_numeric(chunk[column], errors='coerce')
+        outliers.append(chunk[(values < lower_bound) | (values > upper_bound)])
+    return pd.concat(outliers) if outliers else pd.DataFrame()
+
+
 def check_unique_values(df, column):
     return df[column].nunique() == len(df)
 
@@ -122,8 +240,8 @@ def check_date_range(df, column, start_date=None, end_date=None):
     return True
 
 
-def check_regex(df, column, pattern):
-    return df[column].str.match(pattern).all()
+def check_regex(df, column, pattern, require='all'):
+    return not regex_violations(df[column], pattern, require).any()
 
 
 def check_column_dependency(df, column1, value1, column2, value2):
@@ -131,6 +249,6 @@ def check_column_dependency(df, column1, value1, column2, value2):
     return subset[column2].eq(value2).all()
 
 
-def check_normalization(df, column):
-    normalized_values = df[column].str.strip().str.lower()
-    return normalized_values.nunique() == df[column].nunique()
+def check_normalization(df, column, normalizers=DEFAULT_NORMALIZERS):
+    _, report = normalize_column(df[column], normalizers)
+    return report['collapsed'] == 0
@@ -0,0 +1,110 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class ArrowDataset:
+    """
+    A dataset stored as an uncompressed Arrow IPC file and read through a memory map.
+
+    The file is never loaded as a whole: pandas and vaex both get views over the mapped buffers, so a dataset
+    can be larger than RAM and opening it twice does not duplicate it. ``to_pandas`` wraps the Arrow columns in
+    Arrow-backed pandas dtypes, and ``as_vaex`` opens the same file with vaex, which reads it lazily.
+    """
+
+    def __init__(self, path):
+        """
+        Opens an existing dataset file. Nothing is read until the data is used.
+
+        Args:
+            path (str): Path to an Arrow IPC (Feather version 2) file.
+        """
+        self.path = path
+        self._table = None
+
+    @classmethod
+    def write(cls, data, path):
+        """
+        Writes a DataFrame, or a stream of DataFrame chunks, to a dataset file.
+
+        Chunks are written one record batch at a time, so an extract read with ``read_file_chunks`` never has to
+        fit in memory. Every chunk is cast to the schema of the first one; their index is dropped.
+
+        Args:
+            data (pd.DataFrame or iterable): A DataFrame, or an iterable of DataFrames with the same columns.
+            path (str): Path of the file to write.
+
+        Returns:
+            ArrowDataset: The written dataset.
+
+        Raises:
+            ValueError: If ``data`` holds no chunk.
+        """
+        if isinstance(data, pd.DataFrame):
+            tables = iter([pa.Table.from_pandas(data)])
+        else:
+            tables = (pa.Table.from_pandas(chunk, preserve_index=False) for chunk in data)
+        first = next(tables, None)
+        if first is None:
+            raise ValueError("No data to write.")
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, first.schema) as writer:
+            writer.write_table(first)
+            for table in tables:
+                writer.write_table(table.cast(first.schema))
+        return cls(path)
+
+    @property
+    def table(self):
+        """
+        pa.Table: The memory-mapped contents of the file.
+        """
+        if self._table is None:
+            self._table = feather.read_table(self.path, memory_map=True)
+        return self._table
+
+    @property
+    def column_names(self):
+        """
+        list: The column names.
+        """
+        return self.table.column_names
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def to_pandas(self, columns=None, arrow_backed=True):
+        """
+        Returns the dataset as a pandas DataFrame.
+
+        Args:
+            columns (list, optional): The columns to return. Defaults to None (all columns).
+            arrow_backed (bool, optional): Wrap the mapped Arrow buffers in ``pd.ArrowDtype`` columns without
+                copying them. When False, the columns are converted to their original pandas dtypes, which
+                copies them into memory. Defaults to True.
+
+        Returns:
+            pd.DataFrame: The data.
+        """
+        table = self.table if columns is None else self.table.select(list(columns) + self._index_columns())
+        if arrow_backed:
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        return table.to_pandas()
+
+    def as_vaex(self, columns=None):
+        """
+        Opens the dataset with vaex, which memory-maps the same file and evaluates expressions out of core.
+
+        Args:
+            columns (list, optional): The columns to keep. Defaults to None (all columns).
+
+        Returns:
+            vaex.DataFrame: The data.
+        """
+        import vaex
+
+        df = vaex.open(self.path)
+        return df if columns is None else df[list(columns)]
+
+    def _index_columns(self):
+        metadata = self.table.schema.pandas_metadata or {}
+        return [name for name in metadata.get('index_columns', []) if isinstance(name, str)]
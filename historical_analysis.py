@@ -1,9 +1,11 @@
 import pandas as pd
 import logging
 
+from time_rollup import time_buckets
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def column_trends_over_time(df, column, time_column):
+def column_trends_over_time(df, column, time_column, granularity=None, rollup=None):
     """
     Analyzes trends for a specific column over time.
 
@@ -11,12 +13,21 @@ def column_trends_over_time(df, column, time_column):
         df (pd.DataFrame): The DataFrame to analyze.
         column (str): The column to analyze trends for.
         time_column (str): The column representing time.
+        granularity (str, optional): Average per time bucket ('day', 'week', 'month', 'quarter' or 'year')
+            instead of per distinct timestamp. Defaults to None.
+        rollup (TimeRollup, optional): A rollup covering the column, e.g. from ``DataModelV5.get_rollup``. The
+            trend is then read from its pre-aggregated buckets without scanning ``df``. Defaults to None.
 
     Returns:
         pd.Series: A series representing the mean value of the column over time.
     """
     """Analyzes trends for a specific column over time."""
     logging.info(f"Analyzing trends over time for column: {column}")
+    if rollup is not None:
+        return rollup.trend(column, granularity)
+    if granularity is not None:
+        buckets = pd.Series(time_buckets(df[time_column], granularity), index=df.index, name=time_column)
+        return df.groupby(buckets)[column].mean()
     return df.groupby(time_column)[column].mean()
 
 def most_frequently_changed_columns(df):
@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_model import HISTORY_COLUMNS
+
+
+class HistoryStore:
+    """
+    An append-only, on-disk store for change history.
+
+    Records are written as Parquet files partitioned by load date and column name
+    (``load_date=YYYY-MM-DD/column_name=<name>/part-*.parquet``). Because every file holds the changes of a
+    single column, ``old_value`` and ``new_value`` keep that column's type instead of a mixed ``object`` dtype.
+
+    Records can also be staged: ``stage`` writes them to a hidden directory under the root that ``read`` ignores,
+    and ``commit_staged`` moves them into their partitions, so a multi-batch load becomes visible all at once.
+    """
+
+    def __init__(self, root):
+        """
+        Initializes the store, creating its root directory if needed.
+
+        Args:
+            root (str): The directory holding the partitions.
+        """
+        self.root = root
+        self._sequence = 0
+        self._staging = None
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, changes):
+        """
+        Appends a batch of change records, one file per load date and column.
+
+        Args:
+            changes (pd.DataFrame): Change records in ``HISTORY_COLUMNS`` layout.
+        """
+        self._write(changes, self.root)
+
+    def stage(self, changes):
+        """
+        Writes a batch of change records to the staging area, where they stay invisible until committed.
+
+        Args:
+            changes (pd.DataFrame): Change records in ``HISTORY_COLUMNS`` layout.
+        """
+        if self._staging is None:
+            self._staging = tempfile.mkdtemp(prefix='_staging-', dir=self.root)
+        self._write(changes, self._staging)
+
+    def commit_staged(self):
+        """
+        Moves the staged records into their partitions.
+        """
+        if self._staging is None:
+            return
+        for directory, _, names in os.walk(self._staging):
+            target = os.path.join(self.root, os.path.relpath(directory, self._staging))
+            os.makedirs(target, exist_ok=True)
+            for name in names:
+                os.replace(os.path.join(directory, name), os.path.join(target, name))
+        self.discard_staged()
+
+    def discard_staged(self):
+        """
+        Drops the staged records.
+        """
+        if self._staging is not None:
+            shutil.rmtree(self._staging, ignore_errors=True)
+            self._staging = None
+
+    def _write(self, changes, root):
+        if changes.empty:
+            return
+        load_dates = pd.to_datetime(changes['timestamp']).dt.strftime('%Y-%m-%d')
+        for (load_date, column), batch in changes.groupby([load_dates, 'column_name'], sort=False):
+            directory = os.path.join(root, f'load_date={load_date}', f'column_name={quote(str(column), safe="")}')
+            os.makedirs(directory, exist_ok=True)
+            # Zero-padded names keep the files of a partition in write order.
+            self._sequence += 1
+            name = f'part-{time.time_ns():020d}-{self._sequence:06d}.parquet'
+            pq.write_table(self._to_table(batch), os.path.join(directory, name))
+
+    def read(self, column=None, since=None, until=None, change_type=None):
+        """
+        Reads change records back, touching only the partitions and row groups that can match.
+
+        Args:
+            column (str, optional): Only return changes of this column. Defaults to None (all columns).
+            since (str or pd.Timestamp, optional): Only return changes at or after this time. Defaults to None.
+            until (str or pd.Timestamp, optional): Only return changes at or before this time. Defaults to None.
+            change_type (str, optional): Only return ``'update'``, ``'missing'``, ``'insert'`` or ``'delete'``
+                records. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The matching change records in ``HISTORY_COLUMNS`` layout, ordered by timestamp.
+        """
+        since = pd.Timestamp(since) if since is not None else None
+        until = pd.Timestamp(until) if until is not None else None
+        filters = []
+        if since is not None:
+            filters.append(('timestamp', '>=', since))
+        if until is not None:
+            filters.append(('timestamp', '<=', until))
+        if change_type is not None:
+            filters.append(('change_type', '=', change_type))
+
+        frames = []
+        for load_date in sorted(name for name in os.listdir(self.root) if name.startswith('load_date=')):
+            day = pd.Timestamp(load_date.split('=', 1)[1])
+            if (since is not None and day < since.normalize()) or (until is not None and day > until):
+                continue
+            date_dir = os.path.join(self.root, load_date)
+            for column_dir in sorted(os.listdir(date_dir)):
+                name = unquote(column_dir.split('=', 1)[1])
+                if column is not None and name != column:
+                    continue
+                partition = os.path.join(date_dir, column_dir)
+                for part in sorted(os.listdir(partition)):
+                    table = pq.read_table(os.path.join(partition, part), filters=filters or None)
+                    if table.num_rows:
+                        frames.append(self._to_frame(table, name))
+
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        history = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return history.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    @staticmethod
+    def _to_table(batch):
+        """
+        Converts a batch of change records for one column into a typed Arrow table.
+
+        Args:
+            batch (pd.DataFrame): Change records of a single column.
+
+        Returns:
+            pa.Table: The records without the partition column.
+        """
+        values = pd.concat([batch['old_value'], batch['new_value']], ignore_index=True)
+        try:
+            typed = pa.array(values.infer_objects(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            typed = pa.array(values.map(lambda v: None if pd.isna(v) else str(v)), type=pa.string())
+        keys = batch['row_key']
+        if keys.map(lambda k: isinstance(k, tuple)).any():
+            keys = keys.map(lambda k: {f'k{i}': part for i, part in enumerate(k)})
+        return pa.table({
+            'old_value': typed.slice(0, len(batch)),
+            'new_value': typed.slice(len(batch)),
+            'timestamp': pa.array(pd.to_datetime(batch['timestamp'])),
+            'change_type': pa.array(batch['change_type'].astype(str)),
+            'row_key': pa.array(keys.tolist()),
+        })
+
+    @staticmethod
+    def _to_frame(table, column):
+        """
+        Converts a stored Arrow table back into change records.
+
+        Args:
+            table (pa.Table): The records read from one file.
+            column (str): The column the records belong to.
+
+        Returns:
+            pd.DataFrame: The records in ``HISTORY_COLUMNS`` layout.
+        """
+        frame = table.to_pandas()
+        if pa.types.is_struct(table.schema.field('row_key').type):
+            frame['row_key'] = frame['row_key'].map(lambda k: tuple(k.values()))
+        frame.insert(0, 'column_name', column)
+        return frame[HISTORY_COLUMNS]
@@ -7,6 +7,7 @@ from data_validation import check_missing_values, check_duplicates, check_anomal
     check_allowed_values, check_unique_values, check_date_range, check_column_dependency
 from historical_analysis import column_trends_over_time
 from analytics import plot_column_trends, plot_heatmap
+from correlation import correlation_matrix
 from data_management import UnifiedDataManager
 import tkinter as tk
 from tkinter import messagebox, simpledialog, Toplevel, ttk
@@ -50,7 +51,7 @@ def main_v2():
         elif choice == "3":
             print(model.get_history())
         elif choice == "4":
-            print(describe_data(model.get_data()))
+            print(model.cached(describe_data))
         elif choice == "5":
             column = input("Input the column name for visualization: ")
             plot_distribution(model.get_data(), column)
@@ -66,14 +67,14 @@ def main_v2():
                 print("All data types match the expected ones.")
 
         elif choice == "8":
-            missing_values = check_missing_values(model.get_data())
+            missing_values = model.cached(check_missing_values)
             if not missing_values.empty:
                 print("Missing values detected:", missing_values)
             else:
                 print("No missing values.")
 
         elif choice == "9":
-            duplicates = check_duplicates(model.get_data())
+            duplicates = model.cached(check_duplicates)
             if not duplicates.empty:
                 print("Duplicates detected:", duplicates)
             else:
@@ -83,7 +84,7 @@ def main_v2():
             column = input("Enter the column name for checking: ")
             lower_bound = float(input("Enter the lower bound (or leave empty): ") or float('-inf'))
             upper_bound = float(input("Enter the upper bound (or leave empty): ") or float('inf'))
-            anomalies = check_anomalies(model.get_data(), column, lower_bound, upper_bound)
+            anomalies = model.cached(check_anomalies, column, lower_bound, upper_bound)
             if not anomalies.empty:
                 print("Anomalies detected:", anomalies)
             else:
@@ -92,16 +93,21 @@ def main_v2():
         elif choice == "11":
             column = input("Enter the column name for analysis: ")
             time_column = input("Enter the time column name: ")
-            trends = column_trends_over_time(model.get_data(), column, time_column)
+            granularity = input("Enter the granularity (day, week, month, quarter, year or leave empty): ") or None
+            if granularity:
+                trends = column_trends_over_time(model.get_data(), column, time_column, granularity,
+                                                 rollup=model.get_rollup(time_column, [column]))
+            else:
+                trends = model.cached(column_trends_over_time, column, time_column)
             plot_column_trends(trends, column, time_column)
 
         elif choice == "12":
-            plot_heatmap(model.get_data())
+            plot_heatmap(model.get_data(), matrix=model.cached(correlation_matrix))
         elif choice == "13":
             column = input("Enter the column name with dates for checking: ")
             start_date = input("Enter the start date (format YYYY-MM-DD or leave empty): ")
             end_date = input("Enter the end date (format YYYY-MM-DD or leave empty): ")
-            anomalies = check_anomalies(model.get_data(), columns=[column], date_range=(start_date, end_date))
+            anomalies = model.cached(check_anomalies, columns=[column], date_range=(start_date, end_date))
             if not anomalies.empty:
                 print("Anomalous dates detected:", anomalies)
             else:
@@ -109,7 +115,7 @@ def main_v2():
 
         elif choice == "14":
             column = input("Enter the name of the categorical column to check: ")
-            anomalies = check_anomalies(model.get_data(), columns=[column])
+            anomalies = model.cached(check_anomalies, columns=[column])
             if not anomalies.empty:
                 print("Rare categories detected:", anomalies)
             else:
@@ -118,7 +124,7 @@ def main_v2():
         elif choice == "15":
             column = input("Enter the name of the column with strings for checking: ")
             pattern = input("Enter the regular expression for checking: ")
-            anomalies = check_anomalies(model.get_data(), columns=[column], regex_patterns={column: pattern})
+            anomalies = model.cached(check_anomalies, columns=[column], regex_patterns={column: pattern})
             if not anomalies.empty:
                 print("Strings that do not match the regular expression:", anomalies)
             else:
@@ -126,7 +132,7 @@ def main_v2():
 
         elif choice == "16":
             column = input("Enter the column name to check for uniqueness: ")
-            is_unique = check_unique_values(model.get_data(), column)
+            is_unique = model.cached(check_unique_values, column)
             if is_unique:
                 print("All values in the column are unique.")
             else:
@@ -135,7 +141,7 @@ def main_v2():
         elif choice == "17":
             column = input("Enter the column name to check allowed values: ")
             allowed_values = input("Enter allowed values separated by comma: ").split(',')
-            is_allowed = check_allowed_values(model.get_data(), column, allowed_values)
+            is_allowed = model.cached(check_allowed_values, column, allowed_values)
             if is_allowed:
                 print("All values in the column are within the allowed list.")
             else:
@@ -201,7 +207,7 @@ def main_gui():
         show_in_new_window(history)
 
     def show_statistics():
-        stats = describe_data(model.get_data())
+        stats = model.cached(describe_data)
         show_in_new_window(stats)
 
     def plot_data_distribution():
@@ -217,7 +223,7 @@ def main_gui():
         messagebox.showinfo("Info", message)
 
     def check_missing_values_gui():
-        missing_values = check_missing_values(model.get_data())
+        missing_values = model.cached(check_missing_values)
         if not missing_values.empty:
             show_in_new_window(missing_values)
         else:
@@ -226,19 +232,24 @@ def main_gui():
     def plot_column_trends_gui():
         column = ask_text_input("Input", "Enter the column name for analysis:")
         time_column = simpledialog.askstring("Input", "Enter the time column name:")
+        granularity = simpledialog.askstring("Input", "Enter the granularity (day, week, month, quarter, year) or leave empty:")
         if column and time_column:
-            trends = column_trends_over_time(model.get_data(), column, time_column)
+            if granularity:
+                trends = column_trends_over_time(model.get_data(), column, time_column, granularity,
+                                                 rollup=model.get_rollup(time_column, [column]))
+            else:
+                trends = model.cached(column_trends_over_time, column, time_column)
             plot_column_trends(trends, column, time_column)
 
     def plot_heatmap_gui():
-        plot_heatmap(model.get_data())
+        plot_heatmap(model.get_data(), matrix=model.cached(correlation_matrix))
 
     def check_date_range_gui():
         column = ask_text_input("Input", "Enter the date column name:")
         start_date = ask_text_input("Input", "Enter start date (YYYY-MM-DD):")
         end_date = ask_text_input("Input", "Enter end date (YYYY-MM-DD):")
         if column:
-            anomalies = check_anomalies(model.get_data(), columns=[column], date_range=(start_date, end_date))
+            anomalies = model.cached(check_anomalies, columns=[column], date_range=(start_date, end_date))
             if not anomalies.empty:
                 show_in_new_window(anomalies)
             else:
@@ -247,7 +258,7 @@ def main_gui():
     def check_rare_categorical_values_gui():
         column = ask_text_input("Input", "Enter the categorical column name:")
         if column:
-            anomalies = check_anomalies(model.get_data(), columns=[column])
+            anomalies = model.cached(check_anomalies, columns=[column])
             if not anomalies.empty:
                 show_in_new_window(anomalies)
             else:
@@ -257,7 +268,7 @@ def main_gui():
         column = ask_text_input("Input", "Enter the column name:")
         pattern = ask_text_input("Input", "Enter the regular expression:")
         if column and pattern:
-            anomalies = check_anomalies(model.get_data(), columns=[column], regex_patterns={column: pattern})
+            anomalies = model.cached(check_anomalies, columns=[column], regex_patterns={column: pattern})
             if not anomalies.empty:
                 show_in_new_window(anomalies)
             else:
@@ -266,7 +277,7 @@ def main_gui():
     def check_unique_values_gui():
         column = ask_text_input("Input", "Enter the column name to check for uniqueness:")
         if column:
-            is_unique = check_unique_values(model.get_data(), column)
+            is_unique = model.cached(check_unique_values, column)
             message = "All values in the column are unique." if is_unique else "There are non-unique values in the column."
             messagebox.showinfo("Info", message)
 
@@ -274,7 +285,7 @@ def main_gui():
         column = ask_text_input("Input", "Enter the column name to check allowed values:")
         allowed_values = ask_text_input("Input", "Enter allowed values separated by comma:").split(',')
         if column:
-            is_allowed = check_allowed_values(model.get_data(), column, allowed_values)
+            is_allowed = model.cached(check_allowed_values, column, allowed_values)
             message = "All values in the column are within the allowed list." if is_allowed else "There are values in the column not within the allowed list."
             messagebox.showinfo("Info", message)
 
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    ARROW_STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:
+    ARROW_STRING_DTYPE = None
+
+
+def optimize_dtypes(df, category_threshold=0.5, arrow_strings=True, previous=None):
+    """
+    Converts the columns of a DataFrame to compact dtypes without losing information.
+
+    Integers are downcast to the smallest integer type holding their range, floats become float32 only when
+    every value survives the round trip, string columns with few distinct values become ``category`` and the
+    remaining string columns move to Arrow-backed strings (when pyarrow is installed). Every conversion keeps
+    the values and missing markers, so comparing, hashing and validating the optimized frame gives the same
+    answers as the original.
+
+    With ``previous``, the dtypes of an earlier optimized load of the same data, every column keeps its earlier
+    dtype unless its values no longer fit: integers and floats are only ever widened, categoricals keep their
+    categories and append new values, and Arrow-backed strings stay Arrow-backed. Repeated loads thus get the
+    same dtypes instead of a width and category set picked anew from every load.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to optimize.
+        category_threshold (float, optional): Maximum ratio of distinct values to rows for a string column to
+            become categorical. Defaults to 0.5.
+        arrow_strings (bool, optional): Move the other string columns to Arrow-backed strings. Defaults to True.
+        previous (dict, optional): Dtypes by column name to keep stable. Defaults to None.
+
+    Returns:
+        tuple: The optimized DataFrame and a report with the dtype and memory use of every column before and
+            after the optimization.
+    """
+    optimized = {}
+    rows = []
+    for column in df.columns:
+        series = df[column]
+        converted = _optimize_column(series, category_threshold, arrow_strings)
+        if previous is not None and column in previous:
+            converted = _stable_column(series, converted, previous[column])
+        optimized[column] = converted
+        before = int(series.memory_usage(index=False, deep=True))
+        after = int(converted.memory_usage(index=False, deep=True))
+        rows.append({
+            'column': column,
+            'dtype_before': str(series.dtype),
+            'dtype_after': str(converted.dtype),
+            'bytes_before': before,
+            'bytes_after': after,
+            'saved': before - after,
+        })
+    result = pd.DataFrame(optimized, index=df.index)
+    result.columns = df.columns
+    return result, pd.DataFrame(rows, columns=['column', 'dtype_before', 'dtype_after', 'bytes_before',
+                                               'bytes_after', 'saved'])
+
+
+def _stable_column(series, converted, dtype):
+    """
+    Converts a column to the dtype an earlier load chose for it, widened where its values require.
+
+    Args:
+        series (pd.Series): The column.
+        converted (pd.Series): The column as ``_optimize_column`` converted it.
+        dtype: The earlier dtype.
+
+    Returns:
+        pd.Series: The converted column, or ``converted`` when the earlier dtype does not apply.
+    """
+    if converted.dtype == dtype:
+        return converted
+    strings = pd.api.types.is_string_dtype(series.dtype) and \
+        pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty')
+    if isinstance(dtype, pd.CategoricalDtype) and strings and not dtype.ordered:
+        new = pd.Index(series.dropna().unique()).difference(dtype.categories, sort=False)
+        return series.astype(pd.CategoricalDtype(dtype.categories.append(new)))
+    if ARROW_STRING_DTYPE is not None and dtype == ARROW_STRING_DTYPE and strings:
+        return series.astype(ARROW_STRING_DTYPE)
+    numeric = (pd.api.types.is_integer_dtype, pd.api.types.is_float_dtype)
+    if isinstance(dtype, np.dtype) and isinstance(converted.dtype, np.dtype) and \
+            any(check(dtype) for check in numeric) and any(check(converted.dtype) for check in numeric):
+        fits = np.can_cast(converted.dtype, dtype) or pd.api.types.is_integer_dtype(dtype) and \
+            pd.api.types.is_integer_dtype(converted.dtype) and \
+            (not len(series) or np.iinfo(dtype).min <= series.min() and series.max() <= np.iinfo(dtype).max)
+        return converted.astype(dtype if fits else np.promote_types(dtype, converted.dtype))
+    return converted
+
+
+def _optimize_column(series, category_threshold, arrow_strings):
+    """
+    Picks the most compact lossless dtype for one column.
+
+    Args:
+        series (pd.Series): The column.
+        category_threshold (float): Maximum ratio of distinct values to rows for a categorical.
+        arrow_strings (bool): Whether Arrow-backed strings may be used.
+
+    Returns:
+        pd.Series: The converted column, or the column itself when nothing smaller fits.
+    """
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or not isinstance(dtype, np.dtype) and \
+            not pd.api.types.is_string_dtype(dtype):
+        return series
+
+    if pd.api.types.is_integer_dtype(dtype):
+        downcast = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+        return pd.to_numeric(series, downcast=downcast)
+
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.to_numpy()
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(narrowed, index=series.index, name=series.name)
+        return series
+
+    if pd.api.types.is_string_dtype(dtype) and pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+        distinct = series.nunique()
+        if len(series) and distinct / len(series) <= category_threshold:
+            return series.astype('category')
+        if arrow_strings and ARROW_STRING_DTYPE is not None and dtype == object:
+            return series.astype(ARROW_STRING_DTYPE)
+    return series
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_NORMALIZERS = ('strip', 'lower')
+
+NORMALIZERS = {
+    'strip': lambda values: values.str.strip(),
+    'lower': lambda values: values.str.lower(),
+    'casefold': lambda values: values.str.casefold(),
+    'collapse_whitespace': lambda values: values.str.replace(r'\s+', ' ', regex=True),
+    # Decompose accented characters, drop the combining marks and fold case, so 'Café' and 'CAFE' meet.
+    'unicode_fold': lambda values: values.str.normalize('NFKD').str.replace(r'[\u0300-\u036f]', '', regex=True)
+    .str.casefold(),
+}
+
+
+def register_normalizer(name, normalizer):
+    """
+    Registers a normalizer under a name so it can be used in a normalizer chain.
+
+    Args:
+        name (str): The name of the normalizer.
+        normalizer (callable): Takes a ``pd.Series`` of distinct values and returns the normalized Series.
+    """
+    NORMALIZERS[name] = normalizer
+
+
+def normalize_column(series, normalizers=DEFAULT_NORMALIZERS, as_category=False):
+    """
+    Normalizes a string column by normalizing only its distinct values.
+
+    The column is dictionary-encoded (factorized, or taken as is when it is already categorical), the
+    normalizer chain runs over the dictionary, and the codes are remapped onto the normalized dictionary.
+    The cost is proportional to the number of distinct values rather than the number of rows. As with the
+    ``.str`` accessor, values that are not strings become missing.
+
+    Args:
+        series (pd.Series): The column to normalize.
+        normalizers (tuple, optional): Names of registered normalizers or callables, applied in order.
+            Defaults to ('strip', 'lower').
+        as_category (bool, optional): Return a categorical column instead of the input dtype. Defaults to False.
+
+    Returns:
+        tuple: The normalized column and a report with the number of rows and of distinct values before and
+            after normalization, plus how many distinct values collapsed into another one.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+
+    values = pd.Series(uniques, dtype=object)
+    values = values.where(values.map(lambda value: isinstance(value, str)))
+    for normalizer in normalizers:
+        values = (NORMALIZERS[normalizer] if isinstance(normalizer, str) else normalizer)(values)
+
+    unique_codes, normalized = pd.factorize(values)
+    remapped = np.where(codes >= 0, unique_codes[np.maximum(codes, 0)], -1) if len(unique_codes) else \
+        np.full(len(codes), -1)
+    result = pd.Series(pd.Categorical.from_codes(remapped, categories=normalized), index=series.index,
+                       name=series.name)
+    if not as_category and not isinstance(series.dtype, pd.CategoricalDtype):
+        result = result.astype(series.dtype)
+
+    distinct_before = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+    distinct_after = int(np.count_nonzero(np.bincount(remapped[remapped >= 0], minlength=1)))
+    report = {
+        'rows': len(series),
+        'distinct_before': distinct_before,
+        'distinct_after': distinct_after,
+        'collapsed': distinct_before - distinct_after,
+    }
+    return result, report
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# State of a worker process, set once by the pool initializer.
+_worker = {}
+
+
+def resolve_workers(workers):
+    """
+    Turns a ``workers`` argument into a number of processes.
+
+    Args:
+        workers (int): Number of worker processes, None or 1 for serial execution, -1 for one per CPU core.
+
+    Returns:
+        int: The number of processes, 1 meaning serial execution.
+
+    Raises:
+        ValueError: If ``workers`` is zero or below -1.
+    """
+    if workers is None:
+        return 1
+    if workers == -1:
+        return os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be a positive number, -1 or None.")
+    return workers
+
+
+def shard_columns(columns, workers):
+    """
+    Splits columns into contiguous shards, a few per worker so that slow columns even out.
+
+    Args:
+        columns (list): The column names in order.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Lists of column names; concatenated they give ``columns`` back.
+    """
+    columns = list(columns)
+    n_shards = min(len(columns), workers * 4)
+    return [list(shard) for shard in np.array_split(np.array(columns, dtype=object), n_shards)] if n_shards else []
+
+
+def map_shards(df, func, shards, workers):
+    """
+    Applies a function to column shards of a DataFrame in a pool of worker processes.
+
+    The DataFrame is written once to an uncompressed Arrow IPC file, which every worker memory-maps, so a task
+    only sends the names of its columns and receives the result. Frames that Arrow cannot represent are sent
+    to each worker once, when the worker starts.
+
+    Args:
+        df (pd.DataFrame): The source DataFrame.
+        func (callable): A module-level function called as ``func(frame, *extra)`` with the columns of a shard.
+        shards (list): Tuples of ``(columns, extra)``: the columns a task needs and its extra arguments.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: The results of ``func``, in the order of ``shards``.
+    """
+    directory = tempfile.mkdtemp(prefix='mdm-shared-')
+    try:
+        path = _share(df, directory)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(path, None if path else df, dict(df.dtypes))) as pool:
+            futures = [pool.submit(_run_task, func, columns, extra) for columns, extra in shards]
+            return [future.result() for future in futures]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _share(df, directory):
+    """
+    Writes a DataFrame to an Arrow IPC file for the workers to memory-map.
+
+    Args:
+        df (pd.DataFrame): The DataFrame.
+        directory (str): Where to write the file.
+
+    Returns:
+        str: The path of the file, or None if pyarrow is missing or cannot represent the frame.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+
+    if not all(isinstance(column, str) for column in df.columns) or df.columns.has_duplicates:
+        return None
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+    path = os.path.join(directory, 'frame.arrow')
+    feather.write_feather(table, path, compression='uncompressed')
+    return path
+
+
+def _attach(path, df, dtypes):
+    """
+    Pool initializer: maps the shared file, or keeps the frame sent to the worker.
+    """
+    _worker['dtypes'] = dtypes
+    _worker['frame'] = df
+    _worker['table'] = None
+    if path is not None:
+        import pyarrow.feather as feather
+
+        _worker['table'] = feather.read_table(path, memory_map=True)
+
+
+def _columns(columns):
+    """
+    Returns the given columns of the shared frame, with the dtypes they have in the source frame.
+
+    Args:
+        columns (list): The column names.
+
+    Returns:
+        pd.DataFrame: The columns, indexed like the source frame.
+    """
+    table = _worker['table']
+    if table is None:
+        return _worker['frame'][columns]
+    index_columns = [name for name in table.schema.pandas_metadata['index_columns'] if isinstance(name, str)]
+    frame = table.select(list(columns) + index_columns).to_pandas()
+    dtypes = _worker['dtypes']
+    changed = {column: dtypes[column] for column in columns if frame[column].dtype != dtypes[column]}
+    return frame.astype(changed) if changed else frame
+
+
+def _run_task(func, columns, extra):
+    return func(_columns(columns), *extra)
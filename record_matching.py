@@ -0,0 +1,429 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalization import DEFAULT_NORMALIZERS, normalize_column
+from parallel_backend import map_shards, resolve_workers
+
+# A prime above 2**32 for the universal hashes of MinHash; with multipliers below 2**31 nothing overflows uint64.
+_MINHASH_PRIME = np.uint64(4294967311)
+
+
+class RecordMatcher:
+    """
+    Finds duplicate and near-duplicate records without comparing every pair of rows.
+
+    Blocking indexes first propose candidate pairs. A sorted neighbourhood pairs rows that sort close to each
+    other on a key. MinHash-LSH buckets pair values that share enough q-grams. The candidates of all blockers are
+    united, and only those pairs are scored by the comparisons: vectorized similarity functions, averaged with
+    their weights. Pairs scoring at least ``threshold`` are matches, and the matches are grouped into clusters
+    with a union-find. Blocking and comparison run in worker processes when ``workers`` is set.
+    """
+
+    def __init__(self, threshold=0.8, workers=None):
+        """
+        Initializes a matcher without blockers and comparisons.
+
+        Args:
+            threshold (float, optional): Minimum weighted similarity of a match, between 0 and 1. Defaults to 0.8.
+            workers (int, optional): Number of worker processes, -1 for one per CPU core. Defaults to None
+                (run in this process).
+        """
+        self.threshold = threshold
+        self.workers = workers
+        self.blockers = []
+        self.comparisons = []
+        self.last_report = {}
+
+    def add_sorted_neighbourhood(self, column, window=5):
+        """
+        Adds a sorted neighbourhood blocker: rows are sorted on the normalized column and every row is paired
+        with the ``window - 1`` rows following it.
+
+        Args:
+            column (str): The blocking key.
+            window (int, optional): Size of the sliding window. Defaults to 5.
+
+        Returns:
+            RecordMatcher: The matcher itself, for chaining.
+
+        Raises:
+            ValueError: If ``window`` is below 2.
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2.")
+        self.blockers.append({'kind': 'sorted_neighbourhood', 'column': column, 'window': window})
+        return self
+
+    def add_minhash_lsh(self, column, q=3, num_perm=64, bands=16, max_bucket=1000, seed=0):
+        """
+        Adds a MinHash-LSH blocker: the q-gram sets of the normalized values are MinHashed, and values that
+        agree on all signature rows of at least one band share a bucket.
+
+        With ``r = num_perm / bands`` rows per band, two values of q-gram Jaccard similarity ``s`` become
+        candidates with probability ``1 - (1 - s ** r) ** bands``.
+
+        Args:
+            column (str): The blocking column.
+            q (int, optional): Length of the q-grams. Defaults to 3.
+            num_perm (int, optional): Number of MinHash functions. Defaults to 64.
+            bands (int, optional): Number of LSH bands, must divide ``num_perm``. Defaults to 16.
+            max_bucket (int, optional): Buckets holding more distinct values than this are skipped, since they
+                come from very common q-grams and would produce quadratic numbers of pairs. Defaults to 1000.
+            seed (int, optional): Seed of the hash functions. Defaults to 0.
+
+        Returns:
+            RecordMatcher: The matcher itself, for chaining.
+
+        Raises:
+            ValueError: If ``bands`` does not divide ``num_perm``.
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm.")
+        self.blockers.append({'kind': 'minhash_lsh', 'column': column, 'q': q, 'num_perm': num_perm,
+                              'bands': bands, 'max_bucket': max_bucket, 'seed': seed})
+        return self
+
+    def add_comparison(self, column, method='qgram', weight=1.0, q=3, scale=None):
+        """
+        Adds a column similarity to the match score.
+
+        Args:
+            column (str): The column to compare.
+            method (str or callable, optional): ``'qgram'`` (Jaccard similarity of the q-gram sets of the
+                normalized strings), ``'exact'`` (1 if equal), ``'numeric'`` (``1 - |a - b| / scale``, floored
+                at 0) or a callable taking the left and right values as two Series and returning similarities
+                between 0 and 1. Defaults to 'qgram'.
+            weight (float, optional): Weight of the column in the score. Defaults to 1.0.
+            q (int, optional): Length of the q-grams for ``'qgram'``. Defaults to 3.
+            scale (float, optional): Difference at which ``'numeric'`` similarity reaches 0. Defaults to None
+                (the larger of the two absolute values).
+
+        Returns:
+            RecordMatcher: The matcher itself, for chaining.
+
+        Raises:
+            ValueError: If the method is unknown.
+        """
+        if not callable(method) and method not in _SIMILARITIES:
+            raise ValueError(f"Unknown comparison method: {method}")
+        self.comparisons.append({'column': column, 'method': method, 'weight': weight, 'q': q, 'scale': scale})
+        return self
+
+    def candidate_pairs(self, df):
+        """
+        Runs the blockers and unites their candidate pairs.
+
+        Args:
+            df (pd.DataFrame): The records.
+
+        Returns:
+            tuple: Left and right row positions of the candidate pairs, left below right, each pair once.
+
+        Raises:
+            ValueError: If no blocker was added.
+        """
+        if not self.blockers:
+            raise ValueError("Add at least one blocker before matching.")
+        started = time.perf_counter()
+        workers = resolve_workers(self.workers)
+        if workers == 1 or len(self.blockers) < 2:
+            blocked = [_block(df, blocker) for blocker in self.blockers]
+        else:
+            tasks = [([blocker['column']], (blocker,)) for blocker in self.blockers]
+            blocked = map_shards(df, _block, tasks, min(workers, len(tasks)))
+
+        n = len(df)
+        codes = np.unique(np.concatenate([left * n + right for left, right in blocked] + [np.empty(0, np.int64)]))
+        possible = n * (n - 1) // 2
+        self.last_report = {
+            'rows': n,
+            'possible_pairs': possible,
+            'blocker_pairs': {f"{blocker['kind']}:{blocker['column']}": len(pairs[0])
+                              for blocker, pairs in zip(self.blockers, blocked)},
+            'candidate_pairs': len(codes),
+            'reduction_ratio': 1 - len(codes) / possible if possible else 0.0,
+            'blocking_seconds': time.perf_counter() - started,
+        }
+        return codes // n, codes % n
+
+    def match(self, df):
+        """
+        Finds the matching pairs and groups them into clusters.
+
+        Args:
+            df (pd.DataFrame): The records.
+
+        Returns:
+            tuple: A DataFrame of the matching pairs (index labels ``left`` and ``right``, the ``score`` and one
+                similarity column per comparison) and a Series with the cluster number of every row, indexed
+                like ``df``; rows without a match form a cluster of their own. ``last_report`` holds the
+                pair counts, the candidate-pair reduction ratio and the timings.
+
+        Raises:
+            ValueError: If no blocker or no comparison was added.
+        """
+        if not self.comparisons:
+            raise ValueError("Add at least one comparison before matching.")
+        left, right = self.candidate_pairs(df)
+
+        started = time.perf_counter()
+        workers = resolve_workers(self.workers)
+        columns = list(dict.fromkeys(comparison['column'] for comparison in self.comparisons))
+        if workers == 1 or len(left) < 2 * workers:
+            similarities = _compare(df, left, right, self.comparisons)
+        else:
+            tasks = [(columns, (left_chunk, right_chunk, self.comparisons))
+                     for left_chunk, right_chunk in zip(np.array_split(left, workers * 4),
+                                                        np.array_split(right, workers * 4))]
+            similarities = np.vstack(map_shards(df, _compare, tasks, workers))
+
+        weights = np.array([comparison['weight'] for comparison in self.comparisons], dtype=float)
+        scores = similarities @ weights / weights.sum() if len(left) else np.empty(0)
+        matched = scores >= self.threshold
+        pairs = pd.DataFrame({'left': df.index[left[matched]], 'right': df.index[right[matched]],
+                              'score': scores[matched]})
+        for j, comparison in enumerate(self.comparisons):
+            pairs[f"similarity_{comparison['column']}"] = similarities[matched, j]
+
+        labels = connected_components(len(df), left[matched], right[matched])
+        clusters = pd.Series(pd.factorize(labels)[0], index=df.index, name='cluster')
+        self.last_report.update({
+            'matches': int(matched.sum()),
+            'clusters': int(clusters.nunique()),
+            'duplicate_clusters': int((np.bincount(clusters.to_numpy()) > 1).sum()),
+            'comparison_seconds': time.perf_counter() - started,
+        })
+        return pairs, clusters
+
+
+def connected_components(n, left, right):
+    """
+    Groups the rows linked by pairs with a union-find, vectorized as label propagation with pointer jumping.
+
+    Args:
+        n (int): Number of rows.
+        left (np.ndarray): Left row positions of the links.
+        right (np.ndarray): Right row positions of the links.
+
+    Returns:
+        np.ndarray: For every row, the smallest row position of its component.
+    """
+    parent = np.arange(n)
+    while True:
+        roots = np.minimum(parent[left], parent[right])
+        updated = parent.copy()
+        np.minimum.at(updated, parent[left], roots)
+        np.minimum.at(updated, parent[right], roots)
+        # Path compression: point every row straight at its root.
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, parent):
+            return parent
+        parent = updated
+
+
+def _normalized(series):
+    text = series.astype(object)
+    values, _ = normalize_column(text.where(text.isna(), text.astype(str)), DEFAULT_NORMALIZERS)
+    return values
+
+
+def _block(df, blocker):
+    """
+    Runs one blocker.
+
+    Args:
+        df (pd.DataFrame): The records.
+        blocker (dict): The blocker settings.
+
+    Returns:
+        tuple: Left and right row positions of its candidate pairs, left below right.
+    """
+    values = _normalized(df[blocker['column']])
+    if blocker['kind'] == 'sorted_neighbourhood':
+        present = np.flatnonzero(values.notna().to_numpy())
+        order = present[np.argsort(values.iloc[present].to_numpy(dtype=object), kind='stable')]
+        left = np.concatenate([order[:-offset] for offset in range(1, blocker['window']) if offset < len(order)]
+                              + [np.empty(0, np.intp)])
+        right = np.concatenate([order[offset:] for offset in range(1, blocker['window']) if offset < len(order)]
+                               + [np.empty(0, np.intp)])
+        return np.minimum(left, right).astype(np.int64), np.maximum(left, right).astype(np.int64)
+
+    codes, uniques = pd.factorize(values)
+    value_left, value_right = _lsh_pairs(list(uniques), blocker['q'], blocker['num_perm'], blocker['bands'],
+                                         blocker['max_bucket'], blocker['seed'])
+    # Rows with the same value pair up as well, unless the value is as common as a skipped bucket.
+    repeated = np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(uniques)) <= blocker['max_bucket'])
+    value_left = np.concatenate([value_left, repeated])
+    value_right = np.concatenate([value_right, repeated])
+
+    rows = pd.DataFrame({'code': codes, 'row': np.arange(len(codes))})
+    rows = rows[rows['code'] >= 0]
+    pairs = pd.DataFrame({'code_left': value_left, 'code_right': value_right})
+    pairs = pairs.merge(rows.rename(columns={'code': 'code_left', 'row': 'left'}), on='code_left')
+    pairs = pairs.merge(rows.rename(columns={'code': 'code_right', 'row': 'right'}), on='code_right')
+    left, right = pairs['left'].to_numpy(), pairs['right'].to_numpy()
+    keep = left != right
+    return (np.minimum(left, right)[keep].astype(np.int64), np.maximum(left, right)[keep].astype(np.int64))
+
+
+def _shingle_sets(values, q):
+    """
+    Splits strings into their distinct q-grams.
+
+    Args:
+        values (list): The strings.
+        q (int): Length of the q-grams.
+
+    Returns:
+        tuple: The value number and the q-gram id of every (value, q-gram) pair, sorted by value and then by
+            q-gram, and the number of distinct q-grams of every value.
+    """
+    shingles = [[value[i:i + q] for i in range(max(len(value) - q + 1, 1))] for value in values]
+    owners = np.repeat(np.arange(len(values)), [len(items) for items in shingles])
+    flat = np.array([shingle for items in shingles for shingle in items], dtype=object)
+    ids = pd.factorize(flat)[0] if len(flat) else np.empty(0, np.intp)
+    width = int(ids.max(initial=0)) + 1
+    keys = np.unique(owners.astype(np.int64) * width + ids)
+    owners, ids = keys // width, keys % width
+    return owners, ids, np.bincount(owners, minlength=len(values))
+
+
+def _lsh_pairs(values, q, num_perm, bands, max_bucket, seed):
+    """
+    Finds the pairs of values that share a MinHash-LSH bucket.
+
+    Args:
+        values (list): The distinct normalized strings.
+        q (int): Length of the q-grams.
+        num_perm (int): Number of MinHash functions.
+        bands (int): Number of bands.
+        max_bucket (int): Larger buckets are skipped.
+        seed (int): Seed of the hash functions.
+
+    Returns:
+        tuple: Left and right value numbers of the candidate pairs.
+    """
+    if len(values) < 2:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    owners, ids, sizes = _shingle_sets(values, q)
+    hashes = pd.util.hash_array(ids.astype(np.int64)) & np.uint64(0xFFFFFFFF)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 31, num_perm, dtype=np.uint64)
+    offsets = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint64)
+    signatures = np.empty((len(values), num_perm), dtype=np.uint64)
+    for j in range(num_perm):
+        signatures[:, j] = np.minimum.reduceat((multipliers[j] * hashes + offsets[j]) % _MINHASH_PRIME, starts)
+
+    rows = num_perm // bands
+    lefts, rights = [], []
+    for band in range(bands):
+        bucket = np.zeros(len(values), dtype=np.uint64)
+        for j in range(band * rows, (band + 1) * rows):
+            bucket = bucket * np.uint64(1000003) ^ signatures[:, j]
+        order = np.argsort(bucket, kind='stable')
+        sorted_buckets = bucket[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+        group_size = np.diff(np.r_[group_start, len(order)])
+        size = np.repeat(group_size, group_size)
+        position = np.arange(len(order)) - np.repeat(group_start, group_size)
+        usable = size <= max_bucket
+        for offset in range(1, int(group_size[group_size <= max_bucket].max(initial=1))):
+            pair = usable & (position + offset < size)
+            lefts.append(order[np.flatnonzero(pair)])
+            rights.append(order[np.flatnonzero(pair) + offset])
+    if not lefts:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def _compare(df, left, right, comparisons):
+    """
+    Scores candidate pairs on every comparison.
+
+    Args:
+        df (pd.DataFrame): The records.
+        left (np.ndarray): Left row positions.
+        right (np.ndarray): Right row positions.
+        comparisons (list): The comparison settings.
+
+    Returns:
+        np.ndarray: One row per pair and one column per comparison, with similarities between 0 and 1.
+    """
+    similarities = np.zeros((len(left), len(comparisons)))
+    for j, comparison in enumerate(comparisons):
+        series = df[comparison['column']]
+        method = comparison['method']
+        if callable(method):
+            scores = np.asarray(method(series.iloc[left].reset_index(drop=True),
+                                       series.iloc[right].reset_index(drop=True)), dtype=float)
+        else:
+            scores = _SIMILARITIES[method](series, left, right, comparison)
+        similarities[:, j] = np.nan_to_num(scores, nan=0.0)
+    return similarities
+
+
+def _exact_similarity(series, left, right, comparison):
+    values = series.to_numpy(dtype=object)
+    equal = pd.Series(values[left]).eq(pd.Series(values[right])).to_numpy(dtype=bool, na_value=False)
+    return equal.astype(float)
+
+
+def _numeric_similarity(series, left, right, comparison):
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    a, b = values[left], values[right]
+    scale = comparison['scale']
+    if scale is None:
+        scale = np.maximum(np.abs(a), np.abs(b))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(a == b, 1.0, 1 - np.abs(a - b) / scale)
+    return np.clip(scores, 0, 1)
+
+
+def _qgram_similarity(series, left, right, comparison):
+    """
+    Jaccard similarity of the q-gram sets, computed once per distinct pair of values.
+
+    The q-grams of the left value are looked up among the sorted (value, q-gram) keys of the right value,
+    so the cost is linear in the q-grams of the compared values.
+    """
+    rows = np.unique(np.concatenate([left, right]))
+    codes, uniques = pd.factorize(_normalized(series.iloc[rows]))
+    row_codes = np.full(len(series), -1)
+    row_codes[rows] = codes
+    a, b = row_codes[left], row_codes[right]
+    known = (a >= 0) & (b >= 0)
+    scores = np.zeros(len(left))
+    if not known.any():
+        return scores
+
+    pair_keys, inverse = np.unique(a[known].astype(np.int64) * len(uniques) + b[known], return_inverse=True)
+    pa, pb = pair_keys // len(uniques), pair_keys % len(uniques)
+    owners, ids, sizes = _shingle_sets(list(uniques), comparison['q'])
+    width = int(ids.max(initial=0)) + 1
+    keys = owners * width + ids
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    counts = sizes[pa]
+    pair_ids = np.repeat(np.arange(len(pa)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    probe = pb[pair_ids] * width + ids[np.repeat(starts[pa], counts) + within]
+    found = keys[np.minimum(np.searchsorted(keys, probe), len(keys) - 1)] == probe
+    shared = np.bincount(pair_ids, weights=found, minlength=len(pa))
+    jaccard = shared / (sizes[pa] + sizes[pb] - shared)
+    scores[known] = jaccard[inverse.ravel()]
+    return scores
+
+
+_SIMILARITIES = {
+    'exact': _exact_similarity,
+    'numeric': _numeric_similarity,
+    'qgram': _qgram_similarity,
+}
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+
+
+def _freeze(value):
+    """
+    Turns a call parameter into a hashable cache key component.
+
+    Args:
+        value: The parameter. Lists, tuples, dicts and sets are converted recursively.
+
+    Returns:
+        The hashable equivalent of ``value``.
+
+    Raises:
+        TypeError: If ``value`` (or an element of it) cannot be hashed.
+    """
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        items = sorted(((_freeze(key), _freeze(item)) for key, item in value.items()), key=lambda item: repr(item[0]))
+        return 'dict', tuple(items)
+    if isinstance(value, (set, frozenset)):
+        return 'set', frozenset(_freeze(item) for item in value)
+    hash(value)
+    # Keep the type, so that equal values of different types (1, 1.0 and True) do not share a result.
+    return type(value), value
+
+
+class ResultCache:
+    """
+    A bounded least-recently-used cache for the results of analytics, validation and profiling functions.
+
+    A result is stored under the data it was computed from, identified by a scope (e.g. a table name) and the
+    version of that data, together with the function and its call parameters. Loading new data bumps the
+    version, so stale results are never returned; ``invalidate`` also drops them right away instead of letting
+    them age out. Results are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Initializes an empty cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of results kept. Defaults to 128.
+
+        Raises:
+            ValueError: If ``maxsize`` is below 1.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, scope, version, func, df, *args, **kwargs):
+        """
+        Returns the cached result of ``func(df, *args, **kwargs)``, computing and storing it on a miss.
+
+        Calls with parameters that cannot be hashed are computed without being cached.
+
+        Args:
+            scope (hashable): What ``df`` is, e.g. a table name.
+            version (hashable): The version of ``df``; results of other versions are not reused.
+            func (callable): The function, called with ``df`` as its first argument.
+            df: The data passed to ``func``.
+            *args: Further positional arguments of ``func``.
+            **kwargs: Keyword arguments of ``func``.
+
+        Returns:
+            The result of ``func``.
+        """
+        try:
+            key = (scope, version, func, _freeze(args), _freeze(kwargs))
+        except TypeError:
+            self.misses += 1
+            return func(df, *args, **kwargs)
+
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        result = func(df, *args, **kwargs)
+        self.entries[key] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def invalidate(self, scope=None):
+        """
+        Drops cached results.
+
+        Args:
+            scope (hashable, optional): Only drop the results of this scope. Defaults to None (everything).
+
+        Returns:
+            int: The number of results dropped.
+        """
+        if scope is None:
+            dropped = len(self.entries)
+            self.entries.clear()
+            return dropped
+        stale = [key for key in self.entries if key[0] == scope]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+
+
+def k_for_error(error):
+    """
+    Picks the KLL accuracy parameter for a target rank error.
+
+    Uses the empirical bound of the KLL sketch, rank error ~ 2.296 / k ** 0.9723 with 99% confidence.
+
+    Args:
+        error (float): The tolerated normalized rank error, e.g. 0.01 for one percent.
+
+    Returns:
+        int: The parameter ``k``.
+
+    Raises:
+        ValueError: If ``error`` is not between 0 and 1.
+    """
+    if not 0 < error < 1:
+        raise ValueError("error must be between 0 and 1.")
+    return max(8, math.ceil((2.296 / error) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    """
+    A mergeable quantile sketch (Karnin, Lang and Liberty, 2016).
+
+    Values are kept in a stack of compactors. An item at level ``h`` stands for ``2 ** h`` input values. When a
+    level outgrows its capacity it is sorted, and every other item (with a random offset) moves up a level. The
+    capacities shrink geometrically towards the lower levels, so the sketch holds O(k) items regardless of the
+    number of values, with a rank error of roughly ``2.3 / k``. Sketches of separate chunks or workers merge into
+    the sketch of all their values. As long as nothing was compacted, quantiles are exact.
+    """
+
+    def __init__(self, k=200, seed=None):
+        """
+        Initializes an empty sketch.
+
+        Args:
+            k (int, optional): Accuracy parameter, the capacity of the top level. Defaults to 200 (about 1.3%
+                rank error). See ``k_for_error``.
+            seed (int, optional): Seed for the compaction offsets. Defaults to None.
+        """
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def error(self):
+        """
+        float: The approximate normalized rank error of the sketch.
+        """
+        return 2.296 / self.k ** 0.9723
+
+    def update(self, values):
+        """
+        Adds values to the sketch. Missing values are ignored.
+
+        Args:
+            values (array-like): The values to add.
+
+        Returns:
+            KLLSketch: The sketch itself.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one.
+
+        Args:
+            other (KLLSketch): The sketch to merge.
+
+        Returns:
+            KLLSketch: The sketch itself.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays behind, so the promoted pairs cover the same weight.
+                keep = items[:len(items) % 2]
+                promoted = items[len(keep) + self._rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                # Adding a level shrinks the capacities below it, so start over from the bottom.
+                level = 0
+                continue
+            level += 1
+
+    def quantile(self, q):
+        """
+        Estimates quantiles of the values seen.
+
+        Args:
+            q (float or array-like): Quantile(s) between 0 and 1.
+
+        Returns:
+            float or np.ndarray: The estimated quantile(s), NaN for an empty sketch. While the sketch is exact,
+                the result matches ``np.quantile`` with linear interpolation.
+        """
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan)[()]
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        result = items[np.minimum(positions, len(items) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result[()]
+
+    def rank(self, value):
+        """
+        Estimates the fraction of the values seen that are at most ``value``.
+
+        Args:
+            value (float): The value.
+
+        Returns:
+            float: The estimated normalized rank.
+        """
+        if not self.count:
+            return np.nan
+        weight = sum(np.count_nonzero(items <= value) * 2.0 ** level for level, items in enumerate(self.levels))
+        return weight / sum(len(items) * 2.0 ** level for level, items in enumerate(self.levels))
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+SURVIVORSHIP_RULES = ('most_recent', 'most_frequent', 'longest', 'source_priority')
+
+
+def build_golden_records(df, clusters, rules=None, default_rule='most_frequent', timestamp_column=None,
+                         source_column=None, source_priority=None):
+    """
+    Consolidates clusters of duplicate records into one golden record per cluster.
+
+    For every column, a survivorship rule ranks the non-missing values of a cluster and the best one survives:
+
+    - ``most_recent``: the value of the row with the latest ``timestamp_column``.
+    - ``most_frequent``: the value occurring most often in the cluster.
+    - ``longest``: the value with the longest text representation.
+    - ``source_priority``: the value of the row whose ``source_column`` comes first in ``source_priority``.
+
+    Ties go to the row that comes first in ``df``. A column is resolved for all clusters at once: each rule
+    turns into a per-row rank, the rows are sorted by cluster and rank, and the first row of every cluster
+    wins. No Python loop runs per cluster.
+
+    Args:
+        df (pd.DataFrame): The records.
+        clusters (str or pd.Series or array-like): A column of ``df`` with the cluster of every row, a Series
+            aligned with the index of ``df``, or one cluster label per row. Rows without a cluster are ignored.
+        rules (dict, optional): Survivorship rule per column. Defaults to None (``default_rule`` everywhere).
+        default_rule (str, optional): The rule of columns not listed in ``rules``. Defaults to 'most_frequent'.
+        timestamp_column (str, optional): Column ordering the rows for ``most_recent``. Defaults to None.
+        source_column (str, optional): Column naming the source system of a row, for ``source_priority``.
+            Defaults to None.
+        source_priority (list, optional): Sources from most to least trusted; unlisted sources rank last.
+            Defaults to None.
+
+    Returns:
+        tuple: The golden records, indexed by cluster, and their lineage: a DataFrame of the same shape holding
+            for every golden field the index label of the row it was taken from (missing when no row of the
+            cluster had a value).
+
+    Raises:
+        ValueError: If a rule is unknown, a column is missing, or a rule lacks the column it needs.
+    """
+    rules = dict(rules or {})
+    for column, rule in list(rules.items()) + [(None, default_rule)]:
+        if rule not in SURVIVORSHIP_RULES:
+            raise ValueError(f"Unknown survivorship rule: {rule}")
+        if column is not None and column not in df:
+            raise ValueError(f"Column '{column}' not found in dataframe.")
+    used = set(rules.values()) | {default_rule}
+    if 'most_recent' in used and timestamp_column not in df:
+        raise ValueError("The 'most_recent' rule needs a timestamp_column of the dataframe.")
+    if 'source_priority' in used and (source_column not in df or source_priority is None):
+        raise ValueError("The 'source_priority' rule needs a source_column of the dataframe and a source_priority.")
+
+    if isinstance(clusters, str):
+        cluster_values = df[clusters].to_numpy()
+        columns = [column for column in df.columns if column != clusters]
+    else:
+        cluster_values = clusters.reindex(df.index).to_numpy() if isinstance(clusters, pd.Series) else \
+            np.asarray(clusters)
+        columns = list(df.columns)
+    if len(cluster_values) != len(df):
+        raise ValueError("clusters must have one entry per row.")
+    codes, labels = pd.factorize(cluster_values, sort=True)
+
+    context = {'df': df, 'codes': codes, 'timestamp_column': timestamp_column, 'source_column': source_column,
+               'source_priority': source_priority}
+    golden, lineage = {}, {}
+    for column in columns:
+        values = df[column]
+        rows = np.flatnonzero((codes >= 0) & values.notna().to_numpy())
+        rank = _RANKS[rules.get(column, default_rule)](values, rows, context)
+        # Sort by cluster, then rank, then row, and keep the first row of every cluster.
+        order = rows[_sort_order(codes[rows], rank, len(labels))]
+        ordered_clusters = codes[order]
+        first = np.r_[True, ordered_clusters[1:] != ordered_clusters[:-1]] if len(order) else np.empty(0, bool)
+        winners = np.full(len(labels), -1)
+        winners[ordered_clusters[first]] = order[first]
+
+        found = pd.Series(winners >= 0)
+        golden[column] = values.iloc[np.maximum(winners, 0)].reset_index(drop=True).where(found)
+        lineage[column] = pd.Series(df.index.take(np.maximum(winners, 0)), dtype=object).where(found, None)
+
+    index = pd.Index(labels, name='cluster')
+    golden = pd.DataFrame(golden, columns=columns).set_axis(index)
+    lineage = pd.DataFrame(lineage, columns=columns).set_axis(index)
+    return golden, lineage
+
+
+def _sort_order(clusters, rank, n_clusters):
+    """
+    Orders rows by cluster and rank. The sort is stable, so equal ranks keep the row order.
+
+    Args:
+        clusters (np.ndarray): Cluster code of every row.
+        rank (np.ndarray): Integer rank of every row, lower is better.
+        n_clusters (int): Number of clusters.
+
+    Returns:
+        np.ndarray: The sorting permutation.
+    """
+    if not len(rank):
+        return np.empty(0, dtype=np.intp)
+    rank = rank.astype(np.int64) - rank.min()
+    span = int(rank.max()) + 1
+    if n_clusters * span < 2 ** 62:
+        # Both keys fit in one integer, which sorts much faster than a lexicographic sort.
+        return np.argsort(clusters.astype(np.int64) * span + rank, kind='stable')
+    return np.lexsort((rank, clusters))
+
+
+def _most_recent_rank(values, rows, context):
+    timestamps = pd.to_datetime(context['df'][context['timestamp_column']].iloc[rows])
+    missing = timestamps.isna().to_numpy()
+    ticks = timestamps.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    latest = ticks[~missing].max(initial=0)
+    # Later is better; rows without a timestamp rank last.
+    return np.where(missing, latest - ticks[~missing].min(initial=0) + 1, latest - ticks)
+
+
+def _most_frequent_rank(values, rows, context):
+    value_codes, uniques = pd.factorize(values.iloc[rows])
+    keys = context['codes'][rows].astype(np.int64) * max(len(uniques), 1) + value_codes
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return -counts[inverse.ravel()]
+
+
+def _longest_rank(values, rows, context):
+    return -values.iloc[rows].astype(str).str.len().to_numpy()
+
+
+def _source_priority_rank(values, rows, context):
+    priority = pd.Index(context['source_priority'])
+    rank = priority.get_indexer(context['df'][context['source_column']].iloc[rows])
+    return np.where(rank >= 0, rank, len(priority))
+
+
+_RANKS = {
+    'most_recent': _most_recent_rank,
+    'most_frequent': _most_frequent_rank,
+    'longest': _longest_rank,
+    'source_priority': _source_priority_rank,
+}
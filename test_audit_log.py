@@ -0,0 +1,60 @@
+import gc
+import os
+import subprocess
+import sys
+import weakref
+
+import pandas as pd
+
+from audit_log import AuditLog
+
+
+def test_buffered_actions_are_flushed_at_exit(tmp_path):
+    path = tmp_path / 'actions.jsonl'
+    script = f"from audit_log import AuditLog\nAuditLog({str(path)!r}).append('load', 'alice', 'customers')\n"
+    subprocess.run([sys.executable, '-c', script], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    assert AuditLog(str(path)).to_frame()['action'].tolist() == ['load']
+
+
+def test_close_flushes_buffered_actions(tmp_path):
+    path = tmp_path / 'actions.jsonl'
+    with AuditLog(str(path)) as log:
+        log.append('load', 'alice', 'customers')
+
+    assert path.exists() and log.to_frame()['user'].tolist() == ['alice']
+
+
+def test_unreferenced_log_is_collected_and_flushed(tmp_path):
+    path = tmp_path / 'actions.jsonl'
+    log = AuditLog(str(path))
+    log.append('load', 'alice', 'customers')
+    reference = weakref.ref(log)
+    del log
+    gc.collect()
+
+    assert reference() is None
+    assert AuditLog(str(path)).to_frame()['user'].tolist() == ['alice']
+
+
+def test_filtered_read_matches_filtering_the_whole_log(tmp_path):
+    path = tmp_path / 'actions.jsonl'
+    log = AuditLog(str(path), batch_size=7)
+    for i in range(100):
+        log.append(['load', 'merge', 'export'][i % 3], ['alice', 'bob'][i % 2], f'step {i}')
+    everything = log.to_frame()
+    middle = everything['timestamp'].iloc[40]
+
+    assert len(everything) == 100 and everything['details'].iloc[-1] == 'step 99'
+    for filters in [{'user': 'bob'}, {'action': 'merge', 'since': middle}, {'until': middle, 'user': 'alice'},
+                    {'user': 'nobody'}]:
+        expected = everything
+        if 'user' in filters:
+            expected = expected[expected['user'] == filters['user']]
+        if 'action' in filters:
+            expected = expected[expected['action'] == filters['action']]
+        if 'since' in filters:
+            expected = expected[expected['timestamp'] >= filters['since']]
+        if 'until' in filters:
+            expected = expected[expected['timestamp'] <= filters['until']]
+        pd.testing.assert_frame_equal(log.to_frame(**filters), expected.reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import correlation_from_file, correlation_matrix
+
+
+def _reference(df, method='pearson'):
+    # Centering 'c' is exact and keeps pandas from losing digits to its mean of 1e9.
+    return df.assign(c=df['c'] - 1e9).astype(float).corr(method=method)
+
+
+def _frame(n=500, missing=True, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        'a': base,
+        'b': 2 * base + rng.normal(size=n),
+        'c': 1e9 + rng.normal(size=n) * 1e-3,
+        'd': rng.integers(0, 5, n),
+        'flag': rng.random(n) > 0.5,
+        'label': rng.choice(['x', 'y'], n),
+    })
+    if missing:
+        df.loc[rng.choice(n, 60, replace=False), 'a'] = np.nan
+        df.loc[rng.choice(n, 40, replace=False), 'c'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_pearson_matches_pandas(workers):
+    df = _frame()
+    result = correlation_matrix(df, chunksize=64, workers=workers)
+    expected = _reference(df[['a', 'b', 'c', 'd', 'flag']])
+    pd.testing.assert_frame_equal(result, expected, atol=1e-9)
+
+
+def test_spearman_matches_pandas_without_missing_values():
+    df = _frame(missing=False)
+    result = correlation_matrix(df, method='spearman', columns=['a', 'b', 'c', 'd'], chunksize=64)
+    pd.testing.assert_frame_equal(result, _reference(df[['a', 'b', 'c', 'd']], 'spearman'), atol=1e-9)
+
+
+def test_min_periods_and_constant_columns():
+    df = pd.DataFrame({'a': [1.0, 2.0, np.nan, 4.0], 'b': [1.0, np.nan, np.nan, 3.0], 'c': [5.0] * 4})
+    pd.testing.assert_frame_equal(correlation_matrix(df, min_periods=3), df.corr(min_periods=3))
+
+
+def test_correlation_from_file_matches_pandas(tmp_path):
+    df = _frame()
+    path = tmp_path / 'data.csv'
+    df.to_csv(path, index=False)
+    result = correlation_from_file(str(path), ['a', 'b', 'c'], chunksize=100, float_precision='round_trip')
+    pd.testing.assert_frame_equal(result, _reference(df[['a', 'b', 'c']]), atol=1e-9)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        correlation_matrix(_frame(), method='kendall')
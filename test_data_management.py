@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_management import UnifiedDataManager
+
+
+def _tables(seed=0):
+    rng = np.random.default_rng(seed)
+    tables = {}
+    for name, size in [('orders', 300), ('customers', 80), ('regions', 20), ('notes', 150)]:
+        ids = rng.choice(400, size, replace=False)
+        tables[name] = pd.DataFrame({'id': ids, 'region': rng.integers(0, 5, size), f'{name}_value': rng.normal(size=size)})
+    tables['notes'] = tables['notes'].drop(columns='region')
+    return tables
+
+
+@pytest.mark.parametrize('how', ['outer', 'inner'])
+def test_merge_plan_matches_chained_merges(how):
+    tables = _tables()
+    manager = UnifiedDataManager()
+    for name, df in tables.items():
+        manager.load_table(name, df)
+
+    merged = manager.merge_tables(list(tables), 'id', how=how)
+
+    expected = None
+    for name, df in tables.items():
+        df = df.rename(columns={'region': f'region_{name}'})
+        expected = df if expected is None else pd.merge(expected, df, on='id', how=how)
+    expected = expected.sort_values('id', ignore_index=True)
+    pd.testing.assert_frame_equal(merged.sort_values('id', ignore_index=True), expected[merged.columns])
+    assert [step['rows'] for step in manager.last_merge_plan][-1] == len(expected)
+    assert manager.last_merge_plan[0]['left'] == 'regions'
+
+
+@pytest.mark.parametrize('how', ['outer', 'inner', 'left', 'right'])
+@pytest.mark.parametrize('right_key', [
+    pd.Series([3.0, 1.0, 4.0]),
+    pd.Series([3, 1, 4], dtype='int32'),
+    pd.Series([3, None, 4], dtype='Int64'),
+    pd.Series([3, 1, 2], dtype='int64'),
+])
+def test_merge_on_key_matches_pd_merge(how, right_key):
+    left = pd.DataFrame({'id': [2, 1, 3], 'x': [1, 2, 3]})
+    right = pd.DataFrame({'id': right_key, 'y': [4, 5, 6]})
+    manager = UnifiedDataManager()
+    manager.load_table('left', left)
+    manager.load_table('right', right)
+
+    pd.testing.assert_frame_equal(manager.merge_tables_on_key('left', 'right', 'id', how=how),
+                                  pd.merge(left, right, on='id', how=how))
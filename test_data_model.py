@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_model import DataModelV5
+
+
+def test_load_file_failing_chunk_leaves_model_untouched(tmp_path):
+    data = pd.DataFrame({'id': range(6), 'value': range(6)})
+    model = DataModelV5()
+    model.load_data(data, key='id')
+    version, history = model.data_version, len(model.history_data)
+
+    path = tmp_path / 'extract.csv'
+    pd.DataFrame({'id': [0, 1, 2, 3, 0, 5], 'value': [10, 11, 12, 13, 9, 9]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        model.load_file(str(path), 'id', chunksize=2)
+
+    pd.testing.assert_frame_equal(model.main_data, data)
+    assert len(model.history_data) == history
+    assert model.data_version == version
+
+
+def test_load_file_matches_load_data(tmp_path):
+    data = pd.DataFrame({'id': range(6), 'value': range(6)})
+    extract = pd.DataFrame({'id': [1, 0, 2, 7, 5], 'value': [11, 0, 12, 7, 5]})
+    path = tmp_path / 'extract.csv'
+    extract.to_csv(path, index=False)
+
+    from_file, from_frame = DataModelV5(), DataModelV5()
+    from_file.load_data(data, key='id')
+    from_frame.load_data(data, key='id')
+    from_file.load_file(str(path), 'id', chunksize=2)
+    from_frame.load_data(extract, key='id')
+
+    pd.testing.assert_frame_equal(from_file.main_data.sort_values('id', ignore_index=True),
+                                  from_frame.main_data.sort_values('id', ignore_index=True))
+    assert sorted(from_file.history_data['change_type']) == sorted(from_frame.history_data['change_type'])
+
+
+def test_load_file_with_history_store_commits_only_complete_loads(tmp_path):
+    data = pd.DataFrame({'id': range(6), 'value': range(6)})
+    model = DataModelV5(history_path=str(tmp_path / 'history'))
+    model.load_data(data, key='id')
+    model.load_data(data.assign(value=data['value'] + 1), key='id')
+    history = model.get_history()
+
+    failing = tmp_path / 'failing.csv'
+    pd.DataFrame({'id': [0, 1, 2, 3, 0, 5], 'value': [10, 11, 12, 13, 9, 9]}).to_csv(failing, index=False)
+    with pytest.raises(ValueError):
+        model.load_file(str(failing), 'id', chunksize=2)
+    pd.testing.assert_frame_equal(model.get_history(), history)
+
+    extract = tmp_path / 'extract.csv'
+    pd.DataFrame({'id': [1, 0, 2, 7, 5], 'value': [11, 1, 12, 7, 6]}).to_csv(extract, index=False)
+    model.load_file(str(extract), 'id', chunksize=2)
+    assert sorted(model.get_history()['change_type']) == sorted(['update'] * 6 + ['update', 'update', 'insert',
+                                                                                    'delete', 'delete'])
+    assert all(name.startswith('load_date=') for name in os.listdir(tmp_path / 'history'))
+
+
+def test_first_load_file_matches_load_data(tmp_path):
+    extract = pd.DataFrame({'id': [3, 1, 2, 7], 'value': [1.5, 0.0, 12.0, 7.0]})
+    path = tmp_path / 'extract.csv'
+    extract.to_csv(path, index=False)
+
+    from_file, from_frame = DataModelV5(), DataModelV5()
+    from_file.load_file(str(path), 'id', chunksize=3)
+    from_frame.load_data(extract, key='id')
+
+    pd.testing.assert_frame_equal(from_file.main_data, from_frame.main_data)
+    np.testing.assert_array_equal(from_file.get_fingerprints(), from_frame.get_fingerprints())
+
+
+def test_load_data_records_type_only_changes():
+    model = DataModelV5()
+    model.load_data(pd.DataFrame({'value': pd.Series([1, 'x'], dtype=object)}))
+    model.load_data(pd.DataFrame({'value': pd.Series(['1', 'x'], dtype=object)}))
+
+    changes = model.history_data
+    assert len(changes) == 1
+    assert changes['old_value'].iloc[0] == 1 and changes['new_value'].iloc[0] == '1'
+
+
+def test_missing_cells_are_replayed_without_checkpoints():
+    model = DataModelV5()
+    frames = [pd.DataFrame({'value': [1.0, 2.0, 3.0], 'label': pd.Series(['a', 'b', 'c'], dtype=object)}),
+              pd.DataFrame({'value': [np.nan, 2.0, 3.0], 'label': pd.Series(['a', None, 'c'], dtype=object)}),
+              pd.DataFrame({'value': [4.0, np.nan, 3.0], 'label': pd.Series(['a', 'b', None], dtype=object)})]
+    loaded = []
+    for frame in frames:
+        model.load_data(frame)
+        loaded.append((model.loads[-1]['timestamp'], model.main_data.copy()))
+
+    assert len(model.checkpoints) == 1
+    assert len(model.get_history(change_type='missing')) == 6
+    for timestamp, data in loaded:
+        pd.testing.assert_frame_equal(model.as_of(timestamp), data)
+
+
+def test_as_of_keeps_row_order_of_keyed_load():
+    model = DataModelV5()
+    model.load_data(pd.DataFrame({'id': [1, 3, 4], 'value': [1, 3, 4]}), key='id')
+    model.load_data(pd.DataFrame({'id': [3, 1, 5, 4], 'value': [30, 1, 5, 4]}), key='id')
+
+    pd.testing.assert_frame_equal(model.as_of(model.loads[-1]['timestamp']), model.main_data)
+
+
+@pytest.mark.parametrize('before, after', [
+    (pd.Series([1, 2], dtype='int64'), pd.Series([1, 2.5], dtype='float64')),
+    (pd.Series([1, 2], dtype='int8'), pd.Series([1, 300], dtype='int16')),
+    (pd.Series(['a', 'b'], dtype='category'), pd.Series(['a', 'c'], dtype='category')),
+])
+def test_as_of_replays_across_dtype_changes(before, after):
+    model = DataModelV5()
+    model.load_data(pd.DataFrame({'value': before}))
+    model.load_data(pd.DataFrame({'value': after}))
+    model.load_data(pd.DataFrame({'value': after.iloc[::-1].set_axis(after.index)}))
+
+    for load in model.loads:
+        data = model.as_of(load['timestamp'])
+        assert data['value'].dtype == load['dtypes']['value']
+    pd.testing.assert_frame_equal(model.as_of(model.loads[1]['timestamp']), pd.DataFrame({'value': after}))
+
+
+def test_optimized_loads_keep_history_exact():
+    frames = [pd.DataFrame({'count': [1, 2, 3, 4], 'label': ['a', 'b', 'a', 'b']}),
+              pd.DataFrame({'count': [1, 1000, 3, 4], 'label': ['a', 'b', 'c', 'b']}),
+              pd.DataFrame({'count': [5, 1000, 3, 4], 'label': ['a', 'a', 'c', 'b']})]
+    model = DataModelV5()
+    loaded = []
+    for frame in frames:
+        model.load_data(frame, optimize=True)
+        loaded.append((model.loads[-1]['timestamp'], model.main_data.copy()))
+
+    assert model.main_data['label'].cat.categories.tolist() == ['a', 'b', 'c']
+    for (timestamp, data), frame in zip(loaded, frames):
+        replayed = model.as_of(timestamp)
+        pd.testing.assert_frame_equal(replayed, data)
+        pd.testing.assert_frame_equal(replayed.astype({'count': 'int64', 'label': frame['label'].dtype}), frame)
@@ -0,0 +1,13 @@
+import numpy as np
+import pandas as pd
+
+from data_profiling import DataProfiler
+
+
+def test_parallel_profile_matches_serial():
+    n = 500
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'number': rng.normal(size=n), 'text': rng.choice(['a', 'b'], n).astype(object),
+                       'time': pd.date_range('2020-01-01', periods=n), 'flag': rng.random(n) > 0.5,
+                       'count': np.arange(n)})
+    pd.testing.assert_frame_equal(DataProfiler.profile_data(df, workers=2), DataProfiler.profile_data(df))
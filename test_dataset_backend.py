@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from data_model import DataModelV5, read_file_chunks
+from dataset_backend import ArrowDataset
+
+
+def _frame(n=1000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'amount': np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+        'label': pd.Series(rng.choice(['a', 'b', None], n)),
+        'segment': pd.Categorical(rng.choice(['x', 'y'], n)),
+        'flag': rng.random(n) > 0.5,
+        'time': pd.date_range('2024-01-01', periods=n, freq='min', tz='UTC'),
+    }, index=pd.Index(np.arange(n) * 2, name='row'))
+
+
+def test_round_trip_keeps_data_and_dtypes(tmp_path):
+    df = _frame()
+    dataset = ArrowDataset.write(df, str(tmp_path / 'data.arrow'))
+
+    reopened = ArrowDataset(dataset.path)
+    assert len(reopened) == len(df)
+    assert reopened.column_names == list(df.columns) + ['row']
+    pd.testing.assert_frame_equal(reopened.to_pandas(arrow_backed=False), df)
+    pd.testing.assert_frame_equal(reopened.to_pandas(columns=['amount'], arrow_backed=False), df[['amount']])
+
+
+def test_arrow_backed_columns_map_the_file(tmp_path):
+    df = _frame()
+    dataset = ArrowDataset.write(df[['id', 'amount']], str(tmp_path / 'data.arrow'))
+
+    allocated = pa.total_allocated_bytes()
+    frame = dataset.to_pandas()
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in frame.dtypes)
+    assert pa.total_allocated_bytes() - allocated < df[['id', 'amount']].memory_usage(index=False).sum() / 10
+    np.testing.assert_array_equal(frame['amount'].to_numpy(dtype=float, na_value=np.nan), df['amount'].to_numpy())
+
+
+def test_chunked_write_matches_whole_file(tmp_path):
+    df = _frame().reset_index(drop=True)
+    path = tmp_path / 'extract.csv'
+    df[['id', 'amount', 'label']].to_csv(path, index=False)
+
+    dataset = ArrowDataset.write(read_file_chunks(str(path), chunksize=128), str(tmp_path / 'data.arrow'))
+    expected = pd.read_csv(path)
+    pd.testing.assert_frame_equal(dataset.to_pandas(arrow_backed=False), expected)
+    with pytest.raises(ValueError):
+        ArrowDataset.write(iter([]), str(tmp_path / 'empty.arrow'))
+
+
+def test_model_saves_its_data(tmp_path):
+    model = DataModelV5()
+    model.load_data(_frame(), key='id')
+    dataset = model.save_dataset(str(tmp_path / 'model.arrow'))
+    pd.testing.assert_frame_equal(dataset.to_pandas(arrow_backed=False), model.main_data)
@@ -0,0 +1,67 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalization import normalize_column, register_normalizer
+
+PER_ROW = {
+    'strip': str.strip,
+    'lower': str.lower,
+    'casefold': str.casefold,
+    'collapse_whitespace': lambda value: re.sub(r'\s+', ' ', value),
+    'unicode_fold': lambda value: re.sub('[\u0300-\u036f]', '', unicodedata.normalize('NFKD', value)).casefold(),
+}
+
+
+def _values(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [' Café ', 'CAFE', 'cafe', 'Straße', 'STRASSE', 'a  b', ' A b', 'x', None, 12, np.nan]
+    return pd.Series([words[i] for i in rng.integers(0, len(words), n)], dtype=object, index=np.arange(n) * 3)
+
+
+def _per_row(series, normalizers):
+    def normalize(value):
+        if not isinstance(value, str):
+            return np.nan
+        for name in normalizers:
+            value = PER_ROW[name](value)
+        return value
+    return series.map(normalize)
+
+
+@pytest.mark.parametrize('normalizers', [('strip', 'lower'), ('collapse_whitespace', 'strip', 'casefold'),
+                                         ('unicode_fold', 'strip')])
+def test_matches_per_row_normalization(normalizers):
+    series = _values()
+    result, report = normalize_column(series, normalizers)
+    expected = _per_row(series, normalizers)
+
+    assert result.index.equals(series.index)
+    assert result.tolist() == pytest.approx(expected.tolist(), nan_ok=True)
+    assert report['rows'] == len(series)
+    assert report['distinct_before'] == series.dropna().nunique()
+    assert report['distinct_after'] == expected.nunique()
+
+
+def test_categorical_and_string_inputs():
+    series = _values().where(lambda values: values.map(lambda value: isinstance(value, str)))
+    expected = _per_row(series, ('strip', 'lower'))
+
+    for column in [series.astype('category'), series.astype('str')]:
+        result, _ = normalize_column(column)
+        assert result.astype(object).where(result.notna(), np.nan).tolist() == \
+            pytest.approx(expected.tolist(), nan_ok=True)
+    result, _ = normalize_column(series, as_category=True)
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert set(result.cat.categories) == set(expected.dropna())
+
+
+def test_registered_and_callable_normalizers():
+    register_normalizer('no_digits', lambda values: values.str.replace(r'\d', '', regex=True))
+    series = pd.Series(['A1 ', 'a2', 'b'], dtype=object)
+    result, report = normalize_column(series, ('no_digits', lambda values: values.str.strip().str.upper()))
+    assert result.tolist() == ['A', 'A', 'B']
+    assert report['collapsed'] == 1
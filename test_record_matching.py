@@ -0,0 +1,80 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from record_matching import RecordMatcher, connected_components
+
+
+def _qgrams(value, q=3):
+    value = value.strip().lower()
+    return {value[i:i + q] for i in range(max(len(value) - q + 1, 1))}
+
+
+def _records(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    names = ['Anna Schmidt', 'Jon Smith', 'Maria Garcia', 'Li Wei', 'Olga Petrova', 'Peter Jones']
+    values = []
+    for _ in range(n):
+        name = list(names[rng.integers(len(names))])
+        for _ in range(rng.integers(0, 3)):
+            position = rng.integers(len(name))
+            name[position] = chr(ord('a') + rng.integers(26))
+        values.append(''.join(name))
+    return pd.DataFrame({'name': values, 'age': rng.integers(20, 25, n)}, index=np.arange(n) * 10)
+
+
+def test_full_window_scores_match_brute_force():
+    df = _records()
+    matcher = RecordMatcher(threshold=0.6).add_sorted_neighbourhood('name', window=len(df))
+    matcher.add_comparison('name', weight=2).add_comparison('age', method='exact')
+    pairs, clusters = matcher.match(df)
+
+    expected = []
+    for i, j in itertools.combinations(range(len(df)), 2):
+        a, b = _qgrams(df['name'].iloc[i]), _qgrams(df['name'].iloc[j])
+        score = (2 * len(a & b) / len(a | b) + (df['age'].iloc[i] == df['age'].iloc[j])) / 3
+        if score >= 0.6:
+            expected.append((df.index[i], df.index[j], score))
+    expected = pd.DataFrame(expected, columns=['left', 'right', 'score'])
+
+    pd.testing.assert_frame_equal(pairs[['left', 'right', 'score']].sort_values(['left', 'right'], ignore_index=True),
+                                  expected.sort_values(['left', 'right'], ignore_index=True),
+                                  check_dtype=False)
+    assert matcher.last_report['candidate_pairs'] == len(df) * (len(df) - 1) // 2
+    for left, right in zip(expected['left'], expected['right']):
+        assert clusters[left] == clusters[right]
+
+
+def test_blockers_propose_a_subset_with_all_identical_values():
+    df = _records(200, seed=1)
+    matcher = RecordMatcher().add_sorted_neighbourhood('name', window=3).add_minhash_lsh('name')
+    left, right = matcher.candidate_pairs(df)
+
+    pairs = set(zip(left.tolist(), right.tolist()))
+    assert len(pairs) == len(left)
+    assert all(i < j for i, j in pairs)
+    names = df['name'].str.strip().str.lower().to_numpy()
+    identical = {(i, j) for i, j in itertools.combinations(range(len(df)), 2) if names[i] == names[j]}
+    assert identical <= pairs
+    assert matcher.last_report['reduction_ratio'] > 0
+
+
+def test_connected_components_match_union_find():
+    rng = np.random.default_rng(2)
+    n = 300
+    left, right = rng.integers(0, n, 200), rng.integers(0, n, 200)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for a, b in zip(left, right):
+        ra, rb = find(a), find(b)
+        parent[max(ra, rb)] = min(ra, rb)
+    expected = [find(i) for i in range(n)]
+
+    np.testing.assert_array_equal(connected_components(n, left, right), expected)
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from data_management import UnifiedDataManager
+from data_model import DataModelV5
+from result_cache import ResultCache
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, df, column='value', **kwargs):
+        self.calls += 1
+        return df[column].sum()
+
+
+def test_model_results_are_recomputed_after_a_load():
+    model = DataModelV5()
+    total = _Counter()
+    model.load_data(pd.DataFrame({'id': [1, 2], 'value': [1, 2]}), key='id')
+    assert model.cached(total) == 3 and model.cached(total) == 3
+    assert total.calls == 1
+    version = model.data_version
+
+    model.load_data(pd.DataFrame({'id': [1, 2], 'value': [1, 5]}), key='id')
+    assert model.data_version == version + 1
+    assert len(model.results) == 0
+    assert model.cached(total) == 6
+    assert total.calls == 2
+
+    model.load_data(pd.DataFrame({'id': [1, 2], 'value': [1, 5]}), key='id')
+    assert model.cached(total) == 6
+    assert total.calls == 3
+
+
+def test_manager_invalidates_only_the_reloaded_table():
+    manager = UnifiedDataManager()
+    total = _Counter()
+    manager.load_table('a', pd.DataFrame({'value': [1, 2]}))
+    manager.load_table('b', pd.DataFrame({'value': [10]}))
+    assert manager.cached('a', total) == 3 and manager.cached('b', total) == 10
+    assert manager.cached('a', total) == 3
+    assert total.calls == 2
+
+    manager.load_table('a', pd.DataFrame({'value': [4]}))
+    assert manager.cached('a', total) == 4 and manager.cached('b', total) == 10
+    assert total.calls == 3
+
+
+def test_keys_lru_and_unhashable_parameters():
+    cache = ResultCache(maxsize=2)
+    total = _Counter()
+    df = pd.DataFrame({'value': [1, 2], 'other': [3, 4]})
+
+    cache.get_or_compute('t', 1, total, df, 'value', options={'a': [1, 2]})
+    cache.get_or_compute('t', 1, total, df, 'value', options={'a': [1, 2]})
+    cache.get_or_compute('t', 1, total, df, 'value', options={'a': (1, 2)})
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.get_or_compute('t', 1, total, df, 'other')
+    assert cache.evictions == 1 and len(cache) == 2
+    cache.get_or_compute('t', 1, total, df, 'value', options={'a': [1, 2]})
+    assert cache.misses == 4
+
+    calls = total.calls
+    cache.get_or_compute('t', 1, total, df, 'value', options=pd.Series([1]))
+    cache.get_or_compute('t', 1, total, df, 'value', options=pd.Series([1]))
+    assert total.calls == calls + 2 and len(cache) == 2
+
+    assert cache.invalidate('other scope') == 0
+    assert cache.invalidate('t') == 2
+    with pytest.raises(ValueError):
+        ResultCache(maxsize=0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sketches import KLLSketch, k_for_error
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_errors(sketch, values):
+    values = np.sort(values)
+    estimates = sketch.quantile(QUANTILES)
+    # The quantile is right if its rank interval in the data contains q.
+    low = np.searchsorted(values, estimates, side='left') / len(values)
+    high = np.searchsorted(values, estimates, side='right') / len(values)
+    return np.maximum(np.maximum(low - QUANTILES, QUANTILES - high), 0)
+
+
+@pytest.mark.parametrize('error', [0.05, 0.01])
+@pytest.mark.parametrize('distribution', ['normal', 'lognormal', 'integers'])
+def test_rank_error_within_target(error, distribution):
+    rng = np.random.default_rng(0)
+    values = {'normal': rng.normal(size=200_000), 'lognormal': rng.lognormal(sigma=2, size=200_000),
+              'integers': rng.integers(0, 50, 200_000).astype(float)}[distribution]
+    sketch = KLLSketch(k_for_error(error), seed=1)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+
+    assert sketch.count == len(values)
+    assert sketch.error <= error
+    # The bound holds per query with 99% confidence, so a rare quantile may exceed it slightly.
+    errors = _rank_errors(sketch, values)
+    assert np.mean(errors > error) <= 0.05
+    assert errors.max() <= 1.5 * error
+    assert sum(len(items) for items in sketch.levels) < 10 * sketch.k
+    for value in np.quantile(values, [0.1, 0.5, 0.9]):
+        assert abs(sketch.rank(value) - np.mean(values <= value)) <= error
+
+
+def test_merged_sketches_keep_the_error():
+    rng = np.random.default_rng(2)
+    parts = [rng.normal(loc, size=50_000) for loc in range(4)]
+    k = k_for_error(0.01)
+    sketch = KLLSketch(k, seed=0)
+    for seed, part in enumerate(parts):
+        sketch.merge(KLLSketch(k, seed=seed + 1).update(part))
+
+    values = np.concatenate(parts)
+    assert sketch.count == len(values)
+    errors = _rank_errors(sketch, values)
+    assert np.mean(errors > 0.01) <= 0.05
+    assert errors.max() <= 0.015
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+
+
+def test_small_inputs_are_exact():
+    values = np.array([5.0, np.nan, 1.0, 3.0, 2.0])
+    sketch = KLLSketch().update(values)
+    np.testing.assert_array_equal(sketch.quantile(QUANTILES), np.nanquantile(values, QUANTILES))
+    assert np.isnan(KLLSketch().quantile(0.5))
+    with pytest.raises(ValueError):
+        k_for_error(0)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from survivorship import build_golden_records
+
+
+def _records():
+    return pd.DataFrame({
+        'cluster': [0, 0, 0, 1, 1, 2, 2, 2],
+        'name': ['Ann', 'Anna', 'Ann', None, 'Bob', 'Cy', 'Cyrus', 'Cy'],
+        'email': ['a@x', None, 'ann@x', 'b@x', 'bob@y', None, None, None],
+        'phone': ['1', '2', '3', '4', '5', '6', '7', '8'],
+        'source': ['crm', 'erp', 'web', 'web', 'crm', 'erp', 'web', 'crm'],
+        'updated': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-01', '2024-02-01', None,
+                                   '2024-03-01', '2024-03-03', '2024-03-02']),
+    }, index=list('abcdefgh'))
+
+
+def _expected(df, column, rule):
+    golden, lineage = {}, {}
+    for cluster, rows in df.groupby('cluster', sort=True):
+        rows = rows[rows[column].notna()]
+        if rows.empty:
+            golden[cluster], lineage[cluster] = np.nan, None
+            continue
+        if rule == 'most_frequent':
+            counts = rows[column].map(rows[column].value_counts())
+            label = counts.index[np.argmax(counts.to_numpy())]
+        elif rule == 'longest':
+            label = rows.index[np.argmax(rows[column].str.len().to_numpy())]
+        elif rule == 'most_recent':
+            label = rows['updated'].idxmax() if rows['updated'].notna().any() else rows.index[0]
+        else:
+            label = rows['source'].map({'crm': 0, 'erp': 1}).fillna(2).idxmin()
+        golden[cluster], lineage[cluster] = rows.at[label, column], label
+    return pd.Series(golden), pd.Series(lineage, dtype=object)
+
+
+@pytest.mark.parametrize('rule', ['most_frequent', 'longest', 'most_recent', 'source_priority'])
+def test_rules_match_per_cluster_reference(rule):
+    df = _records()
+    golden, lineage = build_golden_records(df, 'cluster', default_rule=rule, timestamp_column='updated',
+                                           source_column='source', source_priority=['crm', 'erp'])
+
+    assert golden.index.tolist() == [0, 1, 2]
+    for column in ['name', 'email', 'phone']:
+        values, labels = _expected(df, column, rule)
+        assert golden[column].tolist() == pytest.approx(values.tolist(), nan_ok=True), column
+        assert lineage[column].tolist() == labels.tolist(), column
+        for cluster, label in labels.dropna().items():
+            assert df.at[label, column] == golden.at[cluster, column]
+
+
+def test_rules_per_column_and_unclustered_rows():
+    df = _records().drop(columns='cluster')
+    clusters = pd.Series([0, 0, 0, 1, 1, None, 2, 2], index=df.index)
+    golden, lineage = build_golden_records(df, clusters, rules={'name': 'longest', 'email': 'most_recent'},
+                                           timestamp_column='updated')
+
+    assert golden['name'].tolist() == ['Anna', 'Bob', 'Cyrus']
+    assert golden['email'].tolist()[:2] == ['a@x', 'b@x']
+    assert pd.isna(golden['email'].iloc[2]) and lineage['email'].iloc[2] is None
+    assert golden['phone'].tolist() == ['1', '4', '7']
+    assert lineage.loc[2, 'phone'] == 'g'
+
+
+def test_missing_rule_inputs_raise():
+    with pytest.raises(ValueError):
+        build_golden_records(_records(), 'cluster', default_rule='most_recent')
+    with pytest.raises(ValueError):
+        build_golden_records(_records(), 'cluster', rules={'name': 'newest'})
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_model import DataModelV5
+from time_rollup import TimeRollup, time_buckets
+
+
+def _assert_same_cube(rollup, data):
+    expected = TimeRollup(rollup.time_column, rollup.measures, rollup.granularity).build(data)
+    pd.testing.assert_frame_equal(rollup.cube, expected.cube, check_freq=False)
+    pd.testing.assert_series_equal(rollup.rows, expected.rows, check_freq=False)
+
+
+def test_update_matches_build_after_keyed_loads():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({'id': np.arange(n), 'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n), 'D'),
+                       'amount': rng.integers(0, 100, n).astype(float), 'qty': rng.integers(0, 10, n).astype(float)})
+    model = DataModelV5()
+    model.load_data(df, key='id')
+    rollup = model.add_rollup('time', ['amount', 'qty'], granularity='day')
+    next_id = n
+
+    for _ in range(12):
+        df = model.main_data.copy()
+        rows = rng.choice(len(df), 25, replace=False)
+        df.loc[rows, 'amount'] = rng.integers(0, 100, len(rows)).astype(float)
+        df.loc[rows[:5], 'time'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, 5), 'D')
+        df.loc[rows[5:8], 'qty'] = np.nan
+        df = df.drop(index=rng.choice(df.index, 10, replace=False))
+        inserted = pd.DataFrame({'id': np.arange(next_id, next_id + 12),
+                                 'time': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 120, 12), 'D'),
+                                 'amount': rng.integers(0, 100, 12).astype(float), 'qty': 1.0})
+        next_id += 12
+        df = pd.concat([df, inserted], ignore_index=True).sample(frac=1, random_state=int(rng.integers(1 << 30)))
+        model.load_data(df.reset_index(drop=True), key='id')
+
+        assert rollup.last_update['incremental']
+        _assert_same_cube(rollup, model.main_data)
+
+
+@pytest.mark.parametrize('granularity', ['week', 'month', 'quarter', 'year'])
+def test_coarser_trends_match_groupby(granularity):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'time': pd.Timestamp('2023-11-01') + pd.to_timedelta(rng.integers(0, 500, 300), 'D'),
+                       'amount': rng.normal(size=300)})
+    rollup = TimeRollup('time', ['amount']).build(df)
+
+    expected = df.groupby(time_buckets(df['time'], granularity))['amount'].mean()
+    result = rollup.trend('amount', granularity)
+    np.testing.assert_array_equal(result.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy())
+    with pytest.raises(ValueError):
+        TimeRollup('time', ['amount'], granularity='week').build(df).trend('amount', 'month')
+
+
+def test_get_rollup_merges_measures_and_evicts_least_recently_used():
+    df = pd.DataFrame({'time': pd.date_range('2024-01-01', periods=10, freq='D'),
+                       'other': pd.date_range('2023-01-01', periods=10, freq='W'),
+                       'a': np.arange(10.0), 'b': np.arange(10.0) * 2})
+    model = DataModelV5(max_rollups=2)
+    model.load_data(df)
+
+    rollup = model.get_rollup('time', ['a'])
+    assert model.get_rollup('time', ['b'], granularity='month') is rollup
+    assert rollup.measures == ['a', 'b'] and len(model.rollups) == 1
+    _assert_same_cube(rollup, df)
+
+    weekly = model.get_rollup('other', ['a'], granularity='week')
+    assert model.get_rollup('time', ['a']) is rollup
+    model.add_rollup('other', ['b'], granularity='month')
+    assert len(model.rollups) == 2 and weekly not in model.rollups and weekly.cube is None
+    assert rollup in model.rollups
+
+
+def test_failing_rollup_update_is_cleared_and_rebuilt():
+    df = pd.DataFrame({'id': [1, 2, 3], 'time': pd.date_range('2024-01-01', periods=3, freq='D'),
+                       'amount': [1.0, 2.0, 3.0]})
+    model = DataModelV5()
+    model.load_data(df, key='id')
+    rollup = model.get_rollup('time', ['amount'])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("broken update")
+
+    rollup.update = fail
+    model.load_data(df.assign(amount=[1.0, 5.0, 3.0]), key='id')
+    assert model.main_data['amount'].tolist() == [1.0, 5.0, 3.0]
+    assert rollup.cube is None
+
+    del rollup.update
+    assert model.get_rollup('time', ['amount']) is rollup
+    _assert_same_cube(rollup, model.main_data)
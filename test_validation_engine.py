@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from data_model import DataModelV5
+from validation_engine import IncrementalValidator, ValidationPlan
+
+
+def _plan():
+    plan = ValidationPlan()
+    plan.add_rare('b', threshold=0.3)
+    plan.add_unique('c')
+    plan.add_iqr('a')
+    plan.add_allowed('b', ['x', 'y'])
+    plan.add_regex('b', [r'^[xy]$'])
+    return plan
+
+
+def _assert_same(result, expected):
+    for rule in expected.bitmaps:
+        np.testing.assert_array_equal(result.mask(rule), expected.mask(rule), err_msg=rule)
+
+
+def test_update_changing_other_columns_with_inserts():
+    df = pd.DataFrame({'id': range(10), 'a': np.arange(10.0), 'b': ['x'] * 8 + ['y', 'z'], 'c': range(10)})
+    model = DataModelV5()
+    model.load_data(df, key='id')
+    plan = ValidationPlan()
+    plan.add_rare('b', threshold=0.15)
+    validator = IncrementalValidator(plan)
+    validator.validate(model.main_data)
+
+    df = df.copy()
+    df.loc[:4, 'a'] += 100
+    df = pd.concat([df, pd.DataFrame({'id': [10], 'a': [0.0], 'b': ['x'], 'c': [10]})], ignore_index=True)
+    model.load_data(df, key='id')
+
+    _assert_same(validator.update(model.main_data, model.last_change_set), plan.run(model.main_data))
+
+
+def test_update_matches_full_run_across_loads():
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({'id': np.arange(n), 'a': rng.normal(size=n), 'b': rng.choice(['x', 'y', 'z'], n, p=[.6, .3, .1]),
+                       'c': rng.integers(0, 2 * n, n)})
+    model = DataModelV5()
+    model.load_data(df, key='id')
+    plan = _plan()
+    validator = IncrementalValidator(plan, iqr_tolerance=0)
+    validator.validate(model.main_data)
+    next_id = n
+
+    for _ in range(15):
+        df = model.main_data.copy()
+        columns = rng.choice(['a', 'b', 'c'], rng.integers(1, 3), replace=False)
+        rows = rng.choice(len(df), 20, replace=False)
+        for column in columns:
+            if column == 'b':
+                df.loc[rows, 'b'] = rng.choice(['x', 'y', 'z'], len(rows))
+            elif column == 'a':
+                df.loc[rows, 'a'] = rng.normal(size=len(rows)) * 3
+            else:
+                df.loc[rows, 'c'] = rng.integers(0, 2 * n, len(rows))
+        df = df.drop(index=rng.choice(df.index, 10, replace=False))
+        inserted = pd.DataFrame({'id': np.arange(next_id, next_id + 15), 'a': rng.normal(size=15),
+                                 'b': rng.choice(['x', 'y', 'z'], 15), 'c': rng.integers(0, 2 * n, 15)})
+        next_id += 15
+        df = pd.concat([df, inserted], ignore_index=True).sample(frac=1, random_state=int(rng.integers(1 << 30)))
+        model.load_data(df.reset_index(drop=True), key='id')
+
+        _assert_same(validator.update(model.main_data, model.last_change_set), plan.run(model.main_data))
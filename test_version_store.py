@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from version_store import VersionStore
+
+
+def test_restore_spilled_blocks_keeps_dtypes(tmp_path):
+    n = 1000
+    df = pd.DataFrame({
+        'float': np.arange(n) / 3,
+        'strings': pd.Series([f'v{i % 7}' if i % 11 else np.nan for i in range(n)], dtype=object),
+        'object_ints': pd.Series(list(range(n)), dtype=object),
+        'nullable': pd.array([None if i % 5 == 0 else i for i in range(n)], dtype='Int64'),
+        'category': pd.Categorical([list('abc')[i % 3] for i in range(n)], categories=list('cba')),
+        'time': pd.date_range('2020-01-01', periods=n, freq='h', tz='UTC'),
+    }, index=pd.Index(np.arange(n) * 2, name='key'))
+    store = VersionStore(block_rows=256, memory_budget=1, spill_dir=str(tmp_path))
+    version = store.save(df)
+    resident = store.resident_bytes
+
+    restored = store.restore(version)
+    pd.testing.assert_frame_equal(restored, df)
+    assert store.stats()['spilled_blocks'] > 0
+    assert store.resident_bytes == resident
+
+    restored.iloc[0, 0] = -1.0
+    pd.testing.assert_frame_equal(store.restore(version), df)
+
+
+def test_type_only_changes_get_their_own_version():
+    store = VersionStore()
+    numbers = pd.DataFrame({'value': pd.Series([1, 'x'], dtype=object)})
+    strings = pd.DataFrame({'value': pd.Series(['1', 'x'], dtype=object)})
+    assert store.save(numbers) != store.save(strings)
+
+
+def test_budget_is_kept_apart_from_unspillable_blocks(tmp_path, caplog):
+    n = 1000
+    df = pd.DataFrame({'mixed': pd.Series([i if i % 2 else str(i) for i in range(n)], dtype=object),
+                       'value': np.arange(n, dtype=float)})
+    budget = 4000
+    store = VersionStore(block_rows=250, memory_budget=budget, spill_dir=str(tmp_path))
+    with caplog.at_level('WARNING', logger='version_store'):
+        version = store.save(df)
+        store.save(df.assign(value=df['value'] + 1), parent=version)
+
+    stats = store.stats()
+    assert stats['unspillable_bytes'] == sum(store.block_sizes[block] for block in store.unspillable) > budget
+    assert stats['resident_bytes'] - stats['unspillable_bytes'] <= budget
+    assert len(store.unspillable) == 4
+    assert len([record for record in caplog.records if record.name == 'version_store']) == 1
+    pd.testing.assert_frame_equal(store.restore(version), df)
@@ -0,0 +1,307 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+ROLLUP_GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+ROLLUP_STATS = ('count', 'sum', 'min', 'max')
+
+
+def time_buckets(times, granularity):
+    """
+    Truncates timestamps to the start of their bucket. Weeks start on Monday.
+
+    Args:
+        times (pd.Series or array-like): The timestamps.
+        granularity (str): One of ``ROLLUP_GRANULARITIES``.
+
+    Returns:
+        np.ndarray: The bucket start of every timestamp as ``datetime64[ns]``, NaT for missing timestamps.
+
+    Raises:
+        ValueError: If the granularity is unknown.
+    """
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    times = pd.to_datetime(pd.Series(times))
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_localize(None)
+    values = times.to_numpy(dtype='datetime64[ns]')
+    if granularity == 'day':
+        return values.astype('datetime64[D]').astype('datetime64[ns]')
+    if granularity == 'week':
+        days = values.astype('datetime64[D]')
+        # 1970-01-01 was a Thursday, the fourth day of its week.
+        weekday = (days.astype(np.int64) + 3) % 7
+        return (days - weekday.astype('timedelta64[D]')).astype('datetime64[ns]')
+    months = values.astype('datetime64[M]')
+    if granularity == 'quarter':
+        month = months.astype(np.int64)
+        months = (month - month % 3).astype('datetime64[M]')
+    elif granularity == 'year':
+        months = values.astype('datetime64[Y]')
+    return months.astype('datetime64[ns]')
+
+
+def _derives(granularity, target):
+    """
+    Tells whether buckets of ``target`` granularity are unions of buckets of ``granularity``.
+    """
+    if target == granularity or granularity == 'day':
+        return True
+    if 'week' in (granularity, target):
+        return False
+    return ROLLUP_GRANULARITIES.index(target) > ROLLUP_GRANULARITIES.index(granularity)
+
+
+class TimeRollup:
+    """
+    A pre-aggregated time cube: count, sum, min and max of measure columns per time bucket.
+
+    The cube is built once with ``build`` and then kept up to date from the change set of every
+    ``DataModelV5`` load. The old versions of the changed and deleted rows are subtracted from the counts and
+    sums, and the new versions of the changed and inserted rows are added, so an update costs the size of the
+    change set rather than the size of the table. A minimum or maximum cannot be subtracted; buckets losing the
+    value their extreme came from are recomputed from their own rows only. Trend queries at the cube's or any
+    coarser granularity are answered from the cube without reading the table.
+    """
+
+    def __init__(self, time_column, measures, granularity='day'):
+        """
+        Initializes an empty rollup.
+
+        Args:
+            time_column (str): The column holding the timestamps.
+            measures (list): The numeric columns to aggregate.
+            granularity (str, optional): The bucket size of the cube, one of ``ROLLUP_GRANULARITIES``. Coarser
+                granularities are derived from it. Defaults to 'day'.
+
+        Raises:
+            ValueError: If the granularity is unknown or no measure is given.
+        """
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if not measures:
+            raise ValueError("A rollup needs at least one measure column.")
+        self.time_column = time_column
+        self.measures = list(measures)
+        self.granularity = granularity
+        self.cube = None
+        self.rows = None
+        self.values = None
+        self.last_update = {}
+
+    def build(self, df):
+        """
+        Aggregates the whole DataFrame into the cube.
+
+        Args:
+            df (pd.DataFrame): The data.
+
+        Returns:
+            TimeRollup: The rollup itself.
+
+        Raises:
+            ValueError: If a column is missing.
+        """
+        for column in [self.time_column] + self.measures:
+            if column not in df:
+                raise ValueError(f"Column '{column}' not found in dataframe.")
+        start = time.perf_counter()
+        self.values = self._frame(df)
+        self.cube, self.rows = self._aggregate(self.values)
+        self.last_update = {'incremental': False, 'rows': len(df), 'recomputed_buckets': len(self.rows),
+                            'seconds': time.perf_counter() - start}
+        return self
+
+    def answers(self, time_column, measures, granularity):
+        """
+        Tells whether trends of the measures over the time column at the granularity can be read from this rollup.
+
+        Args:
+            time_column (str): The time column.
+            measures (list): The measure columns.
+            granularity (str): The bucket size.
+
+        Returns:
+            bool: True if the rollup covers the measures at the granularity or a finer one.
+        """
+        return time_column == self.time_column and set(measures) <= set(self.measures) and \
+            _derives(self.granularity, granularity)
+
+    def clear(self):
+        """
+        Drops the cube, e.g. when the data no longer has the rolled-up columns.
+        """
+        self.cube = self.rows = self.values = None
+        self.last_update = {}
+
+    def add_measures(self, measures):
+        """
+        Adds measure columns to the rollup. The cube is dropped and has to be built again.
+
+        Args:
+            measures (list): The numeric columns to aggregate as well.
+
+        Returns:
+            TimeRollup: The rollup itself.
+        """
+        added = [measure for measure in measures if measure not in self.measures]
+        if added:
+            self.measures += added
+            self.clear()
+        return self
+
+    def update(self, df, change_set):
+        """
+        Brings the cube up to date after a load.
+
+        Args:
+            df (pd.DataFrame): The data after the load, i.e. ``DataModelV5.main_data``.
+            change_set (dict): The change set of the load, i.e. ``DataModelV5.last_change_set``.
+
+        Returns:
+            TimeRollup: The rollup itself. ``last_update`` tells how many rows were applied and how many
+                buckets had to be recomputed.
+        """
+        if self.cube is None or change_set is None or change_set['reset']:
+            return self.build(df)
+        start = time.perf_counter()
+        touched = not set(change_set['columns']).isdisjoint([self.time_column] + self.measures)
+        removed = np.union1d(change_set['changed_old'], change_set['deleted']) if touched else change_set['deleted']
+        added = np.union1d(change_set['changed_new'], change_set['inserted']) if touched else \
+            change_set['inserted']
+        if not len(removed) and not len(added):
+            self.values = self._carry(df, change_set, added, {})
+            self.last_update = {'incremental': True, 'rows': 0, 'recomputed_buckets': 0,
+                                'seconds': time.perf_counter() - start}
+            return self
+        fresh = self._frame(df.iloc[added])
+        old_cube, old_rows = self._aggregate(self.values, removed)
+        new_cube, new_rows = self._aggregate(fresh)
+        new_values = self._carry(df, change_set, added, fresh)
+
+        buckets = self.rows.index.union(old_rows.index).union(new_rows.index)
+        cube = self.cube.reindex(buckets)
+        rows = self.rows.reindex(buckets, fill_value=0) - old_rows.reindex(buckets, fill_value=0) + \
+            new_rows.reindex(buckets, fill_value=0)
+        old_cube, new_cube = old_cube.reindex(buckets), new_cube.reindex(buckets)
+        dirty = np.zeros(len(buckets), dtype=bool)
+        for measure in self.measures:
+            for stat in ('count', 'sum'):
+                cube[(measure, stat)] = cube[(measure, stat)].fillna(0) - old_cube[(measure, stat)].fillna(0) + \
+                    new_cube[(measure, stat)].fillna(0)
+            # A bucket whose extreme may have been removed has to be recomputed.
+            dirty |= (old_cube[(measure, 'min')] <= cube[(measure, 'min')]).to_numpy()
+            dirty |= (old_cube[(measure, 'max')] >= cube[(measure, 'max')]).to_numpy()
+            cube[(measure, 'min')] = np.fmin(cube[(measure, 'min')], new_cube[(measure, 'min')])
+            cube[(measure, 'max')] = np.fmax(cube[(measure, 'max')], new_cube[(measure, 'max')])
+
+        dirty &= (rows > 0).to_numpy()
+        if dirty.any():
+            redo = buckets[dirty]
+            # A hash lookup; np.isin sorts the whole column.
+            rows_to_redo = np.flatnonzero(pd.Series(new_values[self.time_column]).isin(redo).to_numpy())
+            recomputed, _ = self._aggregate(new_values, rows_to_redo)
+            for measure in self.measures:
+                for stat in ('min', 'max'):
+                    cube.loc[redo, (measure, stat)] = recomputed[(measure, stat)].reindex(redo)
+
+        kept = (rows > 0).to_numpy()
+        self.cube, self.rows, self.values = cube[kept], rows[kept], new_values
+        for measure in self.measures:
+            self.cube[(measure, 'count')] = self.cube[(measure, 'count')].astype(np.int64)
+        self.last_update = {'incremental': True, 'rows': len(removed) + len(added),
+                            'recomputed_buckets': int(dirty.sum()), 'seconds': time.perf_counter() - start}
+        return self
+
+    def trend(self, measure, granularity=None, stat='mean'):
+        """
+        Reads a trend from the cube.
+
+        Args:
+            measure (str): One of the measure columns.
+            granularity (str, optional): The bucket size, equal to or coarser than the cube's. Defaults to None
+                (the cube's).
+            stat (str, optional): 'mean' or one of ``ROLLUP_STATS``. Defaults to 'mean'.
+
+        Returns:
+            pd.Series: The statistic per bucket, indexed by bucket start and named after the measure. Buckets
+                without a value of the measure are left out.
+
+        Raises:
+            ValueError: If the rollup is not built, the measure or statistic is unknown, or the granularity
+                cannot be derived from the cube's.
+        """
+        if self.cube is None:
+            raise ValueError("The rollup is not built yet.")
+        if measure not in self.measures:
+            raise ValueError(f"'{measure}' is not a measure of the rollup.")
+        if stat != 'mean' and stat not in ROLLUP_STATS:
+            raise ValueError(f"Unknown statistic: {stat}")
+        granularity = granularity or self.granularity
+        if granularity not in ROLLUP_GRANULARITIES or not _derives(self.granularity, granularity):
+            raise ValueError(f"Cannot derive '{granularity}' buckets from '{self.granularity}' buckets.")
+
+        cube = self.cube[measure]
+        if granularity != self.granularity:
+            cube = cube.groupby(time_buckets(cube.index, granularity)).agg(
+                {'count': 'sum', 'sum': 'sum', 'min': 'min', 'max': 'max'})
+        cube = cube[cube['count'] > 0]
+        result = cube['sum'] / cube['count'] if stat == 'mean' else cube[stat]
+        return result.rename(measure).rename_axis(self.time_column)
+
+    def _frame(self, df):
+        """
+        Keeps the rolled-up columns as arrays, with the timestamps replaced by their bucket.
+        """
+        values = {self.time_column: time_buckets(df[self.time_column], self.granularity)}
+        for measure in self.measures:
+            values[measure] = df[measure].to_numpy(dtype=float, na_value=np.nan)
+        return values
+
+    def _carry(self, df, change_set, added, fresh):
+        """
+        Moves the kept rows to their new positions and fills in the freshly bucketed added ones.
+
+        Args:
+            df (pd.DataFrame): The data after the load.
+            change_set (dict): The change set of the load.
+            added (np.ndarray): Positions of the changed and inserted rows in ``df``.
+            fresh (dict): The added rows as returned by ``_frame``.
+
+        Returns:
+            dict: Rows as returned by ``_frame``, for all of ``df``.
+        """
+        matched_old, matched_new = change_set['matched_old'], change_set['matched_new']
+        in_place = len(df) == len(matched_new) == len(self.values[self.time_column]) and \
+            np.array_equal(matched_old, matched_new)
+        if not in_place:
+            positions = np.zeros(len(df), dtype=np.intp)
+            positions[matched_new] = matched_old
+        values = {}
+        for column, old in self.values.items():
+            # Rows that kept their position are updated in place instead of copying the column.
+            values[column] = old if in_place else old[positions]
+            if len(added):
+                values[column][added] = fresh[column]
+        return values
+
+    def _aggregate(self, values, rows=None):
+        """
+        Aggregates bucketed rows.
+
+        Args:
+            values (dict): Rows as returned by ``_frame``.
+            rows (np.ndarray, optional): Positions of the rows to aggregate. Defaults to None (all rows).
+
+        Returns:
+            tuple: The cube, with ``(measure, stat)`` columns per bucket, and the number of rows per bucket.
+        """
+        frame = pd.DataFrame({column: column_values if rows is None else column_values[rows]
+                              for column, column_values in values.items()})
+        frame = frame[frame[self.time_column].notna()]
+        groups = frame.groupby(self.time_column, sort=True)
+        cube = groups[self.measures].agg(list(ROLLUP_STATS))
+        cube.columns = pd.MultiIndex.from_tuples(cube.columns)
+        return cube, groups.size()
@@ -0,0 +1,613 @@
+import re
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from parallel_backend import map_shards, resolve_workers, shard_columns
+
+
+class ValidationPlan:
+    """
+    A set of validation rules compiled into one pass over the data.
+
+    Rules are grouped by the column they read. When the plan runs, each column is fetched once, and the
+    dictionary encoding (codes and distinct values) is computed once and shared by every rule that needs it.
+    Each rule produces one boolean violation mask. The masks are kept as packed bitmaps in the
+    ``ValidationResult``, so violating rows are only materialized when asked for.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty plan.
+        """
+        self.rules = []
+
+    def _add(self, kind, columns, name, **params):
+        name = name or f"{kind}:{','.join(map(str, columns))}"
+        if any(rule['name'] == name for rule in self.rules):
+            raise ValueError(f"Rule '{name}' already exists in the plan.")
+        self.rules.append({'name': name, 'kind': kind, 'columns': tuple(columns), 'params': params})
+        return self
+
+    def add_iqr(self, column, factor=1.5, name=None):
+        """
+        Flags values outside [Q1 - factor * IQR, Q3 + factor * IQR].
+
+        Args:
+            column (str): The numeric column to check.
+            factor (float, optional): The IQR multiplier. Defaults to 1.5.
+            name (str, optional): Name of the rule. Defaults to "iqr:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('iqr', [column], name, factor=factor)
+
+    def add_date_range(self, column, start_date=None, end_date=None, name=None):
+        """
+        Flags dates before ``start_date`` or after ``end_date``.
+
+        Args:
+            column (str): The datetime column to check.
+            start_date (str or pd.Timestamp, optional): Earliest allowed date. Defaults to None.
+            end_date (str or pd.Timestamp, optional): Latest allowed date. Defaults to None.
+            name (str, optional): Name of the rule. Defaults to "date_range:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('date_range', [column], name, start_date=start_date, end_date=end_date)
+
+    def add_rare(self, column, threshold=0.01, name=None):
+        """
+        Flags values whose relative frequency among the non-missing values is below ``threshold``.
+
+        Args:
+            column (str): The column to check.
+            threshold (float, optional): The frequency threshold. Defaults to 0.01.
+            name (str, optional): Name of the rule. Defaults to "rare:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('rare', [column], name, threshold=threshold)
+
+    def add_regex(self, column, patterns, require='all', name=None):
+        """
+        Flags strings that do not match the patterns from their start. Missing values are not flagged.
+
+        Args:
+            column (str): The text column to check.
+            patterns (str or list): A regular expression, or several checked in the same pass.
+            require (str, optional): ``'all'`` if a value must match every pattern, ``'any'`` if one is enough.
+                Defaults to 'all'.
+            name (str, optional): Name of the rule. Defaults to "regex:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+
+        Raises:
+            ValueError: If ``require`` is neither 'all' nor 'any'.
+        """
+        if require not in ('all', 'any'):
+            raise ValueError("require must be 'all' or 'any'.")
+        patterns = (patterns,) if isinstance(patterns, (str, re.Pattern)) else tuple(patterns)
+        return self._add('regex', [column], name, patterns=patterns, require=require)
+
+    def add_allowed(self, column, allowed_values, name=None):
+        """
+        Flags values that are not in ``allowed_values``.
+
+        Args:
+            column (str): The column to check.
+            allowed_values (iterable): The allowed values.
+            name (str, optional): Name of the rule. Defaults to "allowed:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('allowed', [column], name, allowed_values=list(allowed_values))
+
+    def add_unique(self, column, name=None):
+        """
+        Flags every row whose value occurs more than once.
+
+        Args:
+            column (str): The column to check.
+            name (str, optional): Name of the rule. Defaults to "unique:<column>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('unique', [column], name)
+
+    def add_dependency(self, column1, value1, column2, value2, name=None):
+        """
+        Flags rows where ``column1`` equals ``value1`` but ``column2`` does not equal ``value2``.
+
+        Args:
+            column1 (str): The condition column.
+            value1: The condition value.
+            column2 (str): The dependent column.
+            value2: The value the dependent column must have.
+            name (str, optional): Name of the rule. Defaults to "dependency:<column1>,<column2>".
+
+        Returns:
+            ValidationPlan: The plan itself, for chaining.
+        """
+        return self._add('dependency', [column1, column2], name, value1=value1, value2=value2)
+
+    def run(self, df, workers=None):
+        """
+        Evaluates every rule of the plan against a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to validate.
+            workers (int, optional): Number of worker processes the columns are sharded across, -1 for one per
+                CPU core. Defaults to None (evaluate in this process).
+
+        Returns:
+            ValidationResult: The violations of every rule.
+
+        Raises:
+            ValueError: If a rule refers to a column that is not in the DataFrame.
+        """
+        missing = sorted({str(column) for rule in self.rules for column in rule['columns'] if column not in df})
+        if missing:
+            raise ValueError(f"Columns not found in dataframe: {', '.join(missing)}.")
+
+        workers = resolve_workers(workers)
+        if workers == 1:
+            bitmaps, timings = _evaluate(df, self.rules)
+        else:
+            by_column = {}
+            for rule in self.rules:
+                by_column.setdefault(rule['columns'][0], []).append(rule)
+            tasks = []
+            for shard in shard_columns(by_column, workers):
+                rules = [rule for column in shard for rule in by_column[column]]
+                columns = list(dict.fromkeys(column for rule in rules for column in rule['columns']))
+                tasks.append((columns, (rules,)))
+            bitmaps, timings = {}, {}
+            for shard_bitmaps, shard_timings in map_shards(df, _evaluate, tasks, workers):
+                bitmaps.update(shard_bitmaps)
+                timings.update(shard_timings)
+        # Report rules in the order they were added.
+        return ValidationResult(df, self.rules, {rule['name']: bitmaps[rule['name']] for rule in self.rules},
+                                timings)
+
+
+class ValidationResult:
+    """
+    The outcome of running a ``ValidationPlan``: one packed violation bitmap per rule and per-rule timings.
+    """
+
+    def __init__(self, df, rules, bitmaps, timings):
+        """
+        Initializes the result.
+
+        Args:
+            df (pd.DataFrame): The validated DataFrame, used to materialize rows on demand.
+            rules (list): The rules of the plan.
+            bitmaps (dict): Packed violation masks by rule name.
+            timings (dict): Evaluation time in seconds by rule name.
+        """
+        self.df = df
+        self.rules = rules
+        self.bitmaps = bitmaps
+        self.timings = timings
+        self.n_rows = len(df)
+
+    def mask(self, rule=None):
+        """
+        Returns the violation mask of one rule, or of any rule.
+
+        Args:
+            rule (str, optional): Name of the rule. Defaults to None (rows violating at least one rule).
+
+        Returns:
+            np.ndarray: A boolean array with one entry per row.
+        """
+        if rule is not None:
+            return np.unpackbits(self.bitmaps[rule], count=self.n_rows).astype(bool)
+        combined = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for bitmap in self.bitmaps.values():
+            combined |= bitmap
+        return np.unpackbits(combined, count=self.n_rows).astype(bool)
+
+    def positions(self, rule=None):
+        """
+        Returns the row positions that violate one rule, or any rule.
+
+        Args:
+            rule (str, optional): Name of the rule. Defaults to None (any rule).
+
+        Returns:
+            np.ndarray: The positions in ascending order.
+        """
+        return np.flatnonzero(self.mask(rule))
+
+    def rows(self, rule=None):
+        """
+        Materializes the rows that violate one rule, or any rule.
+
+        Args:
+            rule (str, optional): Name of the rule. Defaults to None (any rule).
+
+        Returns:
+            pd.DataFrame: The violating rows in their original order, each row once.
+        """
+        return self.df.iloc[self.positions(rule)]
+
+    def summary(self):
+        """
+        Summarizes the violations per rule.
+
+        Returns:
+            pd.DataFrame: Rule name, kind, columns, number of violations and evaluation time in seconds.
+        """
+        return pd.DataFrame([{
+            'rule': rule['name'],
+            'kind': rule['kind'],
+            'columns': ', '.join(map(str, rule['columns'])),
+            'violations': int(np.unpackbits(self.bitmaps[rule['name']], count=self.n_rows).sum()),
+            'seconds': self.timings[rule['name']],
+        } for rule in self.rules], columns=['rule', 'kind', 'columns', 'violations', 'seconds'])
+
+
+class IncrementalValidator:
+    """
+    Keeps the violations of a ``ValidationPlan`` up to date across loads, re-evaluating only what changed.
+
+    After a full ``validate``, every rule keeps its violation mask, and the rules depending on global
+    statistics keep them too: value counts for rare value and uniqueness rules, and the bounds for IQR rules.
+    ``update`` takes the change set of a ``DataModelV5`` load. It carries the masks of the unchanged rows over
+    to their new positions and evaluates the rules only on the changed and inserted rows. When a statistic
+    shifts, the rows it affects are re-evaluated too. For a rare value or uniqueness rule these are the rows
+    holding a value that crossed the threshold. For an IQR rule it is the whole column, but only once a bound
+    has moved by more than ``iqr_tolerance`` times the IQR.
+    """
+
+    def __init__(self, plan, iqr_tolerance=0.1):
+        """
+        Initializes the validator.
+
+        Args:
+            plan (ValidationPlan): The rules to maintain.
+            iqr_tolerance (float, optional): How far, as a fraction of the IQR, the IQR bounds may drift before
+                an IQR rule is re-evaluated over the whole column. Defaults to 0.1; 0 keeps the result exact.
+        """
+        self.plan = plan
+        self.iqr_tolerance = iqr_tolerance
+        self.df = None
+        self.masks = {}
+        self.state = {}
+        self.values = {}
+        self.timings = {}
+        self.last_update = {}
+
+    def validate(self, df):
+        """
+        Evaluates every rule over the whole DataFrame and resets the kept state.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to validate.
+
+        Returns:
+            ValidationResult: The violations of every rule.
+        """
+        self.df = df
+        self.masks, self.state, self.values, self.timings = {}, {}, {}, {}
+        for rule in self.plan.rules:
+            start = time.perf_counter()
+            series = df[rule['columns'][0]]
+            kind, params = rule['kind'], rule['params']
+            if kind == 'iqr':
+                self.state[rule['name']] = _iqr_bounds(series, params['factor'])
+                mask = _outside(series, *self.state[rule['name']])
+            elif kind in ('rare', 'unique'):
+                self.state[rule['name']] = {'counts': series.value_counts().to_dict(), 'total': int(series.count())}
+                self.values[rule['columns'][0]] = series.copy()
+                mask = _RULES[kind](df, series, {}, **params, columns=rule['columns'])
+            else:
+                mask = _RULES[kind](df, series, {}, **params, columns=rule['columns'])
+            self.masks[rule['name']] = mask
+            self.timings[rule['name']] = time.perf_counter() - start
+        self.last_update = {'incremental': False, 'rows': len(df), 'full_rules': [r['name'] for r in self.plan.rules]}
+        return self.result()
+
+    def update(self, df, change_set):
+        """
+        Brings the violations up to date after a load.
+
+        Args:
+            df (pd.DataFrame): The data after the load, i.e. ``DataModelV5.main_data``.
+            change_set (dict): The change set of the load, i.e. ``DataModelV5.last_change_set``.
+
+        Returns:
+            ValidationResult: The violations of every rule. ``last_update`` tells how many rows were
+                re-evaluated and which rules had to be re-evaluated over the whole column.
+        """
+        if self.df is None or change_set is None or change_set['reset']:
+            return self.validate(df)
+
+        changed_columns = set(change_set['columns'])
+        inserted = change_set['inserted']
+        resized = bool(len(inserted) or len(change_set['deleted']))
+        full_rules = []
+        for rule in self.plan.rules:
+            start = time.perf_counter()
+            name, kind, params = rule['name'], rule['kind'], rule['params']
+            column = rule['columns'][0]
+            touched = not changed_columns.isdisjoint(rule['columns'])
+            rows = np.union1d(change_set['changed_new'], inserted) if touched else inserted
+
+            mask = np.zeros(len(df), dtype=bool)
+            mask[change_set['matched_new']] = self.masks[name][change_set['matched_old']]
+            series = df[column]
+
+            if kind == 'iqr':
+                if touched or resized:
+                    bounds = _iqr_bounds(series, params['factor'])
+                    if self._drifted(self.state[name], bounds, params['factor']):
+                        self.state[name] = bounds
+                        rows = np.arange(len(df))
+                        full_rules.append(name)
+                sample = series.iloc[rows]
+                mask[rows] = _outside(sample, *self.state[name])
+
+            elif kind in ('rare', 'unique'):
+                if touched or resized:
+                    removed = np.union1d(change_set['changed_old'], change_set['deleted']) if touched else \
+                        change_set['deleted']
+                    removed = self.values[column].iloc[removed]
+                    crossed = self._update_counts(rule, removed, series.iloc[rows])
+                    if crossed:
+                        rows = np.union1d(rows, np.flatnonzero(series.isin(crossed).to_numpy(dtype=bool)))
+                    mask[rows] = self._flag(rule, series.iloc[rows])
+
+            elif len(rows):
+                sample = df.iloc[rows]
+                mask[rows] = _RULES[kind](sample, sample[column], {}, **params, columns=rule['columns'])
+
+            self.masks[name] = mask
+            self.timings[name] = time.perf_counter() - start
+
+        for column in self.values:
+            self.values[column] = df[column].copy()
+        self.df = df
+        rows = np.union1d(change_set['changed_new'], inserted)
+        self.last_update = {'incremental': True, 'rows': len(rows), 'full_rules': full_rules}
+        return self.result()
+
+    def _drifted(self, bounds, new_bounds, factor):
+        lower_bound, upper_bound = bounds
+        # The bounds lie (1 + 2 * factor) IQRs apart.
+        tolerance = self.iqr_tolerance * (upper_bound - lower_bound) / (1 + 2 * factor)
+        moved = max(abs(new_bounds[0] - lower_bound), abs(new_bounds[1] - upper_bound))
+        return not moved <= tolerance
+
+    def _update_counts(self, rule, removed, added):
+        """
+        Applies removed and added values to the running value counts of a rare value or uniqueness rule.
+
+        Args:
+            rule (dict): The rule.
+            removed (pd.Series): Values that left the column.
+            added (pd.Series): Values that entered the column.
+
+        Returns:
+            list: The values whose violation status changed, so rows holding them need re-evaluation.
+        """
+        state = self.state[rule['name']]
+        counts = state['counts']
+        removed, added = removed.dropna().tolist(), added.dropna().tolist()
+        candidates = set(removed) | set(added)
+        before = {value: counts.get(value, 0) for value in candidates}
+        total_before = state['total']
+        for value in removed:
+            counts[value] -= 1
+            if not counts[value]:
+                del counts[value]
+        for value in added:
+            counts[value] = counts.get(value, 0) + 1
+        state['total'] += len(added) - len(removed)
+
+        if rule['kind'] == 'unique':
+            return [value for value in candidates if (before[value] > 1) != (counts.get(value, 0) > 1)]
+
+        threshold, total = rule['params']['threshold'], state['total']
+        crossed = [value for value in candidates if _is_rare(before[value], total_before, threshold) !=
+                   _is_rare(counts.get(value, 0), total, threshold)]
+        if total != total_before:
+            # A new total moves the threshold, which values whose count did not change can cross as well.
+            crossed += [value for value, count in counts.items() if value not in candidates and
+                        _is_rare(count, total_before, threshold) != _is_rare(count, total, threshold)]
+        return crossed
+
+    def _flag(self, rule, values):
+        """
+        Evaluates a rare value or uniqueness rule for some values, using the running value counts.
+
+        Args:
+            rule (dict): The rule.
+            values (pd.Series): The values to evaluate.
+
+        Returns:
+            np.ndarray: The violation mask of the values.
+        """
+        state = self.state[rule['name']]
+        counts = state['counts']
+        if rule['kind'] == 'unique':
+            return np.fromiter((counts.get(value, 0) > 1 for value in values), dtype=bool, count=len(values))
+        threshold, total = rule['params']['threshold'], state['total']
+        return np.fromiter((_is_rare(counts.get(value, 0), total, threshold) for value in values), dtype=bool,
+                           count=len(values))
+
+    def result(self):
+        """
+        Returns the current violations.
+
+        Returns:
+            ValidationResult: The violations of every rule, with the timings of the last validation or update.
+        """
+        return ValidationResult(self.df, self.plan.rules,
+                                {name: np.packbits(mask) for name, mask in self.masks.items()}, self.timings)
+
+
+def _is_rare(count, total, threshold):
+    return count > 0 and count / total < threshold
+
+
+def _evaluate(df, rules):
+    """
+    Evaluates rules column by column, sharing the dictionary encoding of a column between its rules.
+
+    Args:
+        df (pd.DataFrame): The DataFrame, holding at least the columns the rules read.
+        rules (list): The rules to evaluate.
+
+    Returns:
+        tuple: The packed violation masks and the evaluation times in seconds, both by rule name.
+    """
+    by_column = {}
+    for rule in rules:
+        by_column.setdefault(rule['columns'][0], []).append(rule)
+
+    bitmaps = {}
+    timings = {}
+    for column, column_rules in by_column.items():
+        series = df[column]
+        encoding = {}
+        for rule in column_rules:
+            start = time.perf_counter()
+            mask = _RULES[rule['kind']](df, series, encoding, **rule['params'], columns=rule['columns'])
+            bitmaps[rule['name']] = np.packbits(mask)
+            timings[rule['name']] = time.perf_counter() - start
+    return bitmaps, timings
+
+
+def _encode(series, encoding):
+    """
+    Dictionary-encodes a column once per run and shares the result between its rules.
+
+    Args:
+        series (pd.Series): The column.
+        encoding (dict): Per-column cache filled on first use.
+
+    Returns:
+        tuple: The codes (-1 for missing values) and the distinct values.
+    """
+    if 'codes' not in encoding:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            encoding['codes'], encoding['uniques'] = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            encoding['codes'], encoding['uniques'] = pd.factorize(series)
+    return encoding['codes'], encoding['uniques']
+
+
+def _iqr_bounds(series, factor):
+    q1, q3 = series.quantile([0.25, 0.75])
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+
+def _outside(series, lower_bound, upper_bound):
+    return ((series < lower_bound) | (series > upper_bound)).to_numpy(dtype=bool, na_value=False)
+
+
+def _iqr_mask(df, series, encoding, factor, columns):
+    return _outside(series, *_iqr_bounds(series, factor))
+
+
+def _date_range_mask(df, series, encoding, start_date, end_date, columns):
+    mask = np.zeros(len(series), dtype=bool)
+    if start_date is not None:
+        mask |= (series < pd.Timestamp(start_date)).to_numpy(dtype=bool, na_value=False)
+    if end_date is not None:
+        mask |= (series > pd.Timestamp(end_date)).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def _rare_mask(df, series, encoding, threshold, columns):
+    codes, uniques = _encode(series, encoding)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    rare = counts / max(counts.sum(), 1) < threshold
+    return (codes >= 0) & rare[np.maximum(codes, 0)] if len(uniques) else np.zeros(len(codes), dtype=bool)
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    """
+    Compiles a regular expression once and keeps it in an LRU cache.
+
+    Args:
+        pattern (str or re.Pattern): The regular expression.
+
+    Returns:
+        re.Pattern: The compiled pattern.
+    """
+    return re.compile(pattern)
+
+
+def regex_violations(series, patterns, require='all', encoding=None):
+    """
+    Finds the values of a column that do not match regular expressions.
+
+    The patterns run over the distinct values of the column only, and the outcome is broadcast back to the
+    rows through the factorized codes, so the cost grows with the cardinality rather than the length of the
+    column. Missing values and values that are not strings never violate.
+
+    Args:
+        series (pd.Series): The column.
+        patterns (str or list): A regular expression, or several evaluated in the same pass.
+        require (str, optional): ``'all'`` if a value must match every pattern, ``'any'`` if one is enough.
+            Defaults to 'all'.
+        encoding (dict, optional): Cache for the dictionary encoding of the column. Defaults to None.
+
+    Returns:
+        np.ndarray: Boolean mask of the violating rows.
+    """
+    codes, uniques = _encode(series, {} if encoding is None else encoding)
+    if not len(uniques):
+        return np.zeros(len(codes), dtype=bool)
+    patterns = (patterns,) if isinstance(patterns, (str, re.Pattern)) else patterns
+    matchers = [compile_pattern(pattern).match for pattern in patterns]
+    combine = all if require == 'all' else any
+    violating = np.fromiter(
+        (isinstance(value, str) and not combine(match(value) is not None for match in matchers) for value in uniques),
+        dtype=bool, count=len(uniques))
+    return (codes >= 0) & violating[np.maximum(codes, 0)]
+
+
+def _regex_mask(df, series, encoding, patterns, require, columns):
+    return regex_violations(series, patterns, require, encoding)
+
+
+def _allowed_mask(df, series, encoding, allowed_values, columns):
+    return ~series.isin(allowed_values).to_numpy(dtype=bool)
+
+
+def _unique_mask(df, series, encoding, columns):
+    codes, uniques = _encode(series, encoding)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return (codes >= 0) & (counts[np.maximum(codes, 0)] > 1) if len(uniques) else np.zeros(len(codes), dtype=bool)
+
+
+def _dependency_mask(df, series, encoding, value1, value2, columns):
+    condition = (series == value1).to_numpy(dtype=bool, na_value=False)
+    satisfied = df[columns[1]].eq(value2).to_numpy(dtype=bool, na_value=False)
+    return condition & ~satisfied
+
+
+_RULES = {
+    'iqr': _iqr_mask,
+    'date_range': _date_range_mask,
+    'rare': _rare_mask,
+    'regex': _regex_mask,
+    'allowed': _allowed_mask,
+    'unique': _unique_mask,
+    'dependency': _dependency_mask,
+}
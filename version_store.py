@@ -0,0 +1,265 @@
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+import pandas as pd
+
+from data_model import hash_rows
+
+logger = logging.getLogger(__name__)
+
+
+class VersionStore:
+    """
+    A content-addressed store for DataFrame versions.
+
+    Every column (and the index) is cut into fixed-size row blocks. A block is hashed from its column buffer
+    with ``data_model.hash_rows`` and stored once under that hash, so a version only keeps the list of
+    block hashes it is made of. Blocks that did not change since the parent version are shared with it, which
+    makes each saved version a block-level delta against its parent.
+
+    With a memory budget, blocks are kept in RAM in least-recently-used order. Once the resident blocks exceed
+    the budget, the least recently used ones are spilled to Arrow (Feather) files. A restore reads them as
+    views over the memory-mapped file, so numeric and datetime blocks are not copied and spilled blocks never
+    count against the budget again. Blocks whose dtype Arrow does not round-trip (e.g. object columns) are
+    cast back to their original dtype, which copies them.
+
+    The budget is a soft limit. Blocks Arrow cannot hold (e.g. object columns mixing types) stay resident; they
+    are tracked in ``unspillable_bytes`` and skipped by later evictions, and a warning is logged the first time
+    they keep the store above its budget.
+    """
+
+    def __init__(self, block_rows=65_536, memory_budget=None, spill_dir=None):
+        """
+        Initializes an empty store.
+
+        Args:
+            block_rows (int, optional): Number of rows per block. Defaults to 65536.
+            memory_budget (int, optional): Size of the resident blocks in bytes above which blocks are spilled,
+                a soft limit as described above. Defaults to None (unbounded).
+            spill_dir (str, optional): Directory for spilled blocks. Defaults to a new temporary directory.
+        """
+        self.block_rows = block_rows
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.blocks = OrderedDict()
+        self.block_sizes = {}
+        self.spilled = {}
+        self.manifests = {}
+        self.resident_bytes = 0
+        self.unspillable = set()
+        self.unspillable_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def save(self, df, parent=None):
+        """
+        Stores a version of a DataFrame.
+
+        Args:
+            df (pd.DataFrame): The DataFrame to store.
+            parent (str, optional): Hash of the version this one derives from. Defaults to None.
+
+        Returns:
+            str: The version hash, identical for DataFrames with identical content.
+        """
+        # A range index is fully described by its bounds, so it is not stored as blocks.
+        index_range = None
+        index_blocks = []
+        if isinstance(df.index, pd.RangeIndex):
+            index_range = (df.index.start, df.index.stop, df.index.step)
+        else:
+            index_blocks = [self._put_blocks(pd.Series(df.index.get_level_values(level)))
+                            for level in range(df.index.nlevels)]
+        column_blocks = [self._put_blocks(df.iloc[:, j]) for j in range(df.shape[1])]
+
+        digest = hashlib.md5()
+        digest.update(repr([list(df.columns), [str(dtype) for dtype in df.dtypes], list(df.index.names),
+                            index_range]).encode())
+        for block_hash in [h for blocks in index_blocks + column_blocks for h in blocks]:
+            digest.update(block_hash.encode())
+        version_hash = digest.hexdigest()
+
+        if version_hash not in self.manifests:
+            parent_blocks = set()
+            if parent in self.manifests:
+                parent_manifest = self.manifests[parent]
+                parent_blocks = set().union(*parent_manifest['index'], *parent_manifest['columns'])
+            version_blocks = set().union(*index_blocks, *column_blocks)
+            self.manifests[version_hash] = {
+                'parent': parent,
+                'columns': column_blocks,
+                'column_names': df.columns,
+                'index': index_blocks,
+                'index_range': index_range,
+                'index_names': df.index.names,
+                'delta': [h for h in version_blocks if h not in parent_blocks],
+            }
+        return version_hash
+
+    def restore(self, version_hash):
+        """
+        Rebuilds a stored version.
+
+        Args:
+            version_hash (str): The hash returned by ``save``.
+
+        Returns:
+            pd.DataFrame: The restored DataFrame, or None if the hash is unknown.
+        """
+        manifest = self.manifests.get(version_hash)
+        if manifest is None:
+            return None
+        if manifest['index_range'] is not None:
+            index = pd.RangeIndex(*manifest['index_range'], name=manifest['index_names'][0])
+        else:
+            levels = [self._get_blocks(blocks) for blocks in manifest['index']]
+            index = pd.MultiIndex.from_arrays(levels, names=manifest['index_names']) if len(levels) > 1 else \
+                pd.Index(levels[0], name=manifest['index_names'][0])
+        columns = {j: self._get_blocks(blocks).set_axis(index) for j, blocks in enumerate(manifest['columns'])}
+        df = pd.DataFrame(columns, index=index, copy=False)
+        df.columns = manifest['column_names']
+        return df
+
+    def _put_blocks(self, series):
+        """
+        Cuts a column into blocks and stores the ones not seen before.
+
+        Args:
+            series (pd.Series): The column to store.
+
+        Returns:
+            list: The hashes of the column's blocks, in row order.
+        """
+        hashes = []
+        for start in range(0, max(len(series), 1), self.block_rows):
+            block = series.iloc[start:start + self.block_rows]
+            digest = hashlib.md5(str(block.dtype).encode())
+            digest.update(hash_rows(block).tobytes())
+            block_hash = digest.hexdigest()
+            if block_hash not in self.blocks and block_hash not in self.spilled:
+                self._admit(block_hash, block.reset_index(drop=True).rename(None).copy())
+            hashes.append(block_hash)
+        return hashes
+
+    def _get_blocks(self, hashes):
+        blocks = [self._get_block(block_hash) for block_hash in hashes]
+        if len(blocks) > 1:
+            return pd.concat(blocks, ignore_index=True)
+        # Resident blocks are shared between versions; spilled ones are read-only views over their file.
+        return blocks[0] if hashes[0] in self.spilled else blocks[0].copy()
+
+    def _get_block(self, block_hash):
+        """
+        Returns a block, as a view over its memory-mapped spill file if it is not resident.
+
+        Args:
+            block_hash (str): The hash of the block.
+
+        Returns:
+            pd.Series: The block.
+        """
+        block = self.blocks.get(block_hash)
+        if block is not None:
+            self.hits += 1
+            self.blocks.move_to_end(block_hash)
+            return block
+
+        import pyarrow.feather as feather
+
+        self.misses += 1
+        path, dtype, na_value = self.spilled[block_hash]
+        block = feather.read_table(path, memory_map=True).to_pandas()['value'].rename(None)
+        if block.dtype != dtype:
+            block = block.astype(dtype)
+        return block if na_value is None else block.where(block.notna(), na_value)
+
+    def _admit(self, block_hash, block):
+        """
+        Makes a block resident and spills the least recently used blocks, up to the block itself, while the
+        budget is exceeded.
+
+        Args:
+            block_hash (str): The hash of the block.
+            block (pd.Series): The block.
+        """
+        size = int(block.memory_usage(index=False, deep=True))
+        self.blocks[block_hash] = block
+        self.block_sizes[block_hash] = size
+        self.resident_bytes += size
+        if self.memory_budget is None:
+            return
+
+        # Once every other block is spilled, only the unspillable ones can keep the store above its budget.
+        over_budget = self.unspillable_bytes > self.memory_budget
+        for victim in list(self.blocks):
+            if self.resident_bytes <= self.memory_budget:
+                break
+            if victim in self.unspillable:
+                continue
+            if self._spill(victim):
+                self.evictions += 1
+            else:
+                self.unspillable.add(victim)
+                self.unspillable_bytes += self.block_sizes[victim]
+        if self.unspillable_bytes > self.memory_budget and not over_budget:
+            logger.warning("Version store holds %d bytes of blocks that cannot be spilled; %d resident bytes "
+                           "exceed the budget of %d.", self.unspillable_bytes, self.resident_bytes, self.memory_budget)
+
+    def _spill(self, block_hash):
+        """
+        Writes a resident block to an Arrow file and drops it from memory.
+
+        Args:
+            block_hash (str): The hash of the block.
+
+        Returns:
+            bool: False if the block cannot be represented in Arrow, or is an object column mixing different
+                missing values, and has to stay resident.
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='mdm-versions-')
+        block = self.blocks[block_hash]
+        # Arrow reads every missing value of an object column back as None, so the one used has to be recorded.
+        missing = block[block.isna()] if block.dtype == object else block.iloc[:0]
+        if len(set(map(repr, missing))) > 1:
+            return False
+        path = os.path.join(self.spill_dir, f'{block_hash}.feather')
+        if not os.path.exists(path):
+            try:
+                table = pa.Table.from_pandas(block.to_frame('value'), preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                return False
+            feather.write_feather(table, path, compression='uncompressed')
+        # Arrow infers the type from the values, e.g. object strings come back as ``str``.
+        self.spilled[block_hash] = path, block.dtype, missing.iloc[0] if len(missing) else None
+        del self.blocks[block_hash]
+        self.resident_bytes -= self.block_sizes[block_hash]
+        return True
+
+    def stats(self):
+        """
+        Reports how much the store holds.
+
+        Returns:
+            dict: Number of versions, resident and spilled blocks, resident and unspillable size in bytes and
+                block cache hit/miss/eviction counters.
+        """
+        return {
+            'versions': len(self.manifests),
+            'blocks': len(self.blocks) + len(self.spilled),
+            'resident_blocks': len(self.blocks),
+            'spilled_blocks': len(self.spilled),
+            'resident_bytes': self.resident_bytes,
+            'unspillable_bytes': self.unspillable_bytes,
+            'memory_budget': self.memory_budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }